@@ -0,0 +1,82 @@
+"""
+Causal noise filtering for streamed PCM16 audio
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import scipy.signal as signal
+
+HIGHPASS_CUTOFF = 80     # Hz, removes low-frequency noise like AC hum
+LOWPASS_CUTOFF = 8000    # Hz, removes high-frequency noise
+FILTER_ORDER = 4
+NOISE_THRESHOLD = 0.01   # Samples quieter than this are zeroed
+
+
+@lru_cache(maxsize=None)
+def design_sos(sample_rate):
+    """Band-pass SOS coefficients for a sample rate, designed once
+
+    The low-pass is skipped when its cutoff is not below Nyquist (8 kHz at
+    16 kHz input), where it would have nothing to remove.
+    """
+    sections = [signal.butter(FILTER_ORDER, HIGHPASS_CUTOFF, btype='high', fs=sample_rate, output='sos')]
+    if LOWPASS_CUTOFF < sample_rate / 2:
+        sections.append(signal.butter(FILTER_ORDER, LOWPASS_CUTOFF, btype='low', fs=sample_rate, output='sos'))
+    return np.vstack(sections).astype(np.float32)
+
+
+class StreamingNoiseFilter:
+    """Causal band-pass plus noise gate that keeps its state across chunks
+
+    Filter state (``zi``) carries over between calls, so a stream split into
+    chunks is filtered exactly as if it arrived in one piece. Work buffers
+    are kept between calls and everything runs in float32.
+    """
+
+    def __init__(self, sample_rate=16000, noise_threshold=NOISE_THRESHOLD):
+        self.sample_rate = sample_rate
+        self.noise_threshold = noise_threshold
+        self.sos = design_sos(sample_rate)
+        self.zi = np.zeros((self.sos.shape[0], 2), dtype=np.float32)
+        self._samples = np.empty(0, dtype=np.float32)
+        self._mask = np.empty(0, dtype=bool)
+        self._pcm = np.empty(0, dtype=np.int16)
+
+    def reset(self):
+        """Forget filter state, e.g. between utterances"""
+        self.zi.fill(0)
+
+    def _reserve(self, size):
+        if self._samples.size < size:
+            self._samples = np.empty(size, dtype=np.float32)
+            self._mask = np.empty(size, dtype=bool)
+            self._pcm = np.empty(size, dtype=np.int16)
+        return self._samples[:size], self._mask[:size], self._pcm[:size]
+
+    def process_samples(self, pcm):
+        """Filter an int16 sample array and return float32 samples in [-1, 1)
+
+        The returned array is only valid until the next call.
+        """
+        samples, mask, _ = self._reserve(pcm.size)
+        np.multiply(pcm, np.float32(1 / 32768), out=samples)
+        filtered, self.zi = signal.sosfilt(self.sos, samples, zi=self.zi)
+
+        np.abs(filtered, out=samples)
+        np.less(samples, self.noise_threshold, out=mask)
+        filtered[mask] = 0
+        return filtered
+
+    def process(self, audio_data):
+        """Filter little-endian PCM16 bytes and return PCM16 bytes"""
+        pcm = np.frombuffer(audio_data, dtype=np.int16, count=len(audio_data) // 2)
+        if not pcm.size:
+            return audio_data
+        filtered = self.process_samples(pcm)
+
+        _, _, out = self._reserve(pcm.size)
+        np.multiply(filtered, np.float32(32767), out=filtered)
+        np.clip(filtered, -32768, 32767, out=filtered)
+        np.copyto(out, filtered, casting='unsafe')
+        return out.tobytes()
@@ -0,0 +1,349 @@
+"""
+Audio ingestion: RIFF/WAV parsing, downmixing and resampling to 16 kHz PCM16
+"""
+
+import struct
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+import scipy.signal as signal
+
+TARGET_RATE = 16000
+BLOCK_BYTES = 1 << 20  # Upper bound on audio data held per read
+# Layouts accepted for headerless PCM uploads
+MIN_RAW_RATE = 8000
+MAX_RAW_RATE = 192000
+MAX_RAW_CHANNELS = 8
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class AudioFormatError(ValueError):
+    """Audio that cannot be parsed or converted"""
+
+
+class AudioFormat:
+    """Sample layout of a PCM stream"""
+
+    def __init__(self, sample_rate=TARGET_RATE, channels=1, sample_width=2, is_float=False):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.is_float = is_float
+
+    @property
+    def block_align(self):
+        return self.channels * self.sample_width
+
+    @property
+    def is_target(self):
+        """Already PCM16 mono at TARGET_RATE"""
+        return (self.sample_rate == TARGET_RATE and self.channels == 1
+                and self.sample_width == 2 and not self.is_float)
+
+    def __eq__(self, other):
+        return isinstance(other, AudioFormat) and vars(self) == vars(other)
+
+    def __repr__(self):
+        kind = 'float' if self.is_float else 'int'
+        return f"AudioFormat({self.sample_rate} Hz, {self.channels} ch, {8 * self.sample_width}-bit {kind})"
+
+
+def raw_audio_format(sample_rate=TARGET_RATE, channels=1):
+    """PCM16 layout given by the client for headerless audio, checked for sane values"""
+    if not MIN_RAW_RATE <= sample_rate <= MAX_RAW_RATE:
+        raise AudioFormatError(f'sample_rate must be between {MIN_RAW_RATE} and {MAX_RAW_RATE} Hz, got {sample_rate}')
+    if not 1 <= channels <= MAX_RAW_CHANNELS:
+        raise AudioFormatError(f'channels must be between 1 and {MAX_RAW_CHANNELS}, got {channels}')
+    return AudioFormat(sample_rate, channels)
+
+
+def _parse_fmt(chunk):
+    if len(chunk) < 16:
+        raise AudioFormatError('fmt chunk too short')
+    format_tag, channels, sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', chunk)
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(chunk) >= 26:
+        # The first two bytes of the SubFormat GUID carry the real format tag
+        format_tag = struct.unpack_from('<H', chunk, 24)[0]
+    if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+        raise AudioFormatError(f'Unsupported WAV format tag 0x{format_tag:04x}')
+    if channels < 1 or sample_rate < 1 or bits not in (8, 16, 24, 32, 64):
+        raise AudioFormatError(f'Unsupported WAV layout: {channels} ch, {sample_rate} Hz, {bits}-bit')
+    return AudioFormat(sample_rate, channels, bits // 8, format_tag == WAVE_FORMAT_IEEE_FLOAT)
+
+
+def parse_wav(buffer):
+    """Parse an in-memory WAV file
+
+    Returns (AudioFormat, memoryview of the data chunk). Chunks may come in
+    any order and unknown ones are skipped; nothing is copied.
+    """
+    view = memoryview(buffer).cast('B')
+    if len(view) < 12 or view[:4] != b'RIFF' or view[8:12] != b'WAVE':
+        raise AudioFormatError('Not a RIFF/WAVE file')
+
+    audio_format = None
+    data = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        size = struct.unpack_from('<I', view, offset + 4)[0]
+        body = view[offset + 8:offset + 8 + size]  # Truncated files keep what is there
+        if chunk_id == b'fmt ':
+            audio_format = _parse_fmt(body)
+        elif chunk_id == b'data':
+            data = body
+        offset += 8 + size + (size & 1)
+
+    if audio_format is None or data is None:
+        raise AudioFormatError('WAV file has no fmt or data chunk')
+    return audio_format, data[:len(data) - len(data) % audio_format.block_align]
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    while len(data) < size:
+        more = stream.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+
+def _read_wav_header(stream, riff_header):
+    """Read chunks up to the data chunk; returns (AudioFormat, data size)"""
+    if riff_header[8:12] != b'WAVE':
+        raise AudioFormatError('Not a RIFF/WAVE file')
+    audio_format = None
+    while True:
+        chunk_header = _read_exact(stream, 8)
+        if len(chunk_header) < 8:
+            raise AudioFormatError('WAV file has no data chunk')
+        chunk_id, size = chunk_header[:4], struct.unpack('<I', chunk_header[4:])[0]
+        if chunk_id == b'data':
+            break
+        body = _read_exact(stream, size + (size & 1))
+        if chunk_id == b'fmt ':
+            audio_format = _parse_fmt(body)
+    if audio_format is None:
+        raise AudioFormatError('WAV data chunk precedes its fmt chunk')
+    return audio_format, size
+
+
+def _read_blocks(stream, prefix, remaining, block_bytes):
+    """Yield memoryviews of at most block_bytes, reusing one buffer"""
+    buffer = bytearray(block_bytes)
+    view = memoryview(buffer)
+    filled = len(prefix)
+    view[:filled] = prefix
+    while True:
+        wanted = block_bytes - filled if remaining is None else min(block_bytes - filled, remaining)
+        count = 0
+        if wanted > 0:
+            if hasattr(stream, 'readinto'):
+                count = stream.readinto(view[filled:filled + wanted]) or 0
+            else:
+                data = stream.read(wanted)
+                count = len(data)
+                view[filled:filled + count] = data
+        if remaining is not None:
+            remaining -= count
+        filled += count
+        if not filled:
+            return
+        yield view[:filled]
+        if not count:
+            return
+        filled = 0
+
+
+def open_audio_stream(stream, raw_format=None, block_bytes=BLOCK_BYTES):
+    """Read a WAV (or headerless PCM) upload in bounded blocks
+
+    Returns (source AudioFormat, iterator of raw data memoryviews). Only
+    header chunks and one block of at most ``block_bytes`` are held in
+    memory; each view is valid until the next one is produced. Input without
+    a RIFF header is read as ``raw_format`` (PCM16 mono 16 kHz by default).
+    """
+    header = _read_exact(stream, 12)
+    if header[:4] == b'RIFF':
+        audio_format, size = _read_wav_header(stream, header)
+        return audio_format, _read_blocks(stream, b'', size, block_bytes)
+    return raw_format or AudioFormat(), _read_blocks(stream, header, None, block_bytes)
+
+
+def to_float_mono(data, audio_format):
+    """Decode interleaved samples to a mono float32 array in [-1, 1)"""
+    width = audio_format.sample_width
+    if audio_format.is_float:
+        samples = np.frombuffer(data, dtype='<f4' if width == 4 else '<f8').astype(np.float32)
+    elif width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) * np.float32(1 / 128)
+    elif width == 2:
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32) * np.float32(1 / 32768)
+    elif width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        packed = raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16)
+        samples = ((packed << 8) >> 8).astype(np.float32) * np.float32(1 / 8388608)
+    elif width == 4:
+        samples = np.frombuffer(data, dtype='<i4').astype(np.float32) * np.float32(1 / 2147483648)
+    else:
+        raise AudioFormatError(f'Unsupported sample width {width}')
+
+    if audio_format.channels > 1:
+        samples = samples.reshape(-1, audio_format.channels).mean(axis=1, dtype=np.float32)
+    return samples
+
+
+def to_pcm16(samples):
+    """float32 samples -> little-endian PCM16 bytes"""
+    return (np.clip(samples, -1.0, 32767 / 32768) * 32768).astype('<i2').tobytes()
+
+
+@lru_cache(maxsize=32)
+def design_lowpass(up, down):
+    """Anti-aliasing FIR for a resampling ratio, designed once
+
+    Same design as scipy.signal.resample_poly's default window.
+    """
+    max_rate = max(up, down)
+    taps = signal.firwin(2 * (10 * max_rate) + 1, 1.0 / max_rate, window=('kaiser', 5.0))
+    taps.setflags(write=False)
+    return taps
+
+
+def _ratio(from_rate, to_rate):
+    divisor = gcd(from_rate, to_rate)
+    return to_rate // divisor, from_rate // divisor
+
+
+class StreamingResampler:
+    """Polyphase resampler that keeps filter history between blocks
+
+    Feeding a signal in blocks yields the same samples as one resample_poly
+    call over the whole signal, without holding the whole signal.
+    """
+
+    def __init__(self, from_rate, to_rate=TARGET_RATE):
+        self.up, self.down = _ratio(from_rate, to_rate)
+        if self.passthrough:
+            return
+        # Lay the filter out as resample_poly does: zero-padded so the group
+        # delay is a whole number of output samples, which are then dropped
+        lowpass = design_lowpass(self.up, self.down)
+        half_len = (len(lowpass) - 1) // 2
+        pre_pad = self.down - half_len % self.down
+        self.taps = np.concatenate([np.zeros(pre_pad), lowpass]) * self.up
+        self._drop = (half_len + pre_pad) // self.down
+        # Input history covering the filter span, a whole number of output steps
+        history = -(-len(self.taps) // self.up)
+        history += -history % self.down
+        self._history = np.zeros(history, dtype=np.float32)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._consumed = 0
+        self._produced = 0
+
+    @property
+    def passthrough(self):
+        return self.up == self.down
+
+    def process(self, samples):
+        """Resample the next block of float32 samples"""
+        if self.passthrough:
+            return samples
+        self._consumed += len(samples)
+        return self._run(np.concatenate([self._pending, samples]))
+
+    def flush(self):
+        """Emit the samples still held back by the filter delay"""
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+        remaining = -(-self._consumed * self.up // self.down) - self._produced
+        if remaining <= 0:
+            return np.zeros(0, dtype=np.float32)
+        tail = np.zeros(-(-(remaining + 1) * self.down // self.up) + self.down, dtype=np.float32)
+        return self._run(np.concatenate([self._pending, tail]))[:remaining]
+
+    def _run(self, samples):
+        usable = len(samples) - len(samples) % self.down
+        self._pending = samples[usable:]
+        if not usable:
+            return np.zeros(0, dtype=np.float32)
+        block = np.concatenate([self._history, samples[:usable]])
+        history_out = len(self._history) * self.up // self.down
+        out = signal.upfirdn(self.taps, block, self.up, self.down)
+        out = out[history_out:history_out + usable * self.up // self.down].astype(np.float32)
+        self._history = block[-len(self._history):]
+
+        if self._drop:
+            skipped = min(self._drop, len(out))
+            out = out[skipped:]
+            self._drop -= skipped
+        self._produced += len(out)
+        return out
+
+
+class PcmConverter:
+    """Converts successive chunks of one stream to PCM16 mono 16 kHz
+
+    Chunks may split sample frames anywhere; resampling state carries over
+    between chunks. With ``detect_headers``, a chunk starting with a RIFF
+    header switches to the format it declares.
+    """
+
+    def __init__(self, audio_format=None, detect_headers=True):
+        self.detect_headers = detect_headers
+        self._set_format(audio_format or AudioFormat())
+
+    def _set_format(self, audio_format):
+        self.audio_format = audio_format
+        self.resampler = StreamingResampler(audio_format.sample_rate)
+        self._carry = b''
+
+    def convert(self, data):
+        """Convert the next chunk; returns PCM16 bytes"""
+        if self.detect_headers and bytes(data[:4]) == b'RIFF':
+            audio_format, data = parse_wav(data)
+            if audio_format != self.audio_format:
+                self._set_format(audio_format)
+        data = memoryview(data).cast('B')
+        if self._carry:
+            data = memoryview(self._carry + bytes(data))
+        usable = len(data) - len(data) % self.audio_format.block_align
+        self._carry = bytes(data[usable:])
+        if self.audio_format.is_target:
+            return bytes(data[:usable])
+        return to_pcm16(self.resampler.process(to_float_mono(data[:usable], self.audio_format)))
+
+    def flush(self):
+        """PCM16 bytes still held back by the resampler"""
+        return to_pcm16(self.resampler.flush())
+
+
+def to_target_pcm16(data, raw_format=None):
+    """Convert one in-memory WAV file or headerless PCM buffer to PCM16 mono 16 kHz"""
+    converter = PcmConverter(raw_format)
+    return converter.convert(data) + converter.flush()
+
+
+def iter_pcm16_blocks(stream, raw_format=None, block_bytes=BLOCK_BYTES):
+    """Stream an upload as PCM16 mono 16 kHz blocks with bounded memory
+
+    Returns (source AudioFormat, iterator of bytes).
+    """
+    audio_format, blocks = open_audio_stream(stream, raw_format, block_bytes)
+    converter = PcmConverter(audio_format, detect_headers=False)
+
+    def convert():
+        for block in blocks:
+            pcm = converter.convert(block)
+            if pcm:
+                yield pcm
+        tail = converter.flush()
+        if tail:
+            yield tail
+
+    return audio_format, convert()
@@ -0,0 +1,145 @@
+"""
+In-memory index of launchable executables
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IS_WINDOWS = os.name == "nt"
+
+
+def _executable_extensions() -> List[str]:
+    if not IS_WINDOWS:
+        return []
+    return [ext.lower() for ext in os.getenv("PATHEXT", ".COM;.EXE;.BAT;.CMD").split(";") if ext]
+
+
+class ExecutableIndex:
+    """Map executable names to paths for PATH and configured app directories
+
+    Each directory is listed once and re-listed only when its mtime changes,
+    so a refresh costs one stat per directory. Names are stored lowercased,
+    with and (on Windows) without their executable extension; directories
+    earlier in the search order win, as with PATH lookup. Lookups are plain
+    dictionary hits against the last completed scan.
+    """
+
+    def __init__(self, extra_directories: Optional[List[str]] = None,
+                 common_apps: Optional[Dict[str, str]] = None):
+        self.extra_directories = extra_directories or []
+        self.common_apps = common_apps or {}
+        self.extensions = _executable_extensions()
+        self.last_refresh: Optional[float] = None
+        self.refresh_count = 0
+        # directory -> (mtime_ns, {name: path})
+        self._listings: Dict[str, Tuple[int, Dict[str, str]]] = {}
+        self._executables: Dict[str, str] = {}
+        self._common: Dict[str, Optional[str]] = {}
+
+    @property
+    def directories(self) -> List[str]:
+        """Directories searched, in priority order (PATH first)"""
+        seen = []
+        for directory in os.getenv("PATH", "").split(os.pathsep) + self.extra_directories:
+            directory = os.path.expandvars(os.path.expanduser(directory))
+            if directory and directory not in seen:
+                seen.append(directory)
+        return seen
+
+    def __len__(self) -> int:
+        return len(self._executables)
+
+    def _ensure_built(self) -> None:
+        if self.last_refresh is None:
+            self.refresh()
+
+    def lookup(self, name: str) -> Optional[str]:
+        """Return the path of an executable by name, or None"""
+        self._ensure_built()
+        return self._executables.get(name.lower().strip())
+
+    def resolve_common_app(self, name: str) -> Optional[str]:
+        """Return the resolved path of a COMMON_APPS entry, or None if it is missing"""
+        self._ensure_built()
+        return self._common.get(name)
+
+    def resolved_common_apps(self) -> Dict[str, str]:
+        """COMMON_APPS entries that resolve to an existing executable"""
+        self._ensure_built()
+        return {name: path for name, path in self._common.items() if path}
+
+    def names(self) -> List[str]:
+        """All indexed executable names"""
+        self._ensure_built()
+        return list(self._executables)
+
+    def refresh(self) -> None:
+        """Re-list changed directories and rebuild the lookup tables"""
+        listings = {}
+        for directory in self.directories:
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            cached = self._listings.get(directory)
+            if cached is not None and cached[0] == mtime:
+                listings[directory] = cached
+            else:
+                listings[directory] = (mtime, self._list_directory(directory))
+
+        executables: Dict[str, str] = {}
+        for directory in self.directories:
+            if directory in listings:
+                for name, path in listings[directory][1].items():
+                    executables.setdefault(name, path)
+
+        common = {}
+        for name, path in self.common_apps.items():
+            if os.path.isabs(path):
+                common[name] = path if os.path.isfile(path) else None
+            else:
+                common[name] = executables.get(path.lower())
+
+        # Swap in complete tables so concurrent lookups never see a partial scan
+        self._listings = listings
+        self._executables = executables
+        self._common = common
+        self.last_refresh = time.time()
+        self.refresh_count += 1
+
+    async def refresh_periodically(self, interval: float) -> None:
+        """Refresh the index every interval seconds in a worker thread"""
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.warning(f"Executable index refresh failed: {e}")
+            await asyncio.sleep(interval)
+
+    def _list_directory(self, directory: str) -> Dict[str, str]:
+        entries = {}
+        try:
+            with os.scandir(directory) as iterator:
+                for entry in iterator:
+                    try:
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    lower = entry.name.lower()
+                    if IS_WINDOWS:
+                        stem, ext = os.path.splitext(lower)
+                        if ext not in self.extensions:
+                            continue
+                        entries.setdefault(stem, entry.path)
+                    elif not os.access(entry.path, os.X_OK):
+                        continue
+                    entries.setdefault(lower, entry.path)
+        except OSError as e:
+            logger.debug(f"Could not list {directory}: {e}")
+        return entries
@@ -0,0 +1,203 @@
+"""
+Fuzzy matching of spoken app names
+"""
+
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Soundex-style consonant classes; vowels and h/w/y are dropped
+_PHONETIC_CODES = str.maketrans("bfpvcgjkqsxzdtlmnr", "111122222222334556", "aeiouyhw")
+
+
+def compact_name(text: str) -> str:
+    """Lowercase and drop everything but letters, digits and "+"
+
+    Collapses transcript spellings such as "v s code" or "note pad" onto
+    the same key as "vscode" and "notepad".
+    """
+    return re.sub(r'[^a-z0-9+]', '', text.lower())
+
+
+def phonetic_key(compact: str) -> str:
+    """Full-length Soundex-like key of a compact name"""
+    if not compact:
+        return ""
+    codes = compact[1:].translate(_PHONETIC_CODES)
+    key = compact[0]
+    for code in codes:
+        if code != key[-1]:
+            key += code
+    return key
+
+
+def trigrams(compact: str) -> List[str]:
+    padded = f"  {compact} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+@dataclass
+class AppMatch:
+    """Best fuzzy match for a spoken name
+
+    ``known`` is False when the name matched an executable that is not one
+    of the configured or learned aliases.
+    """
+    alias: str
+    target: str
+    score: float
+    known: bool = True
+
+
+class AppNameMatcher:
+    """Precomputed trigram and phonetic index over app names and aliases
+
+    Every alias maps to a target app name. Queries are scored by the Dice
+    coefficient of their character trigrams against candidates sharing at
+    least one trigram; an exact compact-name hit scores 1.0. Agreeing
+    phonetic keys raise a score to ``phonetic_score`` only when the Dice
+    score is at least ``phonetic_overlap`` and the names are of similar
+    length, so a short Soundex collision ("door" and "dir") does not count.
+    Executables indexed next to the aliases are ranked below them: their
+    fuzzy scores are scaled by ``executable_weight``. Aliases learned from
+    successful launches are persisted to ``learned_path`` as JSON.
+    """
+
+    def __init__(self, threshold: float, learned_path: Optional[str] = None, phonetic_score: float = 0.85,
+                 phonetic_overlap: float = 0.4, executable_weight: float = 0.9):
+        self.threshold = threshold
+        self.learned_path = learned_path
+        self.phonetic_score = phonetic_score
+        self.phonetic_overlap = phonetic_overlap
+        self.executable_weight = executable_weight
+        self.learned: Dict[str, str] = self._load_learned()
+        self.source_version = None
+        self._aliases: List[str] = []
+        self._targets: List[str] = []
+        self._trigram_counts: List[int] = []
+        self._lengths: List[int] = []
+        self._known: List[bool] = []
+        self._exact: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._phonetic: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def build(self, aliases: Dict[str, str], executables: Iterable[str] = (), source_version=None) -> None:
+        """Index alias -> target pairs and executable names
+
+        Learned aliases are added on top of ``aliases``; an executable whose
+        name is already an alias is indexed as that alias.
+        """
+        combined = dict(aliases)
+        combined.update(self.learned)
+        entries = [(alias, target, True) for alias, target in combined.items()]
+        entries.extend((name, name, False) for name in executables)
+
+        alias_list, targets, counts, lengths, known = [], [], [], [], []
+        exact: Dict[str, int] = {}
+        postings: Dict[str, List[int]] = defaultdict(list)
+        phonetic: Dict[str, List[int]] = defaultdict(list)
+        for alias, target, is_known in entries:
+            compact = compact_name(alias)
+            if not compact or compact in exact:
+                continue
+            index = len(alias_list)
+            alias_list.append(alias)
+            targets.append(target)
+            lengths.append(len(compact))
+            known.append(is_known)
+            grams = set(trigrams(compact))
+            counts.append(len(grams))
+            exact[compact] = index
+            for gram in grams:
+                postings[gram].append(index)
+            phonetic[phonetic_key(compact)].append(index)
+
+        self._aliases, self._targets, self._trigram_counts = alias_list, targets, counts
+        self._lengths, self._known = lengths, known
+        self._exact, self._postings, self._phonetic = exact, dict(postings), dict(phonetic)
+        self.source_version = source_version
+
+    def match(self, text: str) -> Optional[AppMatch]:
+        """Return the best candidate scoring at least threshold, or None"""
+        compact = compact_name(text)
+        if not compact:
+            return None
+
+        index = self._exact.get(compact)
+        if index is not None:
+            return AppMatch(self._aliases[index], self._targets[index], 1.0, self._known[index])
+
+        grams = set(trigrams(compact))
+        overlaps: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self._postings.get(gram, ()):
+                overlaps[candidate] += 1
+
+        sounds_alike = set(self._phonetic.get(phonetic_key(compact), ()))
+        scores: Dict[int, float] = {}
+        for candidate, shared in overlaps.items():
+            score = 2.0 * shared / (len(grams) + self._trigram_counts[candidate])
+            shorter, longer = sorted((len(compact), self._lengths[candidate]))
+            # Similar length: the shorter name has at least 3/4 of the letters
+            if candidate in sounds_alike and score >= self.phonetic_overlap and 4 * shorter >= 3 * longer:
+                score = max(score, self.phonetic_score)
+            if not self._known[candidate]:
+                score *= self.executable_weight
+            scores[candidate] = score
+
+        if not scores:
+            return None
+        best = max(scores, key=scores.get)
+        if scores[best] < self.threshold:
+            return None
+        return AppMatch(self._aliases[best], self._targets[best], round(scores[best], 3), self._known[best])
+
+    def learn(self, text: str, target: str) -> None:
+        """Remember text as an alias of target and persist it"""
+        alias = text.lower().strip()
+        compact = compact_name(alias)
+        if not compact or self.learned.get(alias) == target:
+            return
+        self.learned[alias] = target
+        if compact not in self._exact:
+            self._exact[compact] = len(self._aliases)
+            self._aliases.append(alias)
+            self._targets.append(target)
+            self._trigram_counts.append(len(set(trigrams(compact))))
+            self._lengths.append(len(compact))
+            self._known.append(True)
+            # Exact hits only until the next build adds its trigrams
+        self._save_learned()
+
+    def _load_learned(self) -> Dict[str, str]:
+        if not self.learned_path or not os.path.exists(self.learned_path):
+            return {}
+        try:
+            with open(self.learned_path, encoding="utf-8") as f:
+                return dict(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read learned aliases from {self.learned_path}: {e}")
+            return {}
+
+    def _save_learned(self) -> None:
+        if not self.learned_path:
+            return
+        try:
+            directory = os.path.dirname(self.learned_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.learned_path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.learned, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.learned_path)
+        except OSError as e:
+            logger.warning(f"Could not save learned aliases to {self.learned_path}: {e}")
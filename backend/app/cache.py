@@ -0,0 +1,200 @@
+"""
+Response cache for LLM answers
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+    from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry bookkeeping overhead (dataclass, dict slot, key string)
+ENTRY_OVERHEAD_BYTES = 256
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop surrounding punctuation"""
+    normalized = re.sub(r'\s+', ' ', question.lower()).strip()
+    return normalized.strip(' .!?,;:')
+
+
+def fingerprint(text: str) -> str:
+    """Short stable hash of a string"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class CacheEntry:
+    """A cached answer and the data needed to evict or match it"""
+    partition: str
+    response: str
+    expires_at: float
+    size: int
+    embedding: Optional["np.ndarray"] = None
+
+
+class ResponseCache:
+    """Two-tier LLM response cache with LRU, TTL and memory-cap eviction
+
+    The exact tier is keyed by model, system prompt, normalised question and
+    a fingerprint of the chat history. The optional semantic tier returns the
+    answer of a cached question from the same model/prompt/history partition
+    whose embedding has cosine similarity of at least
+    ``similarity_threshold`` with the new question. It is enabled by passing
+    ``embedder_factory``, which is called on a worker thread on first use
+    (or by ``warm_up``) so the embedding backend is not loaded at import
+    time or on the event loop.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float, similarity_threshold: float,
+                 embedder_factory: Optional[Callable[[], "Embeddings"]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.embedder_factory = embedder_factory
+        self._embedder: Optional["Embeddings"] = None
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.size_bytes = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def load_embedder(self) -> Optional["Embeddings"]:
+        """Embedding backend of the semantic tier, or None when disabled"""
+        if self._embedder is None and self.embedder_factory is not None:
+            self._embedder = await asyncio.to_thread(self.embedder_factory)
+        return self._embedder
+
+    async def warm_up(self) -> None:
+        """Build the embedding backend in the background; failures are logged, not raised"""
+        try:
+            await self.load_embedder()
+        except Exception as e:
+            logger.warning(f"Semantic cache warm-up failed: {e}")
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, question: str, chat_history: str) -> Tuple[str, str]:
+        """Return (key, partition) for a request"""
+        partition = f"{model}:{fingerprint(system_prompt)}:{fingerprint(chat_history.strip())}"
+        return f"{partition}:{fingerprint(normalize_question(question))}", partition
+
+    async def lookup(self, model: str, system_prompt: str, question: str,
+                     chat_history: str = "") -> Tuple[Optional[str], Optional[str]]:
+        """Return (response, tier) for a cached answer, or (None, None)"""
+        key, partition = self.make_key(model, system_prompt, question, chat_history)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry.response, "exact"
+            self._remove(key)
+
+        if self.embedder_factory is not None:
+            response = await self._semantic_lookup(partition, question)
+            if response is not None:
+                self.semantic_hits += 1
+                return response, "semantic"
+
+        self.misses += 1
+        return None, None
+
+    async def store(self, model: str, system_prompt: str, question: str,
+                    response: str, chat_history: str = "") -> None:
+        """Cache an answer, evicting old entries to stay within the caps"""
+        key, partition = self.make_key(model, system_prompt, question, chat_history)
+        embedding = await self._embed(question) if self.embedder_factory is not None else None
+
+        size = ENTRY_OVERHEAD_BYTES + len(key) + sys.getsizeof(response)
+        if embedding is not None:
+            size += embedding.nbytes
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = CacheEntry(partition, response, time.time() + self.ttl, size, embedding)
+        self.size_bytes += size
+
+        while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def _semantic_lookup(self, partition: str, question: str) -> Optional[str]:
+        import numpy as np
+
+        if not self._candidates(partition):
+            return None
+        query = await self._embed(question)
+        if query is None:
+            return None
+        # Entries may have been stored, evicted or cleared while embedding
+        candidates = self._candidates(partition)
+        if not candidates:
+            return None
+        matrix = np.stack([entry.embedding for _, entry in candidates])
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        scores = matrix @ query / np.where(norms > 0, norms, 1.0)
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+
+        key, entry = candidates[best]
+        self._entries.move_to_end(key)
+        return entry.response
+
+    def _candidates(self, partition: str) -> List[Tuple[str, CacheEntry]]:
+        """Unexpired entries of partition that have an embedding"""
+        now = time.time()
+        return [(key, entry) for key, entry in self._entries.items()
+                if entry.partition == partition and entry.embedding is not None and entry.expires_at > now]
+
+    async def _embed(self, question: str) -> Optional["np.ndarray"]:
+        import numpy as np
+
+        # The semantic tier is best effort; an unavailable embedding backend
+        # only disables it for this request
+        try:
+            embedder = await self.load_embedder()
+            vector = await embedder.aembed_query(normalize_question(question))
+        except Exception:
+            return None
+        return np.asarray(vector, dtype=np.float32)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self.size_bytes -= entry.size
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)"""
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and occupancy"""
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 3) if lookups else 0.0,
+            "semantic_enabled": self.embedder_factory is not None,
+        }
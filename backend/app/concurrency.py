@@ -0,0 +1,242 @@
+"""
+Concurrency control for the LLM backend
+"""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional
+
+from .exceptions import LLMBusyError
+
+
+class ConcurrencyGate:
+    """Limit concurrent LLM generations with a bounded wait queue
+
+    At most ``max_concurrency`` callers hold a slot at a time. Up to
+    ``max_queue`` further callers wait in FIFO order for at most
+    ``queue_timeout`` seconds. Anything beyond that fails fast with
+    LLMBusyError (429 when the queue is full, 503 when the wait times out)
+    so cheap endpoints never pile up behind the model.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float, retry_after: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        """Number of callers currently queued for a slot"""
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the queue if necessary"""
+        if self.active < self.max_concurrency and not self.waiting:
+            self.active += 1
+            return
+
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise LLMBusyError(429, "LLM queue is full", self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot directly to the waiter, so active is
+            # not incremented here
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise LLMBusyError(503, "Timed out waiting for the LLM", self.retry_after) from None
+            raise
+
+    def try_acquire(self, count: int) -> int:
+        """Take up to count free slots without waiting and return how many were taken"""
+        if self.waiting:
+            return 0
+        taken = max(0, min(count, self.max_concurrency - self.active))
+        self.active += taken
+        return taken
+
+    def release(self) -> None:
+        """Return a slot, handing it to the oldest waiter if there is one"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active = max(0, self.active - 1)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict:
+        """Current gate occupancy and rejection counters"""
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+class _SharedCall:
+    """An in-flight coalesced call and the number of callers awaiting it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _Broadcast:
+    """Fan a single frame stream out to any number of subscribers
+
+    Frames are buffered so late subscribers replay the stream from the
+    start. The upstream pump is cancelled when the last subscriber leaves
+    before the stream has finished.
+    """
+
+    def __init__(self, source: AsyncIterator[Dict]):
+        self.frames: List[Dict] = []
+        self.done = False
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[Dict]) -> None:
+        try:
+            async for frame in source:
+                self.frames.append(frame)
+                self._notify()
+        finally:
+            self.done = True
+            self._notify()
+            await source.aclose()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[Dict]:
+        """Yield every frame of the shared stream, buffered ones first"""
+        self.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(self.frames):
+                    yield self.frames[index]
+                    index += 1
+                if self.done:
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                self.task.cancel()
+
+
+class SingleFlight:
+    """Coalesce concurrent identical requests into one upstream execution
+
+    Callers passing the same key while a call is in flight share its
+    result (run) or its frame stream (stream). A caller that goes away only
+    cancels the upstream work when it was the last one waiting for it.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _SharedCall] = {}
+        self._streams: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Number of distinct upstream executions currently running"""
+        return len(self._calls) + len(self._streams)
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Await factory() once per key, sharing the result with duplicates"""
+        call = self._calls.get(key)
+        if call is None:
+            call = _SharedCall(asyncio.ensure_future(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(self._calls, key, call))
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    async def stream(self, key: str, open_source: Callable[[], Awaitable[AsyncIterator[Dict]]]) -> AsyncIterator[Dict]:
+        """Return a subscription to the shared frame stream for key
+
+        open_source() is awaited by the first caller only; if it raises (for
+        example LLMBusyError from the gate) callers already waiting on the
+        same key get the same error.
+        """
+        while True:
+            entry = self._streams.get(key)
+            if entry is None:
+                return await self._start_stream(key, open_source)
+
+            self.coalesced += 1
+            try:
+                broadcast = await asyncio.shield(entry)
+            except asyncio.CancelledError:
+                if entry.cancelled():
+                    # The first caller went away before the stream opened;
+                    # try again as the new first caller
+                    self.coalesced -= 1
+                    continue
+                raise
+            return broadcast.subscribe()
+
+    async def _start_stream(self, key: str, open_source: Callable[[], Awaitable[AsyncIterator[Dict]]]) -> AsyncIterator[Dict]:
+        entry = asyncio.get_running_loop().create_future()
+        # Mark errors as retrieved so an unshared failure is not logged
+        entry.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._streams[key] = entry
+        try:
+            broadcast = _Broadcast(await open_source())
+        except BaseException as e:
+            self._forget(self._streams, key, entry)
+            if isinstance(e, Exception):
+                entry.set_exception(e)
+            else:
+                entry.cancel()
+            raise
+
+        entry.set_result(broadcast)
+        broadcast.task.add_done_callback(lambda _: self._forget(self._streams, key, entry))
+        return broadcast.subscribe()
+
+    @staticmethod
+    def _forget(registry: Dict[str, Any], key: str, value: Optional[Any]) -> None:
+        if registry.get(key) is value:
+            del registry[key]
@@ -48,9 +48,157 @@ COMMON_APPS: Dict[str, str] = {
     'git': 'git',
 }
 
+# Spoken or alternative names for COMMON_APPS entries, used by fuzzy matching
+APP_ALIASES: Dict[str, str] = {
+    'google chrome': 'chrome',
+    'mozilla firefox': 'firefox',
+    'microsoft edge': 'edge',
+    'microsoft word': 'word',
+    'ms word': 'word',
+    'microsoft excel': 'excel',
+    'power point': 'powerpoint',
+    'microsoft outlook': 'outlook',
+    'visual studio code': 'vscode',
+    'code': 'vscode',
+    'notepad plus plus': 'notepad++',
+    'sublime text': 'sublime',
+    'vlc player': 'vlc',
+    'calc': 'calculator',
+    'ms paint': 'paint',
+    'command prompt': 'cmd',
+    'windows explorer': 'file explorer',
+    'this pc': 'my pc',
+}
+# Minimum fuzzy match score (0-1) for launching a misheard app name
+APP_MATCH_THRESHOLD = float(os.getenv("APP_MATCH_THRESHOLD", "0.7"))
+# Fuzzy matches scoring at least this are learned as aliases
+APP_CONFIDENT_MATCH_SCORE = float(os.getenv("APP_CONFIDENT_MATCH_SCORE", "0.85"))
+# JSON file where aliases learned from successful fuzzy launches are kept
+APP_LEARNED_ALIASES_PATH = os.path.expanduser(
+    os.getenv("APP_LEARNED_ALIASES_PATH", "~/.app_launcher/learned_aliases.json")
+)
+
+# Intent fast path: launch/list/health commands sent to /llm run without the LLM
+INTENT_FAST_PATH_ENABLED = os.getenv("INTENT_FAST_PATH_ENABLED", "true").lower() == "true"
+# Longer prompts skip the command patterns and go straight to the LLM
+INTENT_MAX_WORDS = int(os.getenv("INTENT_MAX_WORDS", "8"))
+
+# Extra directories searched for executables besides PATH (os.pathsep-separated)
+APP_DIRECTORIES = [d for d in os.getenv("APP_DIRECTORIES", "").split(os.pathsep) if d]
+# Seconds between background refreshes of the executable index
+APP_INDEX_REFRESH_INTERVAL = float(os.getenv("APP_INDEX_REFRESH_INTERVAL", "30"))
+
+# Speech-to-text for the voice pipeline (defaults to the STT server's model)
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "vosk-model-en"
+)
+# Decoder threads; Vosk releases the GIL, so these decode in parallel
+SPEECH_MAX_WORKERS = int(os.getenv("SPEECH_MAX_WORKERS", "2"))
+SPEECH_SAMPLE_RATE = int(os.getenv("SPEECH_SAMPLE_RATE", "16000"))
+# Sample rates accepted for uploaded audio
+SPEECH_MIN_SAMPLE_RATE = 8000
+SPEECH_MAX_SAMPLE_RATE = 48000
+SPEECH_MAX_AUDIO_BYTES = int(os.getenv("SPEECH_MAX_AUDIO_BYTES", str(10 * 1024 * 1024)))
+# Load the Vosk model in the background at startup
+SPEECH_PREWARM = os.getenv("SPEECH_PREWARM", "true").lower() == "true"
+
 # Server Configuration
 HOST = "0.0.0.0"
 PORT = 8000
 
 # LLM Configuration
-LLM_SYSTEM_PROMPT = "You are a my personal helpful assistant. Please respond to the question asked in simple and concise manner. Maintain context from previous messages. Use clear, concise formatting with proper paragraph breaks (single newline between paragraphs). Avoid excessive newlines or spacing." 
\ No newline at end of file
+LLM_SYSTEM_PROMPT = "You are a my personal helpful assistant. Please respond to the question asked in simple and concise manner. Maintain context from previous messages. Use clear, concise formatting with proper paragraph breaks (single newline between paragraphs). Avoid excessive newlines or spacing."
+
+# LLM concurrency limits (Ollama serves a small number of generations at once)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "1"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "8"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+LLM_RETRY_AFTER = int(os.getenv("LLM_RETRY_AFTER", "5"))
+
+# Ollama Configuration
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+# Reuse the KV context Ollama returns so session turns only prefill the new message
+OLLAMA_REUSE_CONTEXT = os.getenv("OLLAMA_REUSE_CONTEXT", "false").lower() == "true"
+
+# Conversation sessions
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "2048"))
+SESSION_SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", "256"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "100"))
+
+# Embeddings ("ollama" or the offline "hashing" backend)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "ollama")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "256"))
+
+# Retrieval over local documents, injected into the LLM prompt
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "false").lower() == "true"
+RETRIEVAL_INDEX_DIR = os.path.expanduser(os.getenv("RETRIEVAL_INDEX_DIR", "~/.app_launcher/retrieval"))
+# Files and directories indexed by POST /retrieval/ingest when it names none (os.pathsep-separated)
+RETRIEVAL_SOURCES = [d for d in os.getenv("RETRIEVAL_SOURCES", "").split(os.pathsep) if d]
+# Poll RETRIEVAL_SOURCES every RETRIEVAL_WATCH_INTERVAL seconds and ingest
+# changes once they have stayed the same for RETRIEVAL_WATCH_DEBOUNCE seconds
+RETRIEVAL_WATCH = os.getenv("RETRIEVAL_WATCH", "false").lower() == "true"
+RETRIEVAL_WATCH_INTERVAL = float(os.getenv("RETRIEVAL_WATCH_INTERVAL", "10"))
+RETRIEVAL_WATCH_DEBOUNCE = float(os.getenv("RETRIEVAL_WATCH_DEBOUNCE", "2"))
+# Finished ingest jobs kept for GET /retrieval/jobs
+RETRIEVAL_JOB_HISTORY = int(os.getenv("RETRIEVAL_JOB_HISTORY", "20"))
+RETRIEVAL_EXTENSIONS = [
+    e.strip().lower() for e in os.getenv("RETRIEVAL_EXTENSIONS", ".txt,.md,.rst,.org,.csv,.json,.py").split(",") if e.strip()
+]
+# Stored vector precision ("int8" or "float16"), rows per on-disk segment and
+# segment count above which segments are compacted in the background.
+# int8 is a quarter of float32 and the fastest to score; float16 keeps more
+# precision but each search pays for converting the rows back to float32
+RETRIEVAL_VECTOR_DTYPE = os.getenv("RETRIEVAL_VECTOR_DTYPE", "int8")
+RETRIEVAL_SEGMENT_ROWS = int(os.getenv("RETRIEVAL_SEGMENT_ROWS", "8192"))
+RETRIEVAL_MAX_SEGMENTS = int(os.getenv("RETRIEVAL_MAX_SEGMENTS", "8"))
+# "ivf" searches only the RETRIEVAL_IVF_NPROBE nearest of RETRIEVAL_IVF_LISTS
+# k-means clusters (0 = about sqrt(chunks)) once the index holds
+# RETRIEVAL_IVF_MIN_CHUNKS chunks; "flat" always compares against every chunk
+RETRIEVAL_INDEX_TYPE = os.getenv("RETRIEVAL_INDEX_TYPE", "flat")
+RETRIEVAL_IVF_LISTS = int(os.getenv("RETRIEVAL_IVF_LISTS", "0"))
+RETRIEVAL_IVF_NPROBE = int(os.getenv("RETRIEVAL_IVF_NPROBE", "16"))
+RETRIEVAL_IVF_MIN_CHUNKS = int(os.getenv("RETRIEVAL_IVF_MIN_CHUNKS", "50000"))
+RETRIEVAL_CHUNK_WORDS = int(os.getenv("RETRIEVAL_CHUNK_WORDS", "200"))
+RETRIEVAL_CHUNK_OVERLAP = int(os.getenv("RETRIEVAL_CHUNK_OVERLAP", "40"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+# Chunks less similar than this to the question are left out of the prompt
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0.3"))
+RETRIEVAL_MAX_CONTEXT_CHARS = int(os.getenv("RETRIEVAL_MAX_CONTEXT_CHARS", "3000"))
+# Also rank chunks by BM25 keyword match and merge both rankings with
+# reciprocal rank fusion (RETRIEVAL_RRF_K damps the weight of top ranks)
+RETRIEVAL_HYBRID = os.getenv("RETRIEVAL_HYBRID", "true").lower() == "true"
+RETRIEVAL_RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+# Keyword hits with a lower BM25 score are left out, as RETRIEVAL_MIN_SCORE
+# does for dense hits; matching only words found in most chunks scores below 0.5
+RETRIEVAL_MIN_KEYWORD_SCORE = float(os.getenv("RETRIEVAL_MIN_KEYWORD_SCORE", "0.5"))
+
+# LLM response cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "false").lower() == "true"
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0.92"))
+
+# Model selection. LLMRequest.model defaults to LLM_DEFAULT_MODEL; the model
+# name "auto" is routed to the small or large model by prompt size and
+# complexity when LLM_ROUTING_ENABLED is set (and to the large model otherwise)
+LLM_DEFAULT_MODEL = os.getenv("LLM_DEFAULT_MODEL", "gemma3")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+LLM_PREWARM_MODELS = [m.strip() for m in os.getenv("LLM_PREWARM_MODELS", "gemma3").split(",") if m.strip()]
+LLM_ROUTING_ENABLED = os.getenv("LLM_ROUTING_ENABLED", "false").lower() == "true"
+LLM_ROUTE_SMALL_MODEL = os.getenv("LLM_ROUTE_SMALL_MODEL", "gemma3:1b")
+LLM_ROUTE_LARGE_MODEL = os.getenv("LLM_ROUTE_LARGE_MODEL", "gemma3")
+LLM_ROUTE_MAX_WORDS = int(os.getenv("LLM_ROUTE_MAX_WORDS", "12"))
+LLM_ROUTE_MAX_HISTORY_CHARS = int(os.getenv("LLM_ROUTE_MAX_HISTORY_CHARS", "2000"))
+LLM_ROUTE_COMPLEX_PATTERN = os.getenv(
+    "LLM_ROUTE_COMPLEX_PATTERN",
+    r"\b(explain|compare|why|analy[sz]e|summari[sz]e|write|code|debug|step by step|difference|pros and cons)\b"
+)
+
+# Batch LLM endpoint
+LLM_BATCH_MAX_ITEMS = int(os.getenv("LLM_BATCH_MAX_ITEMS", "64"))
+LLM_BATCH_PARALLELISM = int(os.getenv("LLM_BATCH_PARALLELISM", "2"))
+LLM_BATCH_MAX_PARALLELISM = int(os.getenv("LLM_BATCH_MAX_PARALLELISM", "8"))
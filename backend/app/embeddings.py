@@ -0,0 +1,66 @@
+"""
+Text embedding backends
+"""
+
+import re
+import zlib
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .config import EMBEDDING_BACKEND, EMBEDDING_DIM, EMBEDDING_MODEL, OLLAMA_BASE_URL
+
+
+class HashingEmbedder(Embeddings):
+    """Deterministic feature-hashing embedder
+
+    Hashes words and character trigrams into a fixed number of signed
+    buckets. Needs no model download and runs in microseconds, which makes
+    it useful offline, in tests and in benchmarks; quality is lexical only.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r'\w+', text.lower())
+        features = list(words)
+        for word in words:
+            padded = f" {word} "
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into an L2-normalised float32 matrix"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                matrix[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+
+@lru_cache(maxsize=1)
+def get_embedder() -> Embeddings:
+    """Return the configured embedding backend (built once)"""
+    if EMBEDDING_BACKEND == "hashing":
+        return HashingEmbedder(EMBEDDING_DIM)
+
+    from langchain_ollama import OllamaEmbeddings
+    return OllamaEmbeddings(model=EMBEDDING_MODEL, base_url=OLLAMA_BASE_URL)
@@ -20,4 +20,68 @@ class AppLaunchError(HTTPException):
         super().__init__(
             status_code=500,
             detail=f"Error launching '{app_name}': {error}"
-        ) 
\ No newline at end of file
+        )
+
+
+class LLMBusyError(HTTPException):
+    """Raised when the LLM backend is saturated"""
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(
+            status_code=status_code,
+            detail=f"LLM is busy: {reason}. Retry after {retry_after}s",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class SessionNotFoundError(HTTPException):
+    """Raised when a conversation session does not exist or has expired"""
+    def __init__(self, session_id: str):
+        super().__init__(
+            status_code=404,
+            detail=f"Session '{session_id}' not found"
+        )
+
+
+class AudioDecodeError(HTTPException):
+    """Raised when uploaded audio cannot be read"""
+    def __init__(self, reason: str):
+        super().__init__(
+            status_code=400,
+            detail=reason
+        )
+
+
+class AudioTooLargeError(HTTPException):
+    """Raised when uploaded audio exceeds the size limit"""
+    def __init__(self, size: int, limit: int):
+        super().__init__(
+            status_code=413,
+            detail=f"Audio is {size} bytes; the limit is {limit}"
+        )
+
+
+class SpeechUnavailableError(HTTPException):
+    """Raised when speech recognition is not available (e.g. model missing)"""
+    def __init__(self, reason: str):
+        super().__init__(
+            status_code=503,
+            detail=reason
+        )
+
+
+class IngestJobNotFoundError(HTTPException):
+    """Raised when an ingest job does not exist or has been forgotten"""
+    def __init__(self, job_id: str):
+        super().__init__(
+            status_code=404,
+            detail=f"Ingest job '{job_id}' not found"
+        )
+
+
+class NoDocumentSourcesError(HTTPException):
+    """Raised when an ingest names no paths and RETRIEVAL_SOURCES is empty"""
+    def __init__(self):
+        super().__init__(
+            status_code=400,
+            detail="No paths given and RETRIEVAL_SOURCES is not set"
+        )
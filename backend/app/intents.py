@@ -0,0 +1,116 @@
+"""
+Rule-based intent classification in front of the LLM
+"""
+
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Container, Optional
+
+from .app_matcher import AppMatch
+
+INTENT_OPEN_APP = "open_app"
+INTENT_LIST_APPS = "list_apps"
+INTENT_HEALTH = "health"
+INTENT_LLM = "llm"
+INTENT_NONE = "none"
+
+# Intents executed directly instead of asking the LLM
+COMMAND_INTENTS = (INTENT_OPEN_APP, INTENT_LIST_APPS, INTENT_HEALTH)
+
+# Politeness around a command: "hey assistant, please ... for me"
+_PREFIX = r"(?:(?:hey|ok|okay)\s+\w+[,\s]+)?(?:(?:please|can\s+you|could\s+you|would\s+you|will\s+you|kindly)\s+)*"
+_SUFFIX = r"(?:\s+(?:please|for\s+me|now))*[\s.!?]*"
+
+LAUNCH_PATTERN = re.compile(
+    rf"^{_PREFIX}(?:open|launch|start|run|fire\s+up|bring\s+up)\s+(?:up\s+)?(?:the\s+|my\s+)?"
+    rf"(?P<app>.+?)(?:\s+(?:app|application|program))?{_SUFFIX}$",
+    re.IGNORECASE,
+)
+LIST_PATTERN = re.compile(
+    rf"^{_PREFIX}(?:(?:list|show)(?:\s+me)?(?:\s+(?:all|the|my))*(?:\s+available)?\s+(?:apps|applications|programs)"
+    rf"|what\s+(?:apps|applications|programs)\s+(?:can\s+you\s+open|are\s+(?:there|available|installed))){_SUFFIX}$",
+    re.IGNORECASE,
+)
+HEALTH_PATTERN = re.compile(
+    rf"^{_PREFIX}(?:health(?:\s+check)?|(?:system\s+)?status|are\s+you\s+(?:ok|okay|alive|up|running|working)){_SUFFIX}$",
+    re.IGNORECASE,
+)
+URL_PATTERN = re.compile(r"^https?://\S+$", re.IGNORECASE)
+
+# Longest bare app name ("visual studio code") checked without a launch verb
+BARE_NAME_MAX_WORDS = 3
+
+
+@dataclass
+class Intent:
+    """What a prompt or transcript asks for"""
+    name: str
+    app_name: Optional[str] = None
+    matched_name: Optional[str] = None
+    match_score: Optional[float] = None
+    classification_time_us: float = 0.0
+
+    @property
+    def is_command(self) -> bool:
+        return self.name in COMMAND_INTENTS
+
+
+class IntentClassifier:
+    """Anchored command patterns checked before any LLM call
+
+    Patterns are compiled once at import and anchored at both ends, so a
+    prompt is rejected after a few character comparisons unless the whole
+    text is a command. A launch verb only counts when its object is a URL
+    or resolves through ``match_app`` (the fuzzy app-name index) to a
+    configured app or alias, or to an executable with a score of at least
+    ``confident_score``; "start a story about dragons" or "run the tests"
+    stay on the LLM path even with a "test" binary on PATH. A bare app name of
+    up to BARE_NAME_MAX_WORDS words counts as a launch when it exactly
+    names one of ``common_apps`` (or an alias of one); executables found on
+    PATH need a launch verb. Prompts
+    longer than ``max_words`` go straight to the LLM.
+    """
+
+    def __init__(self, match_app: Callable[[str], Optional[AppMatch]], common_apps: Container[str],
+                 max_words: int = 8, confident_score: float = 0.85):
+        self.match_app = match_app
+        self.common_apps = common_apps
+        self.max_words = max_words
+        self.confident_score = confident_score
+
+    def classify(self, text: str) -> Intent:
+        """Classify text and record how long it took"""
+        start = time.perf_counter()
+        intent = self._classify(text.strip())
+        intent.classification_time_us = round((time.perf_counter() - start) * 1e6, 1)
+        return intent
+
+    def _classify(self, text: str) -> Intent:
+        if not text:
+            return Intent(INTENT_NONE)
+        words = len(text.split())
+        if words > self.max_words:
+            return Intent(INTENT_LLM)
+        if LIST_PATTERN.match(text):
+            return Intent(INTENT_LIST_APPS)
+        if HEALTH_PATTERN.match(text):
+            return Intent(INTENT_HEALTH)
+
+        launch = LAUNCH_PATTERN.match(text)
+        if launch:
+            app_name = launch.group("app")
+            if URL_PATTERN.match(app_name):
+                return Intent(INTENT_OPEN_APP, app_name)
+            match = self.match_app(app_name)
+            if match and (match.known or match.score >= self.confident_score):
+                return Intent(INTENT_OPEN_APP, app_name, match.target, match.score)
+            return Intent(INTENT_LLM)
+
+        if words > BARE_NAME_MAX_WORDS or text.endswith("?"):
+            return Intent(INTENT_LLM)
+        app_name = text.rstrip(".!")
+        match = self.match_app(app_name)
+        if match and match.score == 1.0 and match.target in self.common_apps:
+            return Intent(INTENT_OPEN_APP, app_name, match.target, match.score)
+        return Intent(INTENT_LLM)
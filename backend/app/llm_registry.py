@@ -0,0 +1,157 @@
+"""
+Per-model LLM chains and prompt-based model routing
+
+The langchain/ollama stack is imported on first use (or by warm_up) rather
+than at module import, so starting the API does not pay for it.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.runnables import Runnable
+
+logger = logging.getLogger(__name__)
+
+# Model name that asks the router to pick a model for the prompt
+AUTO_MODEL = "auto"
+
+
+class ModelRegistry:
+    """Lazily build and cache one chain per Ollama model name
+
+    Every chain shares the prompt template and output parser and asks
+    Ollama to keep its model loaded for ``keep_alive``, so switching between
+    a handful of models does not pay a reload on every request.
+    """
+
+    def __init__(self, system_prompt: str, user_template: str, base_url: str, keep_alive: str):
+        self.system_prompt = system_prompt
+        self.user_template = user_template
+        self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.ready = False
+        self.warmup_time: Optional[float] = None
+        self.warmup_error: Optional[str] = None
+        self._prompt: Optional["ChatPromptTemplate"] = None
+        self._client = None
+        self._chains: Dict[str, "Runnable"] = {}
+
+    @property
+    def models(self) -> List[str]:
+        """Names of models with a built chain"""
+        return sorted(self._chains)
+
+    @property
+    def prompt(self) -> "ChatPromptTemplate":
+        """Chat prompt template shared by all chains"""
+        if self._prompt is None:
+            from langchain_core.prompts import ChatPromptTemplate
+
+            self._prompt = ChatPromptTemplate.from_messages([
+                ("system", self.system_prompt),
+                ("user", self.user_template),
+            ])
+        return self._prompt
+
+    @property
+    def client(self):
+        """Raw Ollama client, for calls the chain does not expose"""
+        if self._client is None:
+            from ollama import AsyncClient
+
+            self._client = AsyncClient(host=self.base_url)
+        return self._client
+
+    def get_chain(self, model: str) -> "Runnable":
+        """Return the chain for model, building it on first use"""
+        chain = self._chains.get(model)
+        if chain is None:
+            from langchain_core.output_parsers import StrOutputParser
+            from langchain_ollama import OllamaLLM
+
+            llm = OllamaLLM(model=model, base_url=self.base_url, keep_alive=self.keep_alive)
+            chain = self.prompt | llm | StrOutputParser()
+            self._chains[model] = chain
+        return chain
+
+    async def warm_up(self, models: List[str]) -> None:
+        """Import the LLM stack, build chains and load models into Ollama
+
+        Runs as a background task after the server starts. Imports and chain
+        construction happen in a worker thread so the event loop keeps
+        serving; an empty generate request then makes Ollama load each model
+        and keep it resident for keep_alive. Prewarm failures (for example
+        Ollama not running) are logged and do not keep the registry from
+        becoming ready.
+        """
+        start_time = time.time()
+
+        def build():
+            for model in models:
+                self.get_chain(model)
+            return self.client
+
+        try:
+            await asyncio.to_thread(build)
+        except Exception as e:
+            self.warmup_error = str(e)
+            logger.warning(f"LLM warm-up failed: {e}")
+            return
+
+        for model in models:
+            try:
+                await self.client.generate(model=model, prompt="", keep_alive=self.keep_alive)
+                logger.info(f"Prewarmed model {model}")
+            except Exception as e:
+                self.warmup_error = f"{model}: {e}"
+                logger.warning(f"Could not prewarm model {model}: {e}")
+
+        self.warmup_time = round(time.time() - start_time, 3)
+        self.ready = True
+
+
+class ModelRouter:
+    """Pick a small or large model for a prompt from simple rules
+
+    A question goes to ``small_model`` when it has at most ``max_words``
+    words, the chat history is at most ``max_history_chars`` long and it
+    does not match ``complex_pattern``; everything else goes to
+    ``large_model``.
+    """
+
+    def __init__(self, small_model: str, large_model: str, max_words: int,
+                 max_history_chars: int, complex_pattern: str):
+        self.small_model = small_model
+        self.large_model = large_model
+        self.max_words = max_words
+        self.max_history_chars = max_history_chars
+        self.complex_pattern = re.compile(complex_pattern, re.IGNORECASE) if complex_pattern else None
+
+    def route(self, question: str, chat_history: str = "") -> str:
+        """Return the model name for the question"""
+        if len(question.split()) > self.max_words:
+            return self.large_model
+        if len(chat_history) > self.max_history_chars:
+            return self.large_model
+        if self.complex_pattern is not None and self.complex_pattern.search(question):
+            return self.large_model
+        return self.small_model
+
+
+def resolve_model(router: Optional[ModelRouter], fallback_model: str, model: str,
+                  question: str, chat_history: str = "") -> str:
+    """Turn the requested model name into the model to run
+
+    "auto" is routed by prompt when routing is enabled and falls back to
+    fallback_model otherwise; any other name is used as is.
+    """
+    if model != AUTO_MODEL:
+        return model
+    if router is None:
+        return fallback_model
+    return router.route(question, chat_history)
@@ -2,18 +2,51 @@
 Main FastAPI application
 """
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .config import API_TITLE, API_DESCRIPTION, API_VERSION
-from .routers import apps
+from .config import (
+    API_TITLE, API_DESCRIPTION, API_VERSION, LLM_PREWARM_MODELS, APP_INDEX_REFRESH_INTERVAL, SPEECH_PREWARM,
+    RETRIEVAL_WATCH, RETRIEVAL_SOURCES, RETRIEVAL_WATCH_INTERVAL, RETRIEVAL_WATCH_DEBOUNCE,
+)
+from .routers import apps, pipeline, retrieval, sessions
 from .middleware import log_requests
+from .services import app_index, model_registry, response_cache, speech_recognizer, watch_documents
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background work that must not delay serving
+
+    Warms up the LLM stack, the speech model and the semantic cache's
+    embedder, and keeps the executable
+    index fresh (and, with RETRIEVAL_WATCH, the document index).
+    """
+    tasks = [
+        asyncio.create_task(model_registry.warm_up(LLM_PREWARM_MODELS)),
+        asyncio.create_task(app_index.refresh_periodically(APP_INDEX_REFRESH_INTERVAL)),
+        asyncio.create_task(response_cache.warm_up()),
+    ]
+    if SPEECH_PREWARM:
+        tasks.append(asyncio.create_task(speech_recognizer.warm_up()))
+    if RETRIEVAL_WATCH and RETRIEVAL_SOURCES:
+        tasks.append(asyncio.create_task(
+            watch_documents(RETRIEVAL_SOURCES, RETRIEVAL_WATCH_INTERVAL, RETRIEVAL_WATCH_DEBOUNCE)
+        ))
+    yield
+    for task in tasks:
+        task.cancel()
+
 
 # Create FastAPI app instance
 app = FastAPI(
     title=API_TITLE,
     description=API_DESCRIPTION,
-    version=API_VERSION
+    version=API_VERSION,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -29,4 +62,7 @@ app.add_middleware(
 app.middleware("http")(log_requests)
 
 # Include routers
-app.include_router(apps.router, tags=["apps"]) 
\ No newline at end of file
+app.include_router(apps.router, tags=["apps"])
+app.include_router(sessions.router, tags=["sessions"])
+app.include_router(pipeline.router, tags=["pipeline"])
+app.include_router(retrieval.router, tags=["retrieval"]) 
\ No newline at end of file
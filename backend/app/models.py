@@ -3,7 +3,9 @@ Pydantic models for the App Launcher API
 """
 
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from .config import LLM_BATCH_MAX_ITEMS, LLM_DEFAULT_MODEL
 
 
 class AppResponse(BaseModel):
@@ -12,6 +14,8 @@ class AppResponse(BaseModel):
     message: str
     app_name: str
     app_path: Optional[str] = None
+    matched_name: Optional[str] = None
+    match_score: Optional[float] = None
 
 
 class HealthResponse(BaseModel):
@@ -19,12 +23,21 @@ class HealthResponse(BaseModel):
     status: str
     platform: str
     available_apps_count: int
+    llm_active: int = 0
+    llm_waiting: int = 0
+    llm_coalesced: int = 0
+    llm_ready: bool = False
+    llm_warmup_time: Optional[float] = None
+    speech_ready: bool = False
 
 
 class AppsListResponse(BaseModel):
     """Response model for listing available apps"""
     available_apps: list[str]
     total_count: int
+    resolved_apps: dict[str, str] = {}
+    aliases: dict[str, str] = {}
+    indexed_executables_count: int = 0
     note: str
 
 
@@ -38,7 +51,7 @@ class RootResponse(BaseModel):
 class LLMRequest(BaseModel):
     """Request model for LLM operations"""
     prompt: str
-    model: str = "gemma3"
+    model: str = LLM_DEFAULT_MODEL
     chat_history: str = ""
 
 
@@ -48,4 +61,210 @@ class LLMResponse(BaseModel):
     response: str
     model: str
     prompt: str
-    processing_time: Optional[float] = None 
\ No newline at end of file
+    processing_time: Optional[float] = None
+    cached: bool = False
+    cache_tier: Optional[str] = None
+    intent: Optional[str] = None
+    classification_time_us: Optional[float] = None
+    action: Optional[dict] = None
+
+
+class LLMStreamToken(BaseModel):
+    """Token frame emitted by the streaming LLM endpoint"""
+    type: str = "token"
+    content: str
+
+
+class LLMStreamFinal(LLMResponse):
+    """Final frame emitted by the streaming LLM endpoint"""
+    type: str = "final"
+    time_to_first_token: Optional[float] = None
+    chunks_per_second: Optional[float] = None
+    chunks: int = 0
+
+
+class SessionCreateRequest(BaseModel):
+    """Request model for creating a conversation session"""
+    model: str = LLM_DEFAULT_MODEL
+
+
+class SessionTurnRequest(BaseModel):
+    """Request model for a turn within a session"""
+    prompt: str
+
+
+class SessionMessage(BaseModel):
+    """A single message stored in a session"""
+    role: str
+    content: str
+
+
+class SessionResponse(BaseModel):
+    """Response model for session operations"""
+    session_id: str
+    model: str
+    created_at: float
+    updated_at: float
+    turns: list[SessionMessage]
+    summary: str
+    history_tokens: int
+
+
+class SessionTurnResponse(LLMResponse):
+    """Response model for a turn within a session"""
+    session_id: str
+    history_tokens: int
+    context_reused: bool = False
+
+
+class CacheStatsResponse(BaseModel):
+    """Response model for LLM response cache statistics"""
+    entries: int
+    size_bytes: int
+    max_bytes: int
+    exact_hits: int
+    semantic_hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+    semantic_enabled: bool
+
+
+class LLMBatchRequest(BaseModel):
+    """Request model for batch LLM operations"""
+    requests: list[LLMRequest] = Field(min_length=1, max_length=LLM_BATCH_MAX_ITEMS)
+    max_parallel: Optional[int] = Field(default=None, ge=1)
+
+
+class LLMBatchItem(LLMResponse):
+    """Result of one item of a batch LLM request"""
+    index: int
+    queue_time: Optional[float] = None
+
+
+class LLMBatchResponse(BaseModel):
+    """Response model for batch LLM operations"""
+    results: list[LLMBatchItem]
+    total_count: int
+    success_count: int
+    failure_count: int
+    processing_time: float
+
+
+class PipelineTranscriptFrame(BaseModel):
+    """First frame of a voice pipeline response"""
+    type: str = "transcript"
+    text: str
+    audio_duration: float
+    decode_time: float
+
+
+class PipelineIntentFrame(BaseModel):
+    """What the transcript was classified as"""
+    type: str = "intent"
+    intent: str
+    app_name: Optional[str] = None
+    matched_name: Optional[str] = None
+    match_score: Optional[float] = None
+    classification_time_us: float
+
+
+class PipelineActionFrame(BaseModel):
+    """Result of a launch, list or health command"""
+    type: str = "action"
+    intent: str
+    success: bool
+    message: str
+    result: dict
+
+
+class PipelineDoneFrame(BaseModel):
+    """Last frame of a voice pipeline response"""
+    type: str = "done"
+    timings_ms: dict[str, float]
+
+
+class RetrievalIngestRequest(BaseModel):
+    """Request model for indexing documents (defaults to RETRIEVAL_SOURCES)"""
+    paths: Optional[list[str]] = None
+
+
+class RetrievalIngestResponse(BaseModel):
+    """Response model for an ingest run"""
+    files: int
+    chunks: int
+    total_chunks: int
+    unchanged_files: int = 0
+    removed_files: int = 0
+    reused_chunks: int = 0
+    removed_chunks: int = 0
+    processing_time: float
+    chunks_per_second: Optional[float] = None
+
+
+class RetrievalJobResponse(BaseModel):
+    """Progress of a background ingest job"""
+    job_id: str
+    status: str
+    trigger: str
+    paths: list[str]
+    files_total: int
+    files_done: int
+    files: int
+    unchanged_files: int
+    removed_files: int
+    chunks: int
+    reused_chunks: int
+    removed_chunks: int
+    total_chunks: Optional[int] = None
+    elapsed: float
+    chunks_per_second: Optional[float] = None
+    error: Optional[str] = None
+
+
+class RetrievalJobListResponse(BaseModel):
+    """Response model for listing ingest jobs"""
+    jobs: list[RetrievalJobResponse]
+
+
+class RetrievalSearchRequest(BaseModel):
+    """Request model for searching the document index"""
+    query: str
+    k: int = Field(default=4, ge=1, le=100)
+    min_score: float = 0.0
+
+
+class RetrievedChunkResponse(BaseModel):
+    """A chunk returned by a document search"""
+    text: str
+    source: str
+    chunk: int
+    score: float  # cosine similarity, or the fused rank score with RETRIEVAL_HYBRID
+
+
+class RetrievalSearchResponse(BaseModel):
+    """Response model for a document search"""
+    query: str
+    results: list[RetrievedChunkResponse]
+    search_time_ms: float
+
+
+class RetrievalStatsResponse(BaseModel):
+    """Response model for document index statistics"""
+    enabled: bool
+    documents: int
+    chunks: int
+    dim: Optional[int] = None
+    index_dir: Optional[str] = None
+    segments: Optional[int] = None
+    deleted_chunks: Optional[int] = None
+    dtype: Optional[str] = None
+    index_type: Optional[str] = None
+    lists: Optional[int] = None
+    size_bytes: Optional[int] = None
+
+
+class RetrievalRemoveResponse(BaseModel):
+    """Response model for removing documents from the index"""
+    removed_chunks: int
+    total_chunks: int
@@ -0,0 +1,13 @@
+"""
+Retrieval over local documents for the LLM prompt
+
+Importing this package loads numpy and langchain_core; services imports it
+on first use so API startup does not pay for it.
+"""
+
+from .chunking import Chunk, chunk_text, iter_file_chunks, iter_files
+from .ivf import assign_lists, probe_lists, train_centroids
+from .lexical import Postings, bm25_search, tokenize
+from .retriever import RetrievedChunk, Retriever, format_context, reciprocal_rank_fusion
+from .segments import SegmentStore
+from .store import DenseVectorStore
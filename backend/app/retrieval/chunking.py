@@ -0,0 +1,120 @@
+"""
+Streaming document reading and chunking
+"""
+
+import os
+import zlib
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+# Files larger than this are skipped (they are rarely notes)
+MAX_FILE_BYTES = 20 * 1024 * 1024
+
+
+@dataclass
+class Chunk:
+    """A window of words from one document"""
+    source: str
+    index: int
+    text: str
+
+
+def iter_words(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        yield from line.split()
+
+
+def chunk_stream(words: Iterable[str], source: str, chunk_words: int = 200, overlap: int = 40) -> Iterator[Chunk]:
+    """Cut a word stream into windows of chunk_words sharing overlap words
+
+    Only one window is held in memory, so arbitrarily long documents can
+    be chunked while they are read.
+    """
+    step = max(1, chunk_words - overlap)
+    window: List[str] = []
+    index = 0
+    emitted = 0  # Words of the window already covered by the previous chunk
+    for word in words:
+        window.append(word)
+        if len(window) == chunk_words:
+            yield Chunk(source, index, " ".join(window))
+            index += 1
+            del window[:step]
+            emitted = len(window)
+    if len(window) > emitted or index == 0 and window:
+        yield Chunk(source, index, " ".join(window))
+
+
+def content_chunk_stream(words: Iterable[str], source: str, chunk_words: int = 200,
+                         overlap: int = 40) -> Iterator[Chunk]:
+    """Cut a word stream into chunks at content-defined boundaries
+
+    A chunk ends after a word when the hash of that word and the two before
+    it hits a fixed pattern, once the chunk has at least half of
+    chunk_words, and at chunk_words otherwise (chunks average about three
+    quarters of chunk_words). Each chunk starts with the last overlap words
+    of the previous one. Because boundaries depend only on nearby words,
+    inserting or deleting text changes the chunks around the edit, and
+    the cuts after it fall where they did before, so the later chunks keep
+    their text (and their hashes).
+    """
+    min_words = min(chunk_words, max(overlap + 1, chunk_words // 2))
+    spacing = max(1, chunk_words // 4)
+    window: List[str] = []
+    index = 0
+    emitted = 0
+    for word in words:
+        window.append(word)
+        if len(window) < min_words:
+            continue
+        boundary = zlib.crc32(" ".join(window[-3:]).encode("utf-8", "replace")) % spacing == 0
+        if boundary or len(window) >= chunk_words:
+            yield Chunk(source, index, " ".join(window))
+            index += 1
+            del window[:max(0, len(window) - overlap)]
+            emitted = len(window)
+    if len(window) > emitted or index == 0 and window:
+        yield Chunk(source, index, " ".join(window))
+
+
+def chunk_text(text: str, source: str = "", chunk_words: int = 200, overlap: int = 40) -> List[Chunk]:
+    """Chunk an in-memory string"""
+    return list(chunk_stream(text.split(), source, chunk_words, overlap))
+
+
+def is_text_file(path: str, sample_bytes: int = 4096) -> bool:
+    """Heuristic: no NUL bytes at the start of the file"""
+    try:
+        with open(path, "rb") as f:
+            return b"\x00" not in f.read(sample_bytes)
+    except OSError:
+        return False
+
+
+def iter_files(paths: Sequence[str], extensions: Optional[Sequence[str]] = None) -> Iterator[str]:
+    """Text files under paths (files or directories), in a stable order"""
+    for path in paths:
+        path = os.path.expanduser(path)
+        if os.path.isfile(path):
+            candidates = [path]
+        else:
+            candidates = []
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+                candidates.extend(os.path.join(dirpath, name) for name in sorted(filenames))
+        for candidate in candidates:
+            if extensions and os.path.splitext(candidate)[1].lower() not in extensions:
+                continue
+            try:
+                if os.path.getsize(candidate) > MAX_FILE_BYTES:
+                    continue
+            except OSError:
+                continue
+            if is_text_file(candidate):
+                yield candidate
+
+
+def iter_file_chunks(path: str, chunk_words: int = 200, overlap: int = 40) -> Iterator[Chunk]:
+    """Stream one text file as content-defined chunks without reading it whole"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        yield from content_chunk_stream(iter_words(f), path, chunk_words, overlap)
@@ -0,0 +1,100 @@
+"""
+Manifest of ingested files: their stat, content hash and chunk hashes
+
+Lets an ingest skip files that have not changed, and re-embed only the
+chunks of a changed file whose text is different.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+FILES_MANIFEST = "files.json"
+
+# Bytes read at a time while hashing a file
+HASH_BLOCK_BYTES = 1 << 20
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's content, read a block at a time"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def file_stat(path: str) -> Tuple[int, int]:
+    """(size, mtime_ns) of a file; a change in either means it may have changed"""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def is_under(path: str, roots: Iterable[str]) -> bool:
+    return any(path == root or path.startswith(os.path.join(root, "")) for root in roots)
+
+
+class FileManifest:
+    """Path -> {"size", "mtime_ns", "sha256", "chunks": [chunk hash, ...], "ids": [chunk id, ...], "next_id"}
+
+    ``ids`` are the chunk numbers the hashes are stored under, and
+    ``next_id`` the first one not yet used; entries written without them
+    number their chunks by position.
+
+    Kept in memory, and in ``path`` as JSON when one is given. ``refresh``
+    re-reads the file only when another process has replaced it.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.files: Dict[str, Dict] = {}
+        self._stamp = None
+        self.refresh()
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except (FileNotFoundError, TypeError):
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def refresh(self, force: bool = False) -> None:
+        """Reload the file if it changed since it was read (or always, with force)"""
+        if self.path is None:
+            return
+        stamp = self._file_stamp()
+        if not force and stamp == self._stamp:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.files = json.load(f)
+        except FileNotFoundError:
+            self.files = {}
+        self._stamp = stamp
+
+    def save(self) -> None:
+        """Replace the manifest file atomically"""
+        if self.path is None:
+            return
+        temp_path = self.path + f".{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.files, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self._stamp = self._file_stamp()
+
+    def is_current(self, path: str, stat: Tuple[int, int]) -> bool:
+        """Whether path was ingested with this (size, mtime_ns)"""
+        entry = self.files.get(path)
+        return entry is not None and (entry["size"], entry["mtime_ns"]) == tuple(stat)
+
+    def under(self, roots: Iterable[str]) -> List[str]:
+        """Ingested paths inside any of roots (files or directories)"""
+        roots = [os.path.expanduser(root) for root in roots]
+        return [path for path in list(self.files) if is_under(path, roots)]
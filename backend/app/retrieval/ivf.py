@@ -0,0 +1,68 @@
+"""
+Inverted-file (IVF) partitioning of unit vectors with spherical k-means
+
+The vectors are split into ``lists`` clusters around trained centroids. A
+search scores the query against the centroids, then only against the rows
+of the ``nprobe`` closest lists, trading a little recall for scanning a
+fraction of the index.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from .arrays import normalize, top_k
+
+# k-means trains on at most this many sampled rows per list
+TRAIN_ROWS_PER_LIST = 64
+# Rows scored against the centroids at once while assigning
+ASSIGN_BLOCK_ROWS = 16384
+
+
+def default_lists(rows: int) -> int:
+    """Number of lists for an index of rows: about sqrt(rows), at least 1"""
+    return max(1, int(round(np.sqrt(rows))))
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for each row"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(vectors: np.ndarray, lists: Optional[int] = None, iterations: int = 10,
+                    seed: int = 0) -> np.ndarray:
+    """Unit centroids of ``lists`` clusters of unit rows (spherical k-means)
+
+    Trains on a sample of at most TRAIN_ROWS_PER_LIST rows per list;
+    clusters that end up empty are reseeded from random sample rows.
+    """
+    rng = np.random.default_rng(seed)
+    lists = min(lists or default_lists(len(vectors)), len(vectors))
+    if len(vectors) > lists * TRAIN_ROWS_PER_LIST:
+        sample = vectors[np.sort(rng.choice(len(vectors), lists * TRAIN_ROWS_PER_LIST, replace=False))]
+    else:
+        sample = vectors
+    sample = normalize(np.asarray(sample, dtype=np.float32))
+    centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = assign_lists(sample, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=lists)
+        filled = np.flatnonzero(counts)
+        sums = np.zeros_like(centroids)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+        sums[filled] = np.add.reduceat(sample[order], starts, axis=0)
+        centroids = normalize(sums)
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+    return centroids
+
+
+def probe_lists(queries: np.ndarray, centroids: np.ndarray, nprobe: int) -> np.ndarray:
+    """The nprobe lists closest to each query, as a (batch, nprobe) array"""
+    return top_k(queries @ centroids.T, nprobe)[1]
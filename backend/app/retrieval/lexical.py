@@ -0,0 +1,191 @@
+"""
+Inverted index with BM25 scoring for exact names and words
+
+Dense embeddings blur rare tokens such as app names, file names and
+people's names; a keyword index ranks them exactly. Each batch of chunks
+(an in-memory add, or an on-disk segment) gets its own immutable
+Postings: term ids sorted once, with every term's (row, frequency) pairs
+stored back to back in one array. A search looks each query term up with
+a binary search and scores only the rows in its postings.
+"""
+
+import hashlib
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .arrays import top_k
+
+POSTING_DTYPE = np.dtype([("row", "<i4"), ("freq", "<u2")])
+POSTINGS_SUFFIXES = (".terms.npy", ".term_offsets.npy", ".postings.npy", ".lengths.npy")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+# Words that match nearly every chunk and only slow a search down
+STOPWORDS = frozenset(
+    "a an and are as at be but by can could do does for from had has have how i if in is it its me my "
+    "of on or our s so than that the their them then there these they this to was we were what when "
+    "where which who why will with would you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words and numbers of text, without stopwords"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def document_text(source: str, text: str) -> str:
+    """Text indexed for a chunk: its file name (without extension) and its text"""
+    return f"{os.path.splitext(os.path.basename(source))[0]} {text}"
+
+
+def term_id(term: str) -> int:
+    """Stable 64-bit id of a term (the same in every process)"""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def query_terms(text: str) -> np.ndarray:
+    return np.array(sorted({term_id(term) for term in tokenize(text)}), dtype=np.uint64)
+
+
+class Postings:
+    """Term id -> (row, frequency) postings of one immutable batch of rows"""
+
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray, postings: np.ndarray, lengths: np.ndarray):
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.lengths = lengths
+        self.total_length = int(np.sum(lengths, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    @classmethod
+    def from_triples(cls, term_ids: np.ndarray, rows: np.ndarray, freqs: np.ndarray,
+                     lengths: np.ndarray) -> "Postings":
+        """Postings from parallel (term id, row, frequency) arrays"""
+        order = np.lexsort((rows, term_ids))
+        term_ids = term_ids[order]
+        terms, starts = np.unique(term_ids, return_index=True)
+        postings = np.zeros(len(order), dtype=POSTING_DTYPE)
+        postings["row"] = rows[order]
+        postings["freq"] = np.minimum(freqs[order], np.iinfo(np.uint16).max)
+        offsets = np.append(starts, len(order)).astype(np.int64)
+        return cls(terms.astype(np.uint64), offsets, postings, np.asarray(lengths, dtype=np.int32))
+
+    @classmethod
+    def build(cls, documents: Iterable[str]) -> "Postings":
+        """Tokenize documents into postings, one row per document"""
+        ids: Dict[str, int] = {}
+        term_ids, rows, freqs, lengths = [], [], [], []
+        for row, document in enumerate(documents):
+            counts = Counter(tokenize(document))
+            lengths.append(sum(counts.values()))
+            for term, freq in counts.items():
+                if term not in ids:
+                    ids[term] = term_id(term)
+                term_ids.append(ids[term])
+                rows.append(row)
+                freqs.append(freq)
+        return cls.from_triples(
+            np.array(term_ids, dtype=np.uint64), np.array(rows, dtype=np.int32),
+            np.array(freqs, dtype=np.int64), np.array(lengths, dtype=np.int32),
+        )
+
+    @classmethod
+    def load(cls, base: str) -> Optional["Postings"]:
+        """Memory-map postings saved under base, or None if there are none"""
+        if not os.path.exists(base + ".postings.npy"):
+            return None
+        terms, offsets, postings, lengths = (np.load(base + suffix, mmap_mode="r") for suffix in POSTINGS_SUFFIXES)
+        return cls(terms, offsets, postings, lengths)
+
+    def save(self, base: str) -> None:
+        for suffix, array in zip(POSTINGS_SUFFIXES, (self.terms, self.offsets, self.postings, self.lengths)):
+            np.save(base + suffix, array)
+
+    def triples(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Parallel (term id, row, frequency) arrays of every posting"""
+        term_ids = np.repeat(np.asarray(self.terms), np.diff(self.offsets))
+        return term_ids, np.asarray(self.postings["row"]), np.asarray(self.postings["freq"], dtype=np.int64)
+
+    @classmethod
+    def concat(cls, parts: Sequence["Postings"]) -> "Postings":
+        """One postings of several, their rows numbered one after the other"""
+        term_ids, rows, freqs = [], [], []
+        first_row = 0
+        for part in parts:
+            part_terms, part_rows, part_freqs = part.triples()
+            term_ids.append(part_terms)
+            rows.append(part_rows.astype(np.int64) + first_row)
+            freqs.append(part_freqs)
+            first_row += len(part)
+        return cls.from_triples(np.concatenate(term_ids), np.concatenate(rows), np.concatenate(freqs),
+                                np.concatenate([np.asarray(part.lengths) for part in parts]))
+
+    def reorder(self, order: np.ndarray) -> "Postings":
+        """Postings of the rows taken in ``order`` (new row i is old row order[i])"""
+        new_rows = np.empty(len(order), dtype=np.int32)
+        new_rows[order] = np.arange(len(order), dtype=np.int32)
+        term_ids, rows, freqs = self.triples()
+        return Postings.from_triples(term_ids, new_rows[rows], freqs, np.asarray(self.lengths)[order])
+
+    def lookup(self, term: np.uint64) -> np.ndarray:
+        """(row, freq) postings of a term id; empty when it does not occur"""
+        index = int(np.searchsorted(self.terms, term))
+        if index == len(self.terms) or self.terms[index] != term:
+            return self.postings[:0]
+        return self.postings[self.offsets[index]:self.offsets[index + 1]]
+
+
+def bm25_search(parts: Sequence[Tuple[Postings, int, Optional[np.ndarray]]], query: str, k: int,
+                k1: float = BM25_K1, b: float = BM25_B) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k BM25 (scores, row ids) of query over several postings, best first
+
+    ``parts`` are (postings, id of its first row, deleted-row mask or None).
+    Document frequencies, and so IDF, are summed over every part (deleted
+    rows included, as they are until compaction); only rows that contain
+    a query term get a score.
+    """
+    empty = np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+    terms = query_terms(query)
+    documents = sum(len(postings) for postings, _, _ in parts)
+    if not len(terms) or not documents:
+        return empty
+    average_length = max(sum(postings.total_length for postings, _, _ in parts) / documents, 1.0)
+    found = [[postings.lookup(term) for term in terms] for postings, _, _ in parts]
+    frequencies = np.array([sum(len(part[i]) for part in found) for i in range(len(terms))], dtype=np.float64)
+    idf = np.log(1.0 + (documents - frequencies + 0.5) / (frequencies + 0.5))
+
+    candidate_scores, candidate_ids = [], []
+    for (postings, offset, dead), matches in zip(parts, found):
+        rows, weights = [], []
+        for term_idf, match in zip(idf, matches):
+            if not len(match):
+                continue
+            freq = match["freq"].astype(np.float32)
+            norm = k1 * (1.0 - b + b * postings.lengths[match["row"]] / average_length)
+            rows.append(match["row"])
+            weights.append(term_idf * freq * (k1 + 1.0) / (freq + norm))
+        if not rows:
+            continue
+        unique, inverse = np.unique(np.concatenate(rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(weights)).astype(np.float32)
+        if dead is not None:
+            scores[dead[unique]] = -np.inf
+        best_scores, best = top_k(scores[None], k)
+        candidate_scores.append(best_scores[0])
+        candidate_ids.append(unique[best[0]].astype(np.int64) + offset)
+    if not candidate_scores:
+        return empty
+    scores = np.concatenate(candidate_scores)
+    ids = np.concatenate(candidate_ids)
+    best_scores, best = top_k(scores[None], k)
+    live = np.isfinite(best_scores[0])
+    return best_scores[0][live], ids[best[0]][live]
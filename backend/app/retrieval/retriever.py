@@ -0,0 +1,376 @@
+"""
+Document ingestion and search over the dense store
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .chunking import Chunk, iter_file_chunks, iter_files
+from .files import FILES_MANIFEST, FileManifest, chunk_digest, file_digest, file_stat, is_under
+from .segments import FileLock, SegmentStore
+from .store import DenseVectorStore
+
+logger = logging.getLogger(__name__)
+
+INGEST_LOCK_FILE = "ingest.lock"
+
+
+@dataclass
+class RetrievedChunk:
+    """A stored chunk and its similarity to the query"""
+    text: str
+    source: str
+    chunk: int
+    score: float
+
+
+class Retriever:
+    """Chunks documents into a vector store and searches it
+
+    Files are read and chunked as a stream and embedded ``batch_size``
+    chunks at a time, so ingesting a large tree holds only one batch of
+    text in memory. With ``index_dir`` the chunks go to a SegmentStore
+    there (``store_options`` are passed to it); otherwise they are kept in
+    an in-memory DenseVectorStore.
+
+    With ``hybrid`` (the default) searches also rank chunks by BM25 over
+    their words and file names, and merge the two rankings with reciprocal
+    rank fusion: each list contributes 1 / (rrf_k + rank) per chunk, taken
+    from its top ``fusion_depth``. ``min_score`` applies to the dense
+    similarities and ``min_keyword_score`` to the BM25 scores; a keyword
+    hit also needs a query word other than a stopword.
+    """
+
+    def __init__(self, embedder: Embeddings, index_dir: Optional[str] = None, chunk_words: int = 200,
+                 overlap: int = 40, batch_size: int = 64, extensions: Optional[Sequence[str]] = None,
+                 hybrid: bool = True, rrf_k: int = 60, fusion_depth: int = 20, min_keyword_score: float = 0.0,
+                 **store_options):
+        self.embedder = embedder
+        self.index_dir = index_dir
+        self.chunk_words = chunk_words
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.extensions = extensions
+        self.hybrid = hybrid
+        self.rrf_k = rrf_k
+        self.fusion_depth = fusion_depth
+        self.min_keyword_score = min_keyword_score
+        self.store: Optional[Union[SegmentStore, DenseVectorStore]] = (
+            SegmentStore(index_dir, **store_options) if index_dir else None
+        )
+        self.manifest = FileManifest(os.path.join(index_dir, FILES_MANIFEST) if index_dir else None)
+        self._ingest_lock = FileLock(os.path.join(index_dir, INGEST_LOCK_FILE)) if index_dir else threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.store) if self.store is not None else 0
+
+    @property
+    def index_version(self):
+        """Opaque value that changes whenever searchable chunks are added or deleted"""
+        return self.store.version if self.store is not None else None
+
+    def _embed_documents(self, texts: List[str]) -> np.ndarray:
+        embed_array = getattr(self.embedder, "embed_array", None)
+        if embed_array is not None:
+            return embed_array(texts)
+        return np.asarray(self.embedder.embed_documents(texts), dtype=np.float32)
+
+    def add_chunks(self, chunks: Sequence[Chunk]) -> int:
+        """Embed and store chunks; returns how many were added"""
+        if not chunks:
+            return 0
+        vectors = self._embed_documents([chunk.text for chunk in chunks])
+        metadata = [{"source": chunk.source, "chunk": chunk.index, "text": chunk.text} for chunk in chunks]
+        if self.store is None:
+            self.store = DenseVectorStore(vectors.shape[1])
+        self.store.add(vectors, metadata)
+        return len(chunks)
+
+    def ingest(self, paths: Iterable[str], progress: Optional[Dict] = None) -> Dict:
+        """Bring the index up to date with the text files under paths
+
+        Files are checked against the ingestion manifest. A file with the
+        size and mtime it was ingested with, or the same content hash, is
+        skipped. In a changed file only chunks whose hash differs from the
+        chunk at the same position are embedded; the rows they replace, and
+        those past the file's new end, are tombstoned. Files under paths
+        that no longer exist are tombstoned too. New chunks become
+        searchable when the ingest finishes.
+
+        Manifest entries are staged and recorded only once every chunk has
+        been embedded and flushed. If anything fails the buffered rows are
+        dropped and the manifest is reloaded, so the next ingest picks up
+        the same files again; chunks of them already flushed or tombstoned
+        are replaced then, as for a file indexed without a manifest entry.
+
+        ``progress`` is updated in place with the counters of the result as
+        files are processed. Ingests of one index (in any process) run one
+        at a time.
+        """
+        start_time = time.time()
+        progress = progress if progress is not None else {}
+        progress.update(files_total=0, files_done=0, files=0, unchanged_files=0, removed_files=0,
+                        chunks=0, reused_chunks=0, removed_chunks=0)
+        paths = [os.path.expanduser(path) for path in paths]
+        with self._ingest_lock:
+            self.manifest.refresh()
+            try:
+                # Overlapping paths must not queue a file twice
+                files = list(dict.fromkeys(iter_files(paths, self.extensions)))
+                progress["files_total"] = len(files)
+                indexed = self.store.sources() if self.store is not None else set()
+                staged: Dict[str, Dict] = {}
+                batch: List[Chunk] = []
+                for path in files:
+                    try:
+                        self._ingest_file(path, indexed, batch, staged, progress)
+                    except OSError as e:
+                        logger.warning(f"Skipping {path}: {e}")
+                    progress["files_done"] += 1
+                progress["chunks"] += self.add_chunks(batch)
+
+                found = set(files)
+                removed = [path for path in self.manifest.under(paths) if path not in found]
+                progress["removed_chunks"] += self._delete_sources(removed)
+                progress["removed_files"] = len(removed)
+                if self.store is not None:
+                    self.store.flush()
+
+                self.manifest.files.update(staged)
+                for path in removed:
+                    self.manifest.files.pop(path, None)
+                self.manifest.save()
+            except BaseException:
+                if self.store is not None:
+                    self.store.discard_pending()
+                self.manifest.refresh(force=True)
+                raise
+
+        elapsed = time.time() - start_time
+        chunks = progress["chunks"]
+        return {
+            "files": progress["files"],
+            "chunks": chunks,
+            "total_chunks": len(self),
+            "unchanged_files": progress["unchanged_files"],
+            "removed_files": progress["removed_files"],
+            "reused_chunks": progress["reused_chunks"],
+            "removed_chunks": progress["removed_chunks"],
+            "processing_time": round(elapsed, 3),
+            "chunks_per_second": round(chunks / elapsed, 1) if elapsed > 0 else None
+        }
+
+    def _ingest_file(self, path: str, indexed: Set[str], batch: List[Chunk], staged: Dict[str, Dict],
+                     progress: Dict) -> None:
+        """Queue the new and changed chunks of one file into batch and its manifest entry into staged
+
+        Called with the ingest lock held.
+        """
+        stat = file_stat(path)
+        if self.manifest.is_current(path, stat):
+            progress["unchanged_files"] += 1
+            return
+        digest = file_digest(path)
+        entry = self.manifest.files.get(path)
+        if entry is not None and entry["sha256"] == digest:
+            staged[path] = {**entry, "size": stat[0], "mtime_ns": stat[1]}
+            progress["unchanged_files"] += 1
+            return
+
+        if entry is None and path in indexed:
+            # Indexed before the manifest recorded it: nothing to compare with
+            progress["removed_chunks"] += self.store.delete_sources([path])
+        old = entry["chunks"] if entry is not None else []
+        old_ids = entry.get("ids", list(range(len(old)))) if entry is not None else []
+        old_next_id = entry.get("next_id", len(old)) if entry is not None else 0
+        # Chunks are stored under ids that stay put while the file changes,
+        # so an unchanged chunk is reused wherever its text moved to
+        unclaimed: Dict[str, List[int]] = {}
+        for chunk_hash, chunk_id in zip(old, old_ids):
+            unclaimed.setdefault(chunk_hash, []).append(chunk_id)
+        # First pass hashes the chunks; only the changed ones are read again
+        # and embedded, so a large file is never held in memory
+        hashes = [chunk_digest(chunk.text) for chunk in iter_file_chunks(path, self.chunk_words, self.overlap)]
+        ids: List[int] = []
+        fresh: Set[int] = set()
+        next_id = old_next_id
+        for position, chunk_hash in enumerate(hashes):
+            if unclaimed.get(chunk_hash):
+                ids.append(unclaimed[chunk_hash].pop(0))
+            else:
+                ids.append(next_id)
+                fresh.add(position)
+                next_id += 1
+        stale = [chunk_id for reusable in unclaimed.values() for chunk_id in reusable]
+        if entry is not None and self.store is not None:
+            # Ids from old_next_id up too, where an ingest that failed may
+            # have flushed rows
+            progress["removed_chunks"] += self.store.delete_chunks(path, stale, from_chunk=old_next_id)
+        progress["reused_chunks"] += len(hashes) - len(fresh)
+
+        for chunk in iter_file_chunks(path, self.chunk_words, self.overlap):
+            if chunk.index not in fresh:
+                continue
+            batch.append(Chunk(chunk.source, ids[chunk.index], chunk.text))
+            if len(batch) >= self.batch_size:
+                progress["chunks"] += self.add_chunks(batch)
+                batch.clear()
+        staged[path] = {"size": stat[0], "mtime_ns": stat[1], "sha256": digest, "chunks": hashes, "ids": ids,
+                        "next_id": next_id}
+        progress["files"] += 1
+
+    def changed_files(self, paths: Iterable[str]) -> Dict[str, Optional[Tuple[int, int]]]:
+        """Files under paths added, modified or removed since they were ingested
+
+        Maps each to its current (size, mtime_ns), or None if it was
+        removed. Compares stats only, so it is cheap enough to poll.
+        """
+        paths = [os.path.expanduser(path) for path in paths]
+        self.manifest.refresh()
+        known = dict(self.manifest.files)
+        changed: Dict[str, Optional[Tuple[int, int]]] = {}
+        for path in iter_files(paths, self.extensions):
+            try:
+                stat = file_stat(path)
+            except OSError:
+                continue
+            known.pop(path, None)
+            if not self.manifest.is_current(path, stat):
+                changed[path] = stat
+        changed.update((path, None) for path in known if is_under(path, paths))
+        return changed
+
+    def search_vectors(self, queries, k: int, min_score: float = 0.0) -> List[List[RetrievedChunk]]:
+        """Top-k chunks for each query vector, scored in one matrix product"""
+        queries = np.asarray(queries, dtype=np.float32)
+        queries = queries.reshape(-1, queries.shape[-1])
+        if self.store is None or not len(self.store):
+            return [[] for _ in queries]
+        return [
+            [
+                RetrievedChunk(chunk["text"], chunk["source"], chunk["chunk"], round(score, 4))
+                for score, chunk in row if score >= min_score
+            ]
+            for row in self.store.search_chunks(queries, k)
+        ]
+
+    def search_hybrid(self, queries: List[str], vectors, k: int,
+                      min_score: float = 0.0) -> List[List[RetrievedChunk]]:
+        """Dense and BM25 rankings of each query fused by reciprocal rank
+
+        Scores of the results are the fused RRF scores. Dense hits below
+        min_score and keyword hits below min_keyword_score are dropped
+        before fusion, so either list alone can only add chunks that pass
+        its own cutoff.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.store is None or not len(self.store):
+            return [[] for _ in queries]
+        depth = max(k, self.fusion_depth)
+        results = []
+        for query, dense in zip(queries, self.store.search_chunks(vectors.reshape(len(queries), -1), depth)):
+            dense = [(score, chunk) for score, chunk in dense if score >= min_score]
+            keyword = [(score, chunk) for score, chunk in self.store.search_text(query, depth)
+                       if score >= self.min_keyword_score]
+            fused = reciprocal_rank_fusion([dense, keyword], self.rrf_k)[:k]
+            results.append([
+                RetrievedChunk(chunk["text"], chunk["source"], chunk["chunk"], round(score, 4))
+                for score, chunk in fused
+            ])
+        return results
+
+    def _search(self, queries: List[str], vectors, k: int, min_score: float) -> List[List[RetrievedChunk]]:
+        if self.hybrid:
+            return self.search_hybrid(queries, vectors, k, min_score)
+        return self.search_vectors(vectors, k, min_score)
+
+    def remove(self, sources: Iterable[str]) -> int:
+        """Delete every chunk of the given sources; returns how many"""
+        sources = list(sources)
+        with self._ingest_lock:
+            self.manifest.refresh()
+            removed = self._delete_sources(sources)
+            for source in sources:
+                self.manifest.files.pop(source, None)
+            self.manifest.save()
+        return removed
+
+    def _delete_sources(self, sources: List[str]) -> int:
+        return self.store.delete_sources(sources) if self.store is not None and sources else 0
+
+    def search_batch(self, queries: List[str], k: int, min_score: float = 0.0) -> List[List[RetrievedChunk]]:
+        """Top-k chunks for each query; the embedder is not called while the index is empty"""
+        if not len(self):
+            return [[] for _ in queries]
+        return self._search(queries, self._embed_documents(queries), k, min_score)
+
+    def search(self, query: str, k: int, min_score: float = 0.0) -> List[RetrievedChunk]:
+        return self.search_batch([query], k, min_score)[0]
+
+    async def asearch_batch(self, queries: List[str], k: int, min_score: float = 0.0) -> List[List[RetrievedChunk]]:
+        """search_batch without blocking the event loop
+
+        The queries are embedded with the embedder's async API and scored on
+        a worker thread, since scanning the index and BM25 postings is CPU
+        and page-fault bound.
+        """
+        if not len(self):
+            return [[] for _ in queries]
+        vectors = await self.embedder.aembed_documents(queries)
+        return await asyncio.to_thread(self._search, queries, vectors, k, min_score)
+
+    def stats(self) -> Dict:
+        stats = {
+            "documents": len(self.store.sources()) if self.store is not None else 0,
+            "chunks": len(self),
+            "dim": self.store.dim if self.store is not None else None,
+            "index_dir": self.index_dir
+        }
+        if isinstance(self.store, SegmentStore):
+            stats.update(self.store.stats())
+        return stats
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Tuple[float, Dict]]],
+                           k: int = 60) -> List[Tuple[float, Dict]]:
+    """Merge best-first (score, chunk) rankings into one by summed 1 / (k + rank)
+
+    Only ranks count, so similarities and BM25 scores need no common scale.
+    Chunks are matched by source and chunk number.
+    """
+    fused: Dict[Tuple[str, int], List] = {}
+    for ranking in rankings:
+        for rank, (_, chunk) in enumerate(ranking, 1):
+            entry = fused.setdefault((chunk["source"], chunk["chunk"]), [0.0, chunk])
+            entry[0] += 1.0 / (k + rank)
+    return sorted(((score, chunk) for score, chunk in fused.values()), key=lambda item: -item[0])
+
+
+def format_context(results: Sequence[RetrievedChunk], max_chars: int = 3000) -> str:
+    """Render retrieved chunks as the notes section of the user prompt
+
+    Returns "" when there is nothing to add, which leaves the prompt exactly
+    as it is without retrieval.
+    """
+    lines = []
+    used = 0
+    for number, result in enumerate(results, 1):
+        line = f"[{number}] ({os.path.basename(result.source)}) {result.text}"
+        if used + len(line) > max_chars:
+            line = line[:max(0, max_chars - used)]
+            if line:
+                lines.append(line)
+            break
+        lines.append(line)
+        used += len(line)
+    if not lines:
+        return ""
+    return "Relevant notes:\n" + "\n".join(lines) + "\n\n"
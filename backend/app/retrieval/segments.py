@@ -0,0 +1,747 @@
+"""
+Persistent vector index of memory-mapped, append-only segments
+
+Layout of an index directory::
+
+    manifest.json                 dim, dtype, live segments, tombstones, centroids
+    index.lock                    taken by writers (any process)
+    ivf-000004.npy                IVF centroids, once trained
+    seg-000001.vectors.npy        rows x dim float16, or int8 ...
+    seg-000001.scales.npy         ... with a float32 scale per row
+    seg-000001.meta.npy           (source, chunk, offset, length) per row
+    seg-000001.text               chunk texts, utf-8, back to back
+    seg-000001.sources.json       source paths indexed by meta["source"]
+    seg-000001.lists.npy          first row of each IVF list, plus the row count
+    seg-000001.terms.npy ...      BM25 postings of the rows (see lexical.Postings)
+
+Segments are written once and never modified. Deletes add tombstones to
+the manifest; compaction rewrites small or tombstoned segments into one
+and drops the old files. Every process maps the same files read-only, so
+the operating system's page cache holds a single copy of the vectors no
+matter how many workers search them.
+
+Once the manifest names centroids, every segment is written with its rows
+grouped by nearest centroid, so an IVF search reads each probed list as
+one contiguous slice. Centroids change only when a full compaction
+retrains them, which rewrites every segment.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .arrays import normalize, top_k
+from .ivf import assign_lists, default_lists, probe_lists, train_centroids
+from .lexical import Postings, bm25_search, document_text
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "index.lock"
+META_DTYPE = np.dtype([("source", "<i4"), ("chunk", "<i4"), ("offset", "<i8"), ("length", "<i4")])
+SEGMENT_SUFFIXES = (".vectors.npy", ".scales.npy", ".meta.npy", ".text", ".sources.json", ".lists.npy",
+                    ".terms.npy", ".term_offsets.npy", ".postings.npy", ".lengths.npy")
+DTYPES = ("float16", "int8")
+INDEX_TYPES = ("flat", "ivf")
+
+# IVF centroids are retrained once the live rows grow this many times past
+# the count they were trained on
+RETRAIN_GROWTH = 4
+
+# Stored rows are converted to float32 this many at a time while scoring,
+# bounding the temporary memory of a search
+SCORE_BLOCK_ROWS = 16384
+
+# Files of the single-file index written by earlier versions
+LEGACY_VECTORS_FILE = "vectors.npy"
+LEGACY_CHUNKS_FILE = "chunks.jsonl"
+
+
+class FileLock:
+    """Exclusive lock on a file, held across processes and threads"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        self._file = open(self.path, "a+b")
+        if os.name == "nt":
+            import msvcrt
+
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ten seconds; keep waiting
+                    continue
+        else:
+            import fcntl
+
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._thread_lock.release()
+
+
+class Segment:
+    """One immutable segment, memory-mapped read-only"""
+
+    def __init__(self, directory: str, name: str):
+        base = os.path.join(directory, name)
+        self.base = base
+        self.name = name
+        self.vectors = np.load(base + ".vectors.npy", mmap_mode="r")
+        self.scales = np.load(base + ".scales.npy", mmap_mode="r") if os.path.exists(base + ".scales.npy") else None
+        self.meta = np.load(base + ".meta.npy", mmap_mode="r")
+        # np.memmap refuses empty files
+        if os.path.getsize(base + ".text"):
+            self.text = np.memmap(base + ".text", dtype=np.uint8, mode="r")
+        else:
+            self.text = np.zeros(0, dtype=np.uint8)
+        with open(base + ".sources.json", encoding="utf-8") as f:
+            self.sources: List[str] = json.load(f)
+        self.lists = np.load(base + ".lists.npy") if os.path.exists(base + ".lists.npy") else None
+        self._postings: Optional[Postings] = None
+
+    @property
+    def postings(self) -> Postings:
+        """BM25 postings, mapped from disk (or built from the text for older segments)"""
+        if self._postings is None:
+            self._postings = Postings.load(self.base) or Postings.build(
+                document_text(self.sources[source], text.decode("utf-8"))
+                for source, text in zip(self.meta["source"], self.texts(np.arange(len(self))))
+            )
+        return self._postings
+
+    def __len__(self) -> int:
+        return len(self.meta)
+
+    def chunk(self, row: int) -> Dict:
+        meta = self.meta[row]
+        offset, length = int(meta["offset"]), int(meta["length"])
+        return {
+            "source": self.sources[meta["source"]],
+            "chunk": int(meta["chunk"]),
+            "text": self.text[offset:offset + length].tobytes().decode("utf-8"),
+        }
+
+    def texts(self, rows: np.ndarray) -> List[bytes]:
+        return [
+            self.text[offset:offset + length].tobytes()
+            for offset, length in zip(self.meta["offset"][rows], self.meta["length"][rows])
+        ]
+
+    def score(self, queries: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """Cosine similarity of queries to rows start:stop"""
+        block = self.vectors[start:stop].astype(np.float32)
+        scores = queries @ block.T
+        if self.scales is not None:
+            scores *= self.scales[start:stop]
+        return scores
+
+    def search_lists(self, queries: np.ndarray, probes: np.ndarray, k: int,
+                     dead: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k rows of each query among the rows of its probed lists
+
+        Results are (batch, k) arrays padded with -inf scores when the
+        probed lists hold fewer than k live rows.
+        """
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((len(queries), k), dtype=np.int64)
+        for i, (query, lists) in enumerate(zip(queries, probes)):
+            starts, stops = self.lists[lists], self.lists[lists + 1]
+            rows = np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)])
+            if not len(rows):
+                continue
+            # Each list is a contiguous run of rows, so this reads whole slices
+            block = np.concatenate([self.vectors[start:stop] for start, stop in zip(starts, stops)])
+            scores = block.astype(np.float32) @ query
+            if self.scales is not None:
+                scores *= self.scales[rows]
+            if dead is not None:
+                scores[dead[rows]] = -np.inf
+            top_scores, top = top_k(scores[None], k)
+            best_scores[i, :top.shape[1]] = top_scores[0]
+            best_ids[i, :top.shape[1]] = rows[top[0]]
+        return best_scores, best_ids
+
+
+class IndexView:
+    """Segments and tombstones of one manifest generation"""
+
+    def __init__(self, segments: List[Segment], deleted: Dict[str, List[int]],
+                 centroids: Optional[np.ndarray] = None, trained_rows: int = 0):
+        self.segments = segments
+        self.centroids = centroids
+        self.trained_rows = trained_rows
+        self.offsets = np.cumsum([0] + [len(segment) for segment in segments])
+        self.dead: List[Optional[np.ndarray]] = []
+        for segment in segments:
+            rows = deleted.get(segment.name)
+            if rows:
+                mask = np.zeros(len(segment), dtype=bool)
+                mask[rows] = True
+                self.dead.append(mask)
+            else:
+                self.dead.append(None)
+        self.rows = int(self.offsets[-1])
+        self.deleted_rows = sum(int(mask.sum()) for mask in self.dead if mask is not None)
+
+    def locate(self, row_id: int) -> Tuple[Segment, int]:
+        index = int(np.searchsorted(self.offsets, row_id, side="right")) - 1
+        return self.segments[index], row_id - int(self.offsets[index])
+
+
+def dequantize(vectors: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    """Float32 rows back from their stored form"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors * scales[:, None] if scales is not None else vectors
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Stored form of unit float32 rows: float16, or int8 with a per-row scale"""
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    peak = np.abs(vectors).max(axis=1)
+    scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales
+
+
+class SegmentStore:
+    """Vector index persisted as memory-mapped, append-only segments
+
+    Added rows are buffered and written as a new segment by flush (or
+    once ``segment_rows`` are pending); buffered rows are not searchable.
+    Searches read the mapped segments block by block and never hold the
+    whole index as float32. Before every operation the manifest's mtime
+    is checked, so segments written by another worker are picked up
+    without a restart. Writers in any process serialise on a lock file.
+    After a write, compaction runs on a background thread once there are
+    more than ``max_segments`` segments or more than
+    ``max_deleted_fraction`` of the rows are tombstoned.
+
+    With ``index_type="ivf"`` the index is partitioned into ``lists``
+    clusters (about sqrt(rows) by default) once it holds ``ivf_min_rows``
+    live rows, and searches scan only the ``nprobe`` lists closest to each
+    query. Training is a full compaction on the background thread; until
+    it finishes, and for smaller indexes, searches stay exact. Rows added
+    later are assigned to the existing centroids, which are retrained when
+    the index has grown RETRAIN_GROWTH times.
+    """
+
+    def __init__(self, directory: str, dtype: str = "int8", segment_rows: int = 8192, max_segments: int = 8,
+                 max_deleted_fraction: float = 0.2, auto_compact: bool = True, index_type: str = "flat",
+                 nprobe: int = 16, lists: Optional[int] = None, ivf_min_rows: int = 50000):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported vector dtype {dtype!r}; use one of {', '.join(DTYPES)}")
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unsupported index type {index_type!r}; use one of {', '.join(INDEX_TYPES)}")
+        self.directory = directory
+        self.dtype = dtype
+        self.segment_rows = segment_rows
+        self.max_segments = max_segments
+        self.max_deleted_fraction = max_deleted_fraction
+        self.auto_compact = auto_compact
+        self.index_type = index_type
+        self.nprobe = nprobe
+        self.lists = lists
+        self.ivf_min_rows = ivf_min_rows
+        os.makedirs(directory, exist_ok=True)
+        self._write_lock = FileLock(os.path.join(directory, LOCK_FILE))
+        self._lock = threading.Lock()
+        self._pending_vectors: List[np.ndarray] = []
+        self._pending_chunks: List[Dict] = []
+        self._manifest_stamp = None
+        self._dim: Optional[int] = None
+        self._view = IndexView([], {})
+        self._centroids: Optional[Tuple[str, np.ndarray]] = None
+        self._compacting = False
+        self._migrate_legacy()
+        self._refresh()
+
+    def __len__(self) -> int:
+        view = self._current_view()
+        return view.rows - view.deleted_rows
+
+    @property
+    def dim(self) -> Optional[int]:
+        self._current_view()
+        return self._dim
+
+    # Manifest
+
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(self._manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"dim": None, "dtype": self.dtype, "next_segment": 1, "segments": [], "deleted": {},
+                    "centroids": None, "trained_rows": 0}
+
+    def _write_manifest(self, manifest: Dict) -> None:
+        """Replace the manifest atomically (writer lock held)"""
+        temp_path = self._manifest_path + f".{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._manifest_path)
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self._manifest_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _refresh(self, force: bool = False) -> IndexView:
+        """Reload the view if the manifest changed since it was read"""
+        stamp = self._stamp()
+        with self._lock:
+            if not force and stamp == self._manifest_stamp:
+                return self._view
+            loaded = {segment.name: segment for segment in self._view.segments}
+            for attempt in range(10):
+                manifest = self._read_manifest()
+                try:
+                    segments = [loaded.get(name) or Segment(self.directory, name) for name in manifest["segments"]]
+                    centroids = self._load_centroids(manifest.get("centroids"))
+                    break
+                except FileNotFoundError:
+                    # Another process compacted after we read the manifest;
+                    # it removes files only once the new manifest is in place
+                    stamp = self._stamp()
+            else:
+                raise RuntimeError(f"Index in {self.directory} keeps changing while it is read")
+            self._view = IndexView(segments, manifest["deleted"], centroids, manifest.get("trained_rows", 0))
+            self._dim = manifest["dim"]
+            if manifest["dtype"] != self.dtype and segments:
+                logger.info(f"Index in {self.directory} stores {manifest['dtype']}; new segments use it too")
+                self.dtype = manifest["dtype"]
+            self._manifest_stamp = stamp
+            return self._view
+
+    def _current_view(self) -> IndexView:
+        return self._refresh()
+
+    @property
+    def version(self):
+        """Changes whenever any process flushes, deletes or compacts"""
+        self._refresh()
+        return self._manifest_stamp
+
+    def _load_centroids(self, name: Optional[str]) -> Optional[np.ndarray]:
+        """Centroids file of the manifest, loaded once per name (it is small)"""
+        if name is None:
+            return None
+        loaded = self._centroids
+        if loaded is not None and loaded[0] == name:
+            return loaded[1]
+        centroids = np.load(os.path.join(self.directory, name + ".npy"))
+        self._centroids = (name, centroids)
+        return centroids
+
+    # Writes
+
+    def add(self, vectors, chunks: Sequence[Dict]) -> None:
+        """Buffer rows for the next segment; flushes once segment_rows are pending"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = normalize(vectors.reshape(-1, vectors.shape[-1]))
+        if len(vectors) != len(chunks):
+            raise ValueError(f"Got {len(vectors)} vectors for {len(chunks)} chunks")
+        dim = self.dim
+        if dim is not None and vectors.shape[1] != dim:
+            raise ValueError(f"Index in {self.directory} has dimension {dim}, got {vectors.shape[1]}")
+        with self._lock:
+            self._pending_vectors.append(vectors)
+            self._pending_chunks.extend(chunks)
+            pending = len(self._pending_chunks)
+        if pending >= self.segment_rows:
+            self.flush()
+
+    def discard_pending(self) -> None:
+        """Drop the rows buffered since the last flush"""
+        with self._lock:
+            self._pending_vectors, self._pending_chunks = [], []
+
+    def flush(self) -> None:
+        """Write buffered rows as a new segment"""
+        with self._lock:
+            if not self._pending_chunks:
+                return
+            vectors = np.concatenate(self._pending_vectors)
+            chunks = self._pending_chunks
+            self._pending_vectors, self._pending_chunks = [], []
+
+        with self._write_lock:
+            manifest = self._read_manifest()
+            if manifest["dim"] is None:
+                manifest["dim"] = vectors.shape[1]
+                manifest["dtype"] = self.dtype
+            elif manifest["dim"] != vectors.shape[1]:
+                raise ValueError(f"Index in {self.directory} has dimension {manifest['dim']}, got {vectors.shape[1]}")
+            stored, scales = quantize(vectors, manifest["dtype"])
+            postings = Postings.build(document_text(chunk["source"], chunk["text"]) for chunk in chunks)
+            sources = sorted({chunk["source"] for chunk in chunks})
+            source_ids = {source: i for i, source in enumerate(sources)}
+            centroids = self._load_centroids(manifest.get("centroids"))
+            name = self._new_segment_name(manifest)
+            self._write_segment(
+                name, stored, scales, sources,
+                [source_ids[chunk["source"]] for chunk in chunks],
+                [chunk["chunk"] for chunk in chunks],
+                [chunk["text"].encode("utf-8") for chunk in chunks],
+                postings,
+                centroids,
+            )
+            manifest["segments"].append(name)
+            self._write_manifest(manifest)
+        self._refresh(force=True)
+        self._maybe_compact()
+
+    def delete_sources(self, sources: Iterable[str]) -> int:
+        """Tombstone every row of the given sources; returns how many"""
+        return self._tombstone(set(sources))
+
+    def delete_chunks(self, source: str, chunk_ids: Iterable[int], from_chunk: Optional[int] = None) -> int:
+        """Tombstone the given chunk numbers of one source, and any numbered from_chunk or above; returns how many"""
+        return self._tombstone({source}, set(chunk_ids), from_chunk)
+
+    def _tombstone(self, sources: Set[str], chunk_ids: Optional[Set[int]] = None,
+                   from_chunk: Optional[int] = None) -> int:
+        """Tombstone rows of sources (only those numbered chunk_ids or from_chunk up, if either is given)"""
+        def matches(chunk: Dict) -> bool:
+            if chunk["source"] not in sources:
+                return False
+            if chunk_ids is None and from_chunk is None:
+                return True
+            return chunk["chunk"] in (chunk_ids or ()) or (from_chunk is not None and chunk["chunk"] >= from_chunk)
+
+        with self._lock:
+            keep = [i for i, chunk in enumerate(self._pending_chunks) if not matches(chunk)]
+            if len(keep) != len(self._pending_chunks) and self._pending_chunks:
+                vectors = np.concatenate(self._pending_vectors)[keep]
+                self._pending_vectors = [vectors]
+                self._pending_chunks = [self._pending_chunks[i] for i in keep]
+
+        deleted = 0
+        with self._write_lock:
+            view = self._refresh(force=True)
+            manifest = self._read_manifest()
+            for segment, dead in zip(view.segments, view.dead):
+                ids = [i for i, source in enumerate(segment.sources) if source in sources]
+                if not ids:
+                    continue
+                rows = np.isin(segment.meta["source"], ids)
+                if chunk_ids is not None or from_chunk is not None:
+                    numbered = np.isin(segment.meta["chunk"], list(chunk_ids or ()))
+                    if from_chunk is not None:
+                        numbered |= segment.meta["chunk"] >= from_chunk
+                    rows &= numbered
+                if dead is not None:
+                    rows &= ~dead
+                new_rows = np.flatnonzero(rows).tolist()
+                if new_rows:
+                    manifest["deleted"][segment.name] = sorted(manifest["deleted"].get(segment.name, []) + new_rows)
+                    deleted += len(new_rows)
+            if deleted:
+                self._write_manifest(manifest)
+        if deleted:
+            self._refresh(force=True)
+            self._maybe_compact()
+        return deleted
+
+    def _new_segment_name(self, manifest: Dict) -> str:
+        name = f"seg-{manifest['next_segment']:06d}"
+        manifest["next_segment"] += 1
+        return name
+
+    def _write_segment(self, name: str, vectors: np.ndarray, scales: Optional[np.ndarray], sources: List[str],
+                       source_ids: Sequence[int], chunk_ids: Sequence[int], texts: List[bytes],
+                       postings: Postings, centroids: Optional[np.ndarray] = None) -> None:
+        """Write a segment's files (writer lock held); the manifest does not list it yet
+
+        With centroids, rows are reordered so each IVF list is contiguous.
+        """
+        base = os.path.join(self.directory, name)
+        if centroids is not None:
+            assignments = assign_lists(dequantize(vectors, scales), centroids)
+            order = np.argsort(assignments, kind="stable")
+            vectors = vectors[order]
+            scales = scales[order] if scales is not None else None
+            source_ids = np.asarray(source_ids)[order]
+            chunk_ids = np.asarray(chunk_ids)[order]
+            texts = [texts[i] for i in order]
+            postings = postings.reorder(order)
+            counts = np.bincount(assignments, minlength=len(centroids))
+            np.save(base + ".lists.npy", np.concatenate([[0], np.cumsum(counts)]).astype(np.int64))
+        meta = np.zeros(len(texts), dtype=META_DTYPE)
+        meta["source"] = source_ids
+        meta["chunk"] = chunk_ids
+        lengths = np.array([len(text) for text in texts], dtype=np.int64)
+        meta["length"] = lengths
+        meta["offset"] = np.cumsum(lengths) - lengths
+        np.save(base + ".vectors.npy", vectors)
+        if scales is not None:
+            np.save(base + ".scales.npy", scales)
+        np.save(base + ".meta.npy", meta)
+        with open(base + ".text", "wb") as f:
+            for text in texts:
+                f.write(text)
+        with open(base + ".sources.json", "w", encoding="utf-8") as f:
+            json.dump(sources, f)
+        postings.save(base)
+
+    # Compaction
+
+    def _needs_compaction(self, view: IndexView) -> bool:
+        if len(view.segments) > self.max_segments or self._needs_training(view):
+            return True
+        return bool(view.rows) and view.deleted_rows / view.rows > self.max_deleted_fraction
+
+    def _needs_training(self, view: IndexView) -> bool:
+        """Whether IVF centroids should be (re)trained for the live rows"""
+        live = view.rows - view.deleted_rows
+        if self.index_type != "ivf" or live < self.ivf_min_rows:
+            return False
+        return view.centroids is None or live >= RETRAIN_GROWTH * view.trained_rows
+
+    def _maybe_compact(self) -> None:
+        if not self.auto_compact or not self._needs_compaction(self._current_view()):
+            return
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+
+        def run():
+            try:
+                self.compact()
+            except Exception as e:
+                logger.warning(f"Compaction of {self.directory} failed: {e}")
+            finally:
+                with self._lock:
+                    self._compacting = False
+
+        threading.Thread(target=run, name="index-compaction", daemon=True).start()
+
+    def compact(self, force: bool = False) -> bool:
+        """Merge small and tombstoned segments into one; returns whether anything changed
+
+        Segments holding at least ``segment_rows`` live rows and no
+        tombstones are left alone, unless IVF centroids are being trained:
+        that merges every segment so all rows are grouped by the new lists.
+        """
+        with self._write_lock:
+            view = self._refresh(force=True)
+            if not force and not self._needs_compaction(view):
+                return False
+            manifest = self._read_manifest()
+            train = self._needs_training(view)
+            merge = [
+                (segment, dead) for segment, dead in zip(view.segments, view.dead)
+                if dead is not None or len(segment) < self.segment_rows or force or train
+            ]
+            if len(merge) < 2 and not any(dead is not None for _, dead in merge) and not train:
+                return False
+
+            vectors, scales, sources, source_ids, chunk_ids, texts = [], [], [], [], [], []
+            term_ids, posting_rows, freqs, lengths = [], [], [], []
+            source_index: Dict[str, int] = {}
+            for segment, dead in merge:
+                rows = np.flatnonzero(~dead) if dead is not None else np.arange(len(segment))
+                # Carry the postings of live rows over, renumbered, instead of re-tokenizing
+                new_rows = np.full(len(segment), -1, dtype=np.int64)
+                new_rows[rows] = np.arange(len(texts), len(texts) + len(rows))
+                segment_terms, segment_rows, segment_freqs = segment.postings.triples()
+                live = new_rows[segment_rows] >= 0
+                term_ids.append(segment_terms[live])
+                posting_rows.append(new_rows[segment_rows][live])
+                freqs.append(segment_freqs[live])
+                lengths.append(np.asarray(segment.postings.lengths)[rows])
+                vectors.append(np.asarray(segment.vectors[rows]))
+                if segment.scales is not None:
+                    scales.append(np.asarray(segment.scales[rows]))
+                for source_id in segment.meta["source"][rows]:
+                    source = segment.sources[source_id]
+                    if source not in source_index:
+                        source_index[source] = len(sources)
+                        sources.append(source)
+                    source_ids.append(source_index[source])
+                chunk_ids.extend(segment.meta["chunk"][rows].tolist())
+                texts.extend(segment.texts(rows))
+
+            merged_names = {segment.name for segment, _ in merge}
+            segments = [name for name in manifest["segments"] if name not in merged_names]
+            centroids = self._load_centroids(manifest.get("centroids"))
+            if texts:
+                vectors = np.concatenate(vectors)
+                scales = np.concatenate(scales) if scales else None
+                postings = Postings.from_triples(np.concatenate(term_ids), np.concatenate(posting_rows),
+                                                 np.concatenate(freqs), np.concatenate(lengths))
+                if train:
+                    centroids = train_centroids(dequantize(vectors, scales), self.lists or default_lists(len(texts)))
+                    manifest["centroids"] = f"ivf-{manifest['next_segment']:06d}"
+                    manifest["trained_rows"] = len(texts)
+                    manifest["next_segment"] += 1
+                    np.save(os.path.join(self.directory, manifest["centroids"] + ".npy"), centroids)
+                    logger.info(f"Trained {len(centroids)} IVF lists on {len(texts)} rows of {self.directory}")
+                name = self._new_segment_name(manifest)
+                self._write_segment(name, vectors, scales, sources, source_ids, chunk_ids, texts, postings, centroids)
+                segments.append(name)
+            manifest["segments"] = segments
+            manifest["deleted"] = {name: rows for name, rows in manifest["deleted"].items() if name in segments}
+            self._write_manifest(manifest)
+            self._remove_unlisted_files(set(segments) | {manifest.get("centroids")})
+        self._refresh(force=True)
+        logger.info(f"Compacted {len(merge)} segments of {self.directory} ({len(texts)} live rows)")
+        return True
+
+    def _remove_unlisted_files(self, segments: Set[str]) -> None:
+        """Delete segment and centroid files the manifest no longer lists (writer lock held)
+
+        Processes that still map a removed file keep reading it until they
+        refresh; on Windows, where mapped files cannot be deleted, removal
+        is retried by the next compaction.
+        """
+        for filename in os.listdir(self.directory):
+            if not filename.startswith(("seg-", "ivf-")):
+                continue
+            name = filename.split(".", 1)[0]
+            if name in segments:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except OSError:
+                pass
+
+    def _migrate_legacy(self) -> None:
+        """Import a vectors.npy/chunks.jsonl index as the first segment"""
+        vectors_path = os.path.join(self.directory, LEGACY_VECTORS_FILE)
+        chunks_path = os.path.join(self.directory, LEGACY_CHUNKS_FILE)
+        if os.path.exists(self._manifest_path) or not os.path.exists(vectors_path):
+            return
+        vectors = np.load(vectors_path)
+        with open(chunks_path, encoding="utf-8") as f:
+            chunks = [json.loads(line) for line in f if line.strip()]
+        self.add(vectors, chunks)
+        self.flush()
+        os.remove(vectors_path)
+        os.remove(chunks_path)
+        logger.info(f"Migrated {len(chunks)} chunks in {self.directory} to segments")
+
+    # Reads
+
+    def search(self, queries, k: int, view: Optional[IndexView] = None, exact: bool = False,
+               nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k rows for each query as (scores, row ids of the view), best first
+
+        Each block of a segment is scored with one matrix product and cut to
+        its own top k before the candidates are merged. Once IVF centroids
+        are trained (and index_type is "ivf"), segments grouped into lists
+        are searched only in the ``nprobe`` lists closest to each query,
+        unless ``exact``. Tombstoned rows score -inf.
+        """
+        view = view or self._current_view()
+        queries = np.asarray(queries, dtype=np.float32)
+        queries = normalize(queries.reshape(-1, queries.shape[-1]))
+        probes = None
+        if not exact and self.index_type == "ivf" and view.centroids is not None:
+            probes = probe_lists(queries, view.centroids, nprobe or self.nprobe)
+        candidate_scores, candidate_ids = [], []
+        for segment, offset, dead in zip(view.segments, view.offsets, view.dead):
+            if probes is not None and segment.lists is not None:
+                list_scores, list_ids = segment.search_lists(queries, probes, k, dead)
+                candidate_scores.append(list_scores)
+                candidate_ids.append(list_ids + offset)
+                continue
+            for start in range(0, len(segment), SCORE_BLOCK_ROWS):
+                stop = min(start + SCORE_BLOCK_ROWS, len(segment))
+                scores = segment.score(queries, start, stop)
+                if dead is not None:
+                    scores[:, dead[start:stop]] = -np.inf
+                block_scores, block_ids = top_k(scores, k)
+                candidate_scores.append(block_scores)
+                candidate_ids.append(block_ids + (offset + start))
+        if not candidate_scores:
+            return top_k(np.zeros((len(queries), 0), dtype=np.float32), k)
+        scores = np.concatenate(candidate_scores, axis=1)
+        ids = np.concatenate(candidate_ids, axis=1)
+        best_scores, best = top_k(scores, k)
+        return best_scores, np.take_along_axis(ids, best, axis=1)
+
+    def search_chunks(self, queries, k: int) -> List[List[Tuple[float, Dict]]]:
+        """Top-k (score, chunk) pairs for each query, best first"""
+        view = self._current_view()
+        scores, ids = self.search(queries, k, view)
+        results = []
+        for row_scores, row_ids in zip(scores, ids):
+            row = []
+            for score, row_id in zip(row_scores, row_ids):
+                if np.isfinite(score):
+                    segment, index = view.locate(int(row_id))
+                    row.append((float(score), segment.chunk(index)))
+            results.append(row)
+        return results
+
+    def search_text(self, query: str, k: int) -> List[Tuple[float, Dict]]:
+        """Top-k (BM25 score, chunk) pairs for the words of query, best first"""
+        view = self._current_view()
+        parts = [
+            (segment.postings, offset, dead) for segment, offset, dead in zip(view.segments, view.offsets, view.dead)
+        ]
+        scores, ids = bm25_search(parts, query, k)
+        results = []
+        for score, row_id in zip(scores, ids):
+            segment, index = view.locate(int(row_id))
+            results.append((float(score), segment.chunk(index)))
+        return results
+
+    def sources(self) -> Set[str]:
+        """Sources with at least one live row"""
+        view = self._current_view()
+        sources = set()
+        for segment, dead in zip(view.segments, view.dead):
+            ids = segment.meta["source"] if dead is None else segment.meta["source"][~dead]
+            sources.update(segment.sources[i] for i in np.unique(ids))
+        return sources
+
+    def stats(self) -> Dict:
+        view = self._current_view()
+        return {
+            "segments": len(view.segments),
+            "deleted_chunks": view.deleted_rows,
+            "dtype": self.dtype,
+            "index_type": self.index_type,
+            "lists": len(view.centroids) if view.centroids is not None else None,
+            "size_bytes": sum(
+                os.path.getsize(os.path.join(self.directory, f))
+                for f in os.listdir(self.directory) if f.startswith("seg-")
+            ),
+        }
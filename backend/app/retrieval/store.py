@@ -0,0 +1,133 @@
+"""
+In-memory dense vector store with exact cosine search
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .arrays import normalize, top_k
+from .lexical import Postings, bm25_search, document_text
+
+
+class DenseVectorStore:
+    """Unit-length float32 rows searched with one matrix product per batch
+
+    Rows are normalised on insert, so cosine similarity is a dot product
+    and a batch of queries is scored against the whole store with a single
+    ``queries @ vectors.T``. The top k of each row are picked with
+    argpartition (linear time) and only those k are sorted. Storage grows
+    by doubling, so appends are amortised O(1) copies. Each add also
+    indexes its chunks' words for search_text. Nothing is persisted; see
+    SegmentStore for the on-disk index.
+    """
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self._vectors = np.zeros((max(1, capacity), dim), dtype=np.float32)
+        self._dead = np.zeros(max(1, capacity), dtype=bool)
+        self._size = 0
+        self.chunks: List[Dict] = []
+        self._postings: List[Tuple[int, Postings]] = []
+        self._lock = threading.Lock()
+        # Bumped by every add and delete
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._size - int(self._dead[:self._size].sum())
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self._size]
+
+    def add(self, vectors, chunks: Sequence[Dict]) -> List[int]:
+        """Append vectors with their chunk metadata and return their row ids"""
+        vectors = normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        if len(vectors) != len(chunks):
+            raise ValueError(f"Got {len(vectors)} vectors for {len(chunks)} chunks")
+        postings = Postings.build(document_text(chunk.get("source", ""), chunk.get("text", "")) for chunk in chunks)
+        with self._lock:
+            needed = self._size + len(vectors)
+            if needed > len(self._vectors):
+                capacity = max(needed, 2 * len(self._vectors))
+                grown = np.zeros((capacity, self.dim), dtype=np.float32)
+                grown[:self._size] = self.vectors
+                dead = np.zeros(capacity, dtype=bool)
+                dead[:self._size] = self._dead[:self._size]
+                self._vectors, self._dead = grown, dead
+            self._vectors[self._size:needed] = vectors
+            self.chunks.extend(chunks)
+            self._postings.append((self._size, postings))
+            # Merge runs of similar size (like carries in a binary counter), so
+            # many small adds leave O(log n) postings for a search to visit
+            while len(self._postings) > 1 and len(self._postings[-1][1]) >= len(self._postings[-2][1]):
+                (start, older), (_, newer) = self._postings[-2:]
+                self._postings[-2:] = [(start, Postings.concat([older, newer]))]
+            ids = list(range(self._size, needed))
+            self._size = needed
+            self.version += 1
+        return ids
+
+    def flush(self) -> None:
+        """Nothing is buffered; present for parity with SegmentStore"""
+
+    def discard_pending(self) -> None:
+        """Nothing is buffered; present for parity with SegmentStore"""
+
+    def search(self, queries, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k rows for each query as (scores, ids), best first
+
+        ``queries`` is one vector or a (batch, dim) matrix; both results are
+        (batch, min(k, rows)) arrays. Deleted rows score -inf.
+        """
+        queries = normalize(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim))
+        with self._lock:
+            vectors, dead = self.vectors, self._dead[:self._size]
+        scores = queries @ vectors.T
+        if dead.any():
+            scores[:, dead] = -np.inf
+        return top_k(scores, k)
+
+    def search_chunks(self, queries, k: int) -> List[List[Tuple[float, Dict]]]:
+        """Top-k (score, chunk) pairs for each query, best first"""
+        scores, ids = self.search(queries, k)
+        return [
+            [(float(score), self.chunks[i]) for score, i in zip(row_scores, row_ids) if np.isfinite(score)]
+            for row_scores, row_ids in zip(scores, ids)
+        ]
+
+    def search_text(self, query: str, k: int) -> List[Tuple[float, Dict]]:
+        """Top-k (BM25 score, chunk) pairs for the words of query, best first"""
+        with self._lock:
+            parts = [
+                (postings, start, self._dead[start:start + len(postings)]) for start, postings in self._postings
+            ]
+        scores, ids = bm25_search(parts, query, k)
+        return [(float(score), self.chunks[i]) for score, i in zip(scores, ids)]
+
+    def sources(self) -> Set[str]:
+        with self._lock:
+            return {chunk["source"] for chunk, dead in zip(self.chunks, self._dead) if not dead}
+
+    def delete_sources(self, sources: Iterable[str]) -> int:
+        """Mark every chunk of the given sources deleted; returns how many"""
+        sources = set(sources)
+        with self._lock:
+            rows = [i for i, chunk in enumerate(self.chunks) if chunk["source"] in sources and not self._dead[i]]
+            self._dead[rows] = True
+            self.version += bool(rows)
+        return len(rows)
+
+    def delete_chunks(self, source: str, chunk_ids: Iterable[int], from_chunk: Optional[int] = None) -> int:
+        """Mark the given chunk numbers of one source, and any numbered from_chunk or above, deleted; returns how many"""
+        chunk_ids = set(chunk_ids)
+        with self._lock:
+            rows = [
+                i for i, chunk in enumerate(self.chunks)
+                if chunk["source"] == source and not self._dead[i]
+                and (chunk["chunk"] in chunk_ids or (from_chunk is not None and chunk["chunk"] >= from_chunk))
+            ]
+            self._dead[rows] = True
+            self.version += bool(rows)
+        return len(rows)
@@ -2,10 +2,13 @@
 Router for app-related endpoints
 """
 
+import asyncio
+
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 
-from ..models import AppResponse, AppsListResponse, HealthResponse, RootResponse, LLMRequest, LLMResponse
-from ..services import open_app, get_available_apps, get_health_status, process_with_llm
+from ..models import AppResponse, AppsListResponse, HealthResponse, RootResponse, LLMRequest, LLMResponse, LLMStreamToken, LLMStreamFinal, CacheStatsResponse, LLMBatchRequest, LLMBatchResponse
+from ..services import open_app, get_available_apps, get_health_status, process_prompt_async, open_prompt_stream, process_llm_batch, response_cache
 from ..config import API_VERSION
 
 router = APIRouter()
@@ -22,7 +25,13 @@ async def root():
             "open_app_get": "/open-app/{app_name} (GET)",
             "list_apps": "/list-apps",
             "health": "/health",
-            "llm": "/llm (POST)"
+            "llm": "/llm (POST)",
+            "llm_stream": "/llm/stream (POST, NDJSON)",
+            "llm_batch": "/llm/batch (POST)",
+            "llm_cache": "/llm/cache (GET, DELETE)",
+            "sessions": "/sessions (POST), /sessions/{session_id}/turns (POST)",
+            "pipeline": "/pipeline (POST audio, NDJSON)",
+            "retrieval": "/retrieval/ingest (POST), /retrieval/jobs (POST, GET), /retrieval/search (POST), /retrieval/documents (DELETE), /retrieval/stats"
         }
     )
 
@@ -30,21 +39,23 @@ async def root():
 @router.post("/open-app/{app_name}", response_model=AppResponse)
 async def open_application(app_name: str):
     """Open an application by name"""
-    result = open_app(app_name)
+    # Resolving may rescan PATH and rebuild the fuzzy matcher
+    result = await asyncio.to_thread(open_app, app_name)
     return AppResponse(**result)
 
 
 @router.get("/open-app/{app_name}", response_model=AppResponse)
 async def open_application_get(app_name: str):
     """Open an application by name (GET method)"""
-    result = open_app(app_name)
+    result = await asyncio.to_thread(open_app, app_name)
     return AppResponse(**result)
 
 
 @router.get("/list-apps", response_model=AppsListResponse)
 async def list_available_apps():
     """List all available apps"""
-    result = get_available_apps()
+    # The first call builds the executable index
+    result = await asyncio.to_thread(get_available_apps)
     return AppsListResponse(**result)
 
 
@@ -57,8 +68,58 @@ async def health_check():
 
 @router.post("/llm", response_model=LLMResponse)
 async def process_llm_request(request: LLMRequest):
-    """Process text through LLM and return response"""
+    """Process text through LLM and return response
+
+    Launch, list and health commands are recognised by the intent fast
+    path and run directly without the LLM.
+    """
     print(f"Received LLM request: {request.prompt} with model: {request.model}")
-    result = process_with_llm(request.prompt, request.model, request.chat_history)
+    result = await process_prompt_async(request.prompt, request.model, request.chat_history)
     print(f"LLM result: {result}")
-    return LLMResponse(**result) 
\ No newline at end of file
+    return LLMResponse(**result)
+
+
+@router.post("/llm/stream")
+async def process_llm_stream(request: LLMRequest):
+    """Stream an LLM response as newline-delimited JSON frames
+
+    Every frame but the last is a token frame; the last frame carries the
+    same metadata as /llm plus time-to-first-token and chunks/sec.
+    """
+    print(f"Received LLM stream request: {request.prompt} with model: {request.model}")
+
+    stream = await open_prompt_stream(request.prompt, request.model, request.chat_history)
+
+    async def frames():
+        try:
+            async for frame in stream:
+                if frame["type"] == "token":
+                    yield LLMStreamToken(**frame).model_dump_json() + "\n"
+                else:
+                    yield LLMStreamFinal(**frame).model_dump_json() + "\n"
+        finally:
+            # Frees the gate slot as soon as the client goes away
+            await stream.aclose()
+
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
+
+
+@router.post("/llm/batch", response_model=LLMBatchResponse)
+async def process_llm_batch_request(request: LLMBatchRequest):
+    """Process many prompts in one call; results are returned in order"""
+    print(f"Received LLM batch request with {len(request.requests)} items")
+    result = await process_llm_batch([item.model_dump() for item in request.requests], request.max_parallel)
+    return LLMBatchResponse(**result)
+
+
+@router.get("/llm/cache", response_model=CacheStatsResponse)
+async def llm_cache_stats():
+    """Response cache hit/miss counters and occupancy"""
+    return CacheStatsResponse(**response_cache.stats())
+
+
+@router.delete("/llm/cache", response_model=CacheStatsResponse)
+async def clear_llm_cache():
+    """Drop all cached LLM responses"""
+    response_cache.clear()
+    return CacheStatsResponse(**response_cache.stats())
@@ -0,0 +1,49 @@
+"""
+Router for the voice pipeline endpoint
+"""
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from ..config import LLM_DEFAULT_MODEL, SPEECH_MAX_SAMPLE_RATE, SPEECH_MIN_SAMPLE_RATE, SPEECH_SAMPLE_RATE
+from ..exceptions import AudioDecodeError
+from ..models import LLMStreamFinal, LLMStreamToken, PipelineActionFrame, PipelineDoneFrame, PipelineIntentFrame, PipelineTranscriptFrame
+from ..services import open_voice_pipeline
+
+router = APIRouter()
+
+FRAME_MODELS = {
+    "transcript": PipelineTranscriptFrame,
+    "intent": PipelineIntentFrame,
+    "action": PipelineActionFrame,
+    "token": LLMStreamToken,
+    "final": LLMStreamFinal,
+    "done": PipelineDoneFrame,
+}
+
+
+@router.post("/pipeline")
+async def voice_pipeline(request: Request,
+                         sample_rate: int = Query(SPEECH_SAMPLE_RATE, ge=SPEECH_MIN_SAMPLE_RATE, le=SPEECH_MAX_SAMPLE_RATE),
+                         model: str = LLM_DEFAULT_MODEL, chat_history: str = ""):
+    """Transcribe audio and launch the app or stream the LLM answer in one response
+
+    The body is a 16-bit WAV file or raw PCM16 mono at sample_rate. The
+    response is newline-delimited JSON: transcript, intent, then an action
+    frame or LLM token/final frames, and a done frame with stage latencies.
+    """
+    audio = await request.body()
+    if not audio:
+        raise AudioDecodeError("No audio data provided")
+    print(f"Received pipeline request: {len(audio)} bytes of audio")
+
+    frames = await open_voice_pipeline(audio, sample_rate, model, chat_history)
+
+    async def lines():
+        try:
+            async for frame in frames:
+                yield FRAME_MODELS[frame["type"]](**frame).model_dump_json() + "\n"
+        finally:
+            await frames.aclose()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
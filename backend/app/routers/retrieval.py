@@ -0,0 +1,67 @@
+"""
+Router for the local document index
+"""
+
+from typing import List
+
+from fastapi import APIRouter, BackgroundTasks, Query
+
+from ..models import (
+    RetrievalIngestRequest, RetrievalIngestResponse, RetrievalJobListResponse, RetrievalJobResponse,
+    RetrievalSearchRequest, RetrievalSearchResponse, RetrievalRemoveResponse, RetrievalStatsResponse,
+)
+from ..services import (
+    create_ingest_job, get_ingest_job, get_retrieval_stats, ingest_documents, list_ingest_jobs, remove_documents,
+    run_ingest_job, search_documents,
+)
+
+router = APIRouter(prefix="/retrieval")
+
+
+@router.post("/ingest", response_model=RetrievalIngestResponse)
+async def ingest(request: RetrievalIngestRequest):
+    """Chunk, embed and index the text files under the given paths"""
+    print(f"Received ingest request: {request.paths or 'RETRIEVAL_SOURCES'}")
+    result = await ingest_documents(request.paths)
+    return RetrievalIngestResponse(**result)
+
+
+@router.post("/jobs", response_model=RetrievalJobResponse, status_code=202)
+async def start_job(request: RetrievalIngestRequest, background_tasks: BackgroundTasks):
+    """Start an ingest in the background; poll its progress with GET /retrieval/jobs/{job_id}"""
+    print(f"Received ingest job request: {request.paths or 'RETRIEVAL_SOURCES'}")
+    job = create_ingest_job(request.paths)
+    background_tasks.add_task(run_ingest_job, job["job_id"])
+    return RetrievalJobResponse(**job)
+
+
+@router.get("/jobs", response_model=RetrievalJobListResponse)
+async def list_jobs():
+    """Return recent ingest jobs, newest first"""
+    return RetrievalJobListResponse(jobs=list_ingest_jobs())
+
+
+@router.get("/jobs/{job_id}", response_model=RetrievalJobResponse)
+async def get_job(job_id: str):
+    """Return the progress and throughput of an ingest job"""
+    return RetrievalJobResponse(**get_ingest_job(job_id))
+
+
+@router.post("/search", response_model=RetrievalSearchResponse)
+async def search(request: RetrievalSearchRequest):
+    """Return the indexed chunks most similar to a query"""
+    result = await search_documents(request.query, request.k, request.min_score)
+    return RetrievalSearchResponse(**result)
+
+
+@router.delete("/documents", response_model=RetrievalRemoveResponse)
+async def remove(source: List[str] = Query(...)):
+    """Remove documents from the index by source path"""
+    print(f"Received remove request: {source}")
+    return RetrievalRemoveResponse(**(await remove_documents(source)))
+
+
+@router.get("/stats", response_model=RetrievalStatsResponse)
+async def stats():
+    """Return the size of the document index"""
+    return RetrievalStatsResponse(**(await get_retrieval_stats()))
@@ -0,0 +1,41 @@
+"""
+Router for conversation session endpoints
+"""
+
+from fastapi import APIRouter
+
+from ..models import SessionCreateRequest, SessionResponse, SessionTurnRequest, SessionTurnResponse
+from ..services import process_session_turn
+from ..sessions import session_info, session_store
+
+router = APIRouter(prefix="/sessions")
+
+
+@router.post("", response_model=SessionResponse)
+async def create_session(request: SessionCreateRequest):
+    """Create a conversation session whose history is kept on the server"""
+    session = session_store.create(request.model)
+    return SessionResponse(**session_info(session))
+
+
+@router.get("/{session_id}", response_model=SessionResponse)
+async def get_session(session_id: str):
+    """Return the retained history of a session"""
+    session = session_store.get(session_id)
+    return SessionResponse(**session_info(session))
+
+
+@router.delete("/{session_id}")
+async def delete_session(session_id: str):
+    """Delete a session"""
+    session_store.delete(session_id)
+    return {"success": True, "session_id": session_id}
+
+
+@router.post("/{session_id}/turns", response_model=SessionTurnResponse)
+async def post_session_turn(session_id: str, request: SessionTurnRequest):
+    """Ask a question within a session; only the new turn is uploaded"""
+    session = session_store.get(session_id)
+    print(f"Received session turn for {session_id}: {request.prompt}")
+    result = await process_session_turn(session, request.prompt)
+    return SessionTurnResponse(**result)
@@ -2,18 +2,46 @@
 Business logic services for the App Launcher API
 """
 
+import asyncio
 import os
+import re
 import subprocess
 import webbrowser
 import time
-from typing import Dict, Optional
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional
 
-from langchain_ollama import OllamaLLM
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
 
-from .config import COMMON_APPS, LLM_SYSTEM_PROMPT
+from .config import (
+    COMMON_APPS, APP_ALIASES, APP_DIRECTORIES, APP_MATCH_THRESHOLD, APP_CONFIDENT_MATCH_SCORE, APP_LEARNED_ALIASES_PATH,
+    LLM_SYSTEM_PROMPT,
+    LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT, LLM_RETRY_AFTER,
+    OLLAMA_BASE_URL, OLLAMA_REUSE_CONTEXT,
+    LLM_CACHE_ENABLED, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL,
+    LLM_CACHE_SEMANTIC, LLM_CACHE_SIMILARITY,
+    OLLAMA_KEEP_ALIVE, LLM_ROUTING_ENABLED, LLM_ROUTE_SMALL_MODEL, LLM_ROUTE_LARGE_MODEL,
+    LLM_ROUTE_MAX_WORDS, LLM_ROUTE_MAX_HISTORY_CHARS, LLM_ROUTE_COMPLEX_PATTERN,
+    LLM_BATCH_PARALLELISM, LLM_BATCH_MAX_PARALLELISM,
+    VOSK_MODEL_PATH, SPEECH_MAX_WORKERS, SPEECH_MAX_AUDIO_BYTES,
+    INTENT_FAST_PATH_ENABLED, INTENT_MAX_WORDS,
+    RETRIEVAL_ENABLED, RETRIEVAL_INDEX_DIR, RETRIEVAL_SOURCES, RETRIEVAL_EXTENSIONS, RETRIEVAL_CHUNK_WORDS, RETRIEVAL_CHUNK_OVERLAP,
+    RETRIEVAL_TOP_K, RETRIEVAL_MIN_SCORE, RETRIEVAL_MAX_CONTEXT_CHARS,
+    RETRIEVAL_VECTOR_DTYPE, RETRIEVAL_SEGMENT_ROWS, RETRIEVAL_MAX_SEGMENTS,
+    RETRIEVAL_INDEX_TYPE, RETRIEVAL_IVF_LISTS, RETRIEVAL_IVF_NPROBE, RETRIEVAL_IVF_MIN_CHUNKS,
+    RETRIEVAL_HYBRID, RETRIEVAL_RRF_K, RETRIEVAL_MIN_KEYWORD_SCORE, RETRIEVAL_JOB_HISTORY,
+)
+from .app_index import ExecutableIndex
+from .app_matcher import AppMatch, AppNameMatcher
+from .cache import ResponseCache
+from .concurrency import ConcurrencyGate, SingleFlight
+from .exceptions import AudioTooLargeError, IngestJobNotFoundError, NoDocumentSourcesError
+from .intents import INTENT_HEALTH, INTENT_LIST_APPS, INTENT_LLM, INTENT_OPEN_APP, Intent, IntentClassifier
+from .llm_registry import ModelRegistry, ModelRouter, resolve_model
+from .sessions import ChatSession, session_store
+from .speech import SpeechRecognizer
 
 # Load environment variables
 load_dotenv()
@@ -23,18 +51,235 @@ os.environ["LANGCHAIN_API_KEY"] = os.getenv("LANGCHAIN_API_KEY", "")
 os.environ["LANGCHAIN_TRACING_V2"] = "true"
 os.environ["LANGCHAIN_PROJECT"] = os.getenv("LANGCHAIN_PROJECT", "app-launcher")
 
-# Initialize LangChain components
-llm = OllamaLLM(model="gemma3")
-output_parser = StrOutputParser()
+# User turn of the prompt template; {context} holds retrieved notes and is
+# empty when retrieval is off or finds nothing relevant
+USER_PROMPT_TEMPLATE = "{context}Previous conversation:\n{chat_history}\n\nCurrent question: {question}"
 
-# Create the prompt template
-prompt = ChatPromptTemplate.from_messages([
-    ("system", LLM_SYSTEM_PROMPT),
-    ("user", "Previous conversation:\n{chat_history}\n\nCurrent question: {question}"),
-])
+# One chain per model name; the LLM stack is imported on first use or by
+# the background warm-up started in main.py
+model_registry = ModelRegistry(
+    LLM_SYSTEM_PROMPT,
+    USER_PROMPT_TEMPLATE,
+    base_url=OLLAMA_BASE_URL,
+    keep_alive=OLLAMA_KEEP_ALIVE,
+)
 
-# Create the chain
-chain = prompt | llm | output_parser
+# Optional size-based routing for requests with model "auto"
+model_router = ModelRouter(
+    small_model=LLM_ROUTE_SMALL_MODEL,
+    large_model=LLM_ROUTE_LARGE_MODEL,
+    max_words=LLM_ROUTE_MAX_WORDS,
+    max_history_chars=LLM_ROUTE_MAX_HISTORY_CHARS,
+    complex_pattern=LLM_ROUTE_COMPLEX_PATTERN,
+) if LLM_ROUTING_ENABLED else None
+
+# Gate in front of the Ollama backend; shared by every LLM endpoint
+llm_gate = ConcurrencyGate(
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    max_queue=LLM_MAX_QUEUE,
+    queue_timeout=LLM_QUEUE_TIMEOUT,
+    retry_after=LLM_RETRY_AFTER,
+)
+
+# Coalesces identical in-flight generations
+llm_flight = SingleFlight()
+
+def _semantic_embedder():
+    from .embeddings import get_embedder
+    return get_embedder()
+
+
+# Cache of answers, consulted before taking a gate slot
+response_cache = ResponseCache(
+    max_entries=LLM_CACHE_MAX_ENTRIES,
+    max_bytes=LLM_CACHE_MAX_BYTES,
+    ttl=LLM_CACHE_TTL,
+    similarity_threshold=LLM_CACHE_SIMILARITY,
+    embedder_factory=_semantic_embedder if LLM_CACHE_SEMANTIC else None,
+)
+
+
+# Vosk speech-to-text for the voice pipeline; vosk is imported on first use
+# or by the background warm-up started in main.py
+speech_recognizer = SpeechRecognizer(VOSK_MODEL_PATH, max_workers=SPEECH_MAX_WORKERS)
+
+
+@lru_cache(maxsize=1)
+def get_retriever():
+    """Document retriever over RETRIEVAL_INDEX_DIR, mapped on first use (imports numpy)"""
+    from .embeddings import get_embedder
+    from .retrieval import Retriever
+    return Retriever(
+        get_embedder(),
+        RETRIEVAL_INDEX_DIR,
+        chunk_words=RETRIEVAL_CHUNK_WORDS,
+        overlap=RETRIEVAL_CHUNK_OVERLAP,
+        extensions=RETRIEVAL_EXTENSIONS,
+        hybrid=RETRIEVAL_HYBRID,
+        rrf_k=RETRIEVAL_RRF_K,
+        min_keyword_score=RETRIEVAL_MIN_KEYWORD_SCORE,
+        dtype=RETRIEVAL_VECTOR_DTYPE,
+        segment_rows=RETRIEVAL_SEGMENT_ROWS,
+        max_segments=RETRIEVAL_MAX_SEGMENTS,
+        index_type=RETRIEVAL_INDEX_TYPE,
+        lists=RETRIEVAL_IVF_LISTS or None,
+        nprobe=RETRIEVAL_IVF_NPROBE,
+        ivf_min_rows=RETRIEVAL_IVF_MIN_CHUNKS,
+    )
+
+
+def retrieve_context(question: str) -> str:
+    """Retrieved notes section of the prompt for question ("" when retrieval is off)"""
+    if not RETRIEVAL_ENABLED:
+        return ""
+    try:
+        results = get_retriever().search(question, RETRIEVAL_TOP_K, RETRIEVAL_MIN_SCORE)
+    except Exception as e:
+        print(f"Retrieval failed, answering without notes: {e}")
+        return ""
+    from .retrieval import format_context
+    return format_context(results, RETRIEVAL_MAX_CONTEXT_CHARS)
+
+
+async def retrieve_contexts_async(questions: List[str]) -> List[str]:
+    """retrieve_context for several questions without blocking the event loop
+
+    The questions are embedded together and scored against the store in a
+    single matrix product.
+    """
+    if not RETRIEVAL_ENABLED:
+        return [""] * len(questions)
+    try:
+        # The first call loads the index from disk
+        retriever = await asyncio.to_thread(get_retriever)
+        results = await retriever.asearch_batch(questions, RETRIEVAL_TOP_K, RETRIEVAL_MIN_SCORE)
+    except Exception as e:
+        print(f"Retrieval failed, answering without notes: {e}")
+        return [""] * len(questions)
+    from .retrieval import format_context
+    return [format_context(result, RETRIEVAL_MAX_CONTEXT_CHARS) for result in results]
+
+
+async def ingest_documents(paths: Optional[List[str]] = None) -> Dict:
+    """Index the text files under paths (default RETRIEVAL_SOURCES) in a worker thread"""
+    paths = paths or RETRIEVAL_SOURCES
+    if not paths:
+        raise NoDocumentSourcesError()
+    retriever = await asyncio.to_thread(get_retriever)
+    return await asyncio.to_thread(retriever.ingest, paths)
+
+
+# Ingest jobs by id, oldest first; only the last RETRIEVAL_JOB_HISTORY
+# finished ones are kept
+ingest_jobs: "OrderedDict[str, Dict]" = OrderedDict()
+
+
+def _ingest_job_view(job: Dict) -> Dict:
+    """A job's progress with its elapsed time and embedding throughput"""
+    elapsed = (job["finished_at"] or time.time()) - job["started_at"]
+    return {
+        **{key: value for key, value in job.items() if key not in ("started_at", "finished_at")},
+        "elapsed": round(elapsed, 3),
+        "chunks_per_second": round(job["chunks"] / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+async def run_ingest_job(job_id: str) -> None:
+    """Run a job created by create_ingest_job, recording how it ends"""
+    job = ingest_jobs[job_id]
+    try:
+        retriever = await asyncio.to_thread(get_retriever)
+        # The retriever updates the job's counters as it goes
+        await asyncio.to_thread(retriever.ingest, job["paths"], job)
+        job["total_chunks"] = len(retriever)
+        job["status"] = "completed"
+    except Exception as e:
+        print(f"Ingest job {job['job_id']} failed: {e}")
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        job["finished_at"] = time.time()
+
+
+def create_ingest_job(paths: Optional[List[str]] = None, trigger: str = "api") -> Dict:
+    """Register an ingest of paths (default RETRIEVAL_SOURCES); run it with run_ingest_job"""
+    paths = paths or RETRIEVAL_SOURCES
+    if not paths:
+        raise NoDocumentSourcesError()
+    job = {
+        "job_id": uuid.uuid4().hex, "status": "running", "trigger": trigger, "paths": list(paths),
+        "files_total": 0, "files_done": 0, "files": 0, "unchanged_files": 0, "removed_files": 0,
+        "chunks": 0, "reused_chunks": 0, "removed_chunks": 0, "total_chunks": None, "error": None,
+        "started_at": time.time(), "finished_at": None,
+    }
+    ingest_jobs[job["job_id"]] = job
+    finished = [job_id for job_id, old in ingest_jobs.items() if old["finished_at"] is not None]
+    for job_id in finished[:max(0, len(finished) - RETRIEVAL_JOB_HISTORY)]:
+        del ingest_jobs[job_id]
+    return _ingest_job_view(job)
+
+
+def get_ingest_job(job_id: str) -> Dict:
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise IngestJobNotFoundError(job_id)
+    return _ingest_job_view(job)
+
+
+def list_ingest_jobs() -> List[Dict]:
+    """Known ingest jobs, newest first"""
+    return [_ingest_job_view(job) for job in reversed(ingest_jobs.values())]
+
+
+async def watch_documents(paths: List[str], interval: float, debounce: float) -> None:
+    """Keep the document index in step with paths
+
+    Polls file sizes and mtimes every interval seconds. Once something has
+    changed, polls every debounce seconds until two polls in a row see the
+    same changes (an editor has finished saving, a sync has finished
+    copying), then applies them all in one ingest job.
+    """
+    retriever = await asyncio.to_thread(get_retriever)
+    pending = None
+    while True:
+        try:
+            changed = await asyncio.to_thread(retriever.changed_files, paths)
+            if not changed:
+                pending = None
+            elif changed == pending:
+                print(f"Ingesting {len(changed)} changed documents")
+                job = create_ingest_job(paths, trigger="watch")
+                await run_ingest_job(job["job_id"])
+                pending = None
+            else:
+                pending = changed
+        except Exception as e:
+            print(f"Document watch failed: {e}")
+        await asyncio.sleep(debounce if pending else interval)
+
+
+async def search_documents(query: str, k: int = RETRIEVAL_TOP_K, min_score: float = 0.0) -> Dict:
+    """Top-k indexed chunks for query"""
+    start_time = time.time()
+    retriever = await asyncio.to_thread(get_retriever)
+    [results] = await retriever.asearch_batch([query], k, min_score)
+    return {
+        "query": query,
+        "results": [vars(result) for result in results],
+        "search_time_ms": round((time.time() - start_time) * 1000, 3)
+    }
+
+
+async def remove_documents(sources: List[str]) -> Dict:
+    """Tombstone the indexed chunks of sources"""
+    retriever = await asyncio.to_thread(get_retriever)
+    removed = await asyncio.to_thread(retriever.remove, sources)
+    return {"removed_chunks": removed, "total_chunks": len(retriever)}
+
+
+async def get_retrieval_stats() -> Dict:
+    retriever = await asyncio.to_thread(get_retriever)
+    return {"enabled": RETRIEVAL_ENABLED, **retriever.stats()}
 
 
 def expand_user_path(path: str) -> str:
@@ -42,29 +287,50 @@ def expand_user_path(path: str) -> str:
     return path.replace('%USERNAME%', os.getenv('USERNAME', ''))
 
 
+# Executables on PATH and in APP_DIRECTORIES, refreshed in the background
+app_index = ExecutableIndex(
+    extra_directories=APP_DIRECTORIES,
+    common_apps={name: expand_user_path(path) for name, path in COMMON_APPS.items()},
+)
+
+
+# Fuzzy matcher over app names, aliases and (ranked below them) indexed
+# executables; rebuilt lazily whenever the executable index has been refreshed
+app_matcher = AppNameMatcher(threshold=APP_MATCH_THRESHOLD, learned_path=APP_LEARNED_ALIASES_PATH)
+
+
 def find_app_in_path(app_name: str) -> Optional[str]:
     """Try to find an app in the system PATH"""
-    try:
-        result = subprocess.run(['where', app_name], 
-                              capture_output=True, text=True, shell=True)
-        if result.returncode == 0:
-            return result.stdout.strip().split('\n')[0]
-    except:
-        pass
-    return None
+    return app_index.lookup(app_name)
 
 
-def open_app(app_name: str) -> Dict:
-    """Open an application by name and return result"""
-    app_name_lower = app_name.lower().strip()
-    
+def match_app_name(app_name: str) -> Optional[AppMatch]:
+    """Find the closest known app name for a possibly misheard transcript"""
+    executables = app_index.names()
+    if app_matcher.source_version != app_index.refresh_count:
+        aliases = {name: name for name in COMMON_APPS}
+        aliases.update(APP_ALIASES)
+        app_matcher.build(aliases, executables, source_version=app_index.refresh_count)
+    return app_matcher.match(app_name)
+
+
+# Rule-based fast path that answers launch/list/health commands without the LLM
+intent_classifier = IntentClassifier(match_app_name, common_apps=COMMON_APPS, max_words=INTENT_MAX_WORDS,
+                                     confident_score=APP_CONFIDENT_MATCH_SCORE)
+
+# Model name reported for prompts answered by the intent fast path
+RULES_MODEL = "rules"
+
+
+def _open_known_app(app_name: str, app_name_lower: str) -> Optional[Dict]:
+    """Open a COMMON_APPS entry or indexed executable; None if the name is unknown"""
     # Check if it's a common app
     if app_name_lower in COMMON_APPS:
-        app_path = COMMON_APPS[app_name_lower]
-        app_path = expand_user_path(app_path)
+        resolved_path = app_index.resolve_common_app(app_name_lower)
+        app_path = resolved_path or expand_user_path(COMMON_APPS[app_name_lower])
         
         # Check if the file exists
-        if os.path.exists(app_path):
+        if resolved_path:
             try:
                 subprocess.Popen([app_path])
                 return {
@@ -106,6 +372,16 @@ def open_app(app_name: str) -> Dict:
                 "app_name": app_name,
                 "app_path": app_path
             }
+    return None
+
+
+def open_app(app_name: str) -> Dict:
+    """Open an application by name and return result"""
+    app_name_lower = app_name.lower().strip()
+    
+    result = _open_known_app(app_name, app_name_lower)
+    if result:
+        return result
     
     # Try to open as a web URL
     if app_name_lower.startswith(('http://', 'https://')):
@@ -125,6 +401,20 @@ def open_app(app_name: str) -> Dict:
                 "app_path": None
             }
     
+    # Try the closest known name (e.g. "v s code" or "crome" from speech)
+    match = match_app_name(app_name_lower)
+    if match:
+        result = _open_known_app(match.target, match.target)
+        if result:
+            result["app_name"] = app_name
+            result["matched_name"] = match.target
+            result["match_score"] = match.score
+            # Only confident matches are remembered, so a wrong guess is not
+            # repeated on every later launch
+            if result["success"] and APP_CONFIDENT_MATCH_SCORE <= match.score < 1.0:
+                app_matcher.learn(app_name_lower, match.target)
+            return result
+    
     # Try to open with default program
     try:
         subprocess.Popen(['start', app_name], shell=True)
@@ -148,6 +438,9 @@ def get_available_apps() -> Dict:
     return {
         "available_apps": sorted(COMMON_APPS.keys()),
         "total_count": len(COMMON_APPS),
+        "resolved_apps": app_index.resolved_common_apps(),
+        "aliases": {**APP_ALIASES, **app_matcher.learned},
+        "indexed_executables_count": len(app_index.names()),
         "note": "You can also try any executable name in PATH, full path to an executable, or URLs (http:// or https://)"
     }
 
@@ -157,20 +450,33 @@ def get_health_status() -> Dict:
     return {
         "status": "healthy",
         "platform": "Windows",
-        "available_apps_count": len(COMMON_APPS)
+        "available_apps_count": len(COMMON_APPS),
+        "llm_active": llm_gate.active,
+        "llm_waiting": llm_gate.waiting,
+        "llm_coalesced": llm_flight.coalesced,
+        "llm_ready": model_registry.ready,
+        "llm_warmup_time": model_registry.warmup_time,
+        "speech_ready": speech_recognizer.ready
     }
 
 
+def select_model(model: str, question: str, chat_history: str = "") -> str:
+    """Resolve the requested model name ("auto" is routed by prompt)"""
+    return resolve_model(model_router, LLM_ROUTE_LARGE_MODEL, model, question, chat_history)
+
+
 def process_with_llm(question: str, model: str = "gemma3", chat_history: str = "") -> Dict:
     """Process text through LLM and return response"""
     
     start_time = time.time()
+    model = select_model(model, question, chat_history)
     
     try:
         # Use the LangChain chain to get response from real LLM
-        response = chain.invoke({
+        response = model_registry.get_chain(model).invoke({
             "question": question,
-            "chat_history": chat_history
+            "chat_history": chat_history,
+            "context": retrieve_context(question)
         })
         
         # Clean up excessive newlines in the response
@@ -197,13 +503,275 @@ def process_with_llm(question: str, model: str = "gemma3", chat_history: str = "
         }
 
 
+# Document index version the cached answers were given with
+_cached_index_version = None
+
+
+def _forget_answers_on_index_change() -> None:
+    """Clear response_cache once the document index has changed (in any process)
+
+    Cached answers are keyed by the question, not by the notes that were
+    put into its prompt, so they go stale when documents change.
+    """
+    global _cached_index_version
+    try:
+        version = get_retriever().index_version
+    except Exception as e:
+        print(f"Retrieval failed, keeping cached answers: {e}")
+        return
+    if version != _cached_index_version:
+        if _cached_index_version is not None:
+            response_cache.clear()
+        _cached_index_version = version
+
+
+async def lookup_cached_response(question: str, model: str = "gemma3", chat_history: str = "") -> Optional[Dict]:
+    """Return a cached LLM result for the request, or None on a miss"""
+    if not LLM_CACHE_ENABLED:
+        return None
+    
+    start_time = time.time()
+    if RETRIEVAL_ENABLED:
+        await asyncio.to_thread(_forget_answers_on_index_change)
+    cached_response, cache_tier = await response_cache.lookup(model, LLM_SYSTEM_PROMPT, question, chat_history)
+    if cached_response is None:
+        return None
+    
+    return {
+        "success": True,
+        "response": cached_response,
+        "model": model,
+        "prompt": question,
+        "processing_time": round(time.time() - start_time, 3),
+        "cached": True,
+        "cache_tier": cache_tier
+    }
+
+
+async def process_with_llm_async(question: str, model: str = "gemma3", chat_history: str = "") -> Dict:
+    """Process text through LLM without blocking the event loop
+
+    Answers from response_cache are returned without touching the model.
+    Concurrent identical requests share one generation through llm_flight.
+    Otherwise waits for a slot on llm_gate; raises LLMBusyError when the
+    gate is saturated.
+    """
+    
+    model = select_model(model, question, chat_history)
+    cached = await lookup_cached_response(question, model, chat_history)
+    if cached is not None:
+        return cached
+    
+    key, _ = ResponseCache.make_key(model, LLM_SYSTEM_PROMPT, question, chat_history)
+    result = await llm_flight.run(key, lambda: _generate_with_llm(question, model, chat_history))
+    # Coalesced callers may have phrased the question differently
+    return {**result, "prompt": question}
+
+
+async def _generate_with_llm(question: str, model: str, chat_history: str) -> Dict:
+    [context] = await retrieve_contexts_async([question])
+    async with llm_gate.slot():
+        start_time = time.time()
+        
+        try:
+            response = await model_registry.get_chain(model).ainvoke({
+                "question": question,
+                "chat_history": chat_history,
+                "context": context
+            })
+            
+            cleaned_response = clean_response_formatting(response)
+            if LLM_CACHE_ENABLED:
+                await response_cache.store(model, LLM_SYSTEM_PROMPT, question, cleaned_response, chat_history)
+            
+            processing_time = time.time() - start_time
+            
+            return {
+                "success": True,
+                "response": cleaned_response,
+                "model": model,
+                "prompt": question,
+                "processing_time": round(processing_time, 3)
+            }
+            
+        except Exception as e:
+            processing_time = time.time() - start_time
+            return {
+                "success": False,
+                "response": f"Error processing with {model}: {str(e)}",
+                "model": model,
+                "prompt": question,
+                "processing_time": round(processing_time, 3)
+            }
+
+
+async def process_session_turn(session: ChatSession, question: str) -> Dict:
+    """Answer a question within a server-side session and record the turn
+
+    With OLLAMA_REUSE_CONTEXT the KV context returned by the previous turn
+    is sent back to Ollama, so only the new question is prefilled; otherwise
+    the trimmed session history is templated into the prompt as for /llm.
+    """
+    
+    [notes] = await retrieve_contexts_async([question])
+    async with session.lock, llm_gate.slot():
+        start_time = time.time()
+        context_reused = False
+        history = session_store.render_history(session)
+        model = select_model(session.model, question, history)
+        
+        try:
+            if OLLAMA_REUSE_CONTEXT:
+                # A KV context is only meaningful to the model that produced it
+                context = session.context if session.context_model == model else None
+                if context:
+                    user_prompt = notes + question
+                    context_reused = True
+                else:
+                    user_prompt = USER_PROMPT_TEMPLATE.format(context=notes, chat_history=history, question=question)
+                result = await model_registry.client.generate(
+                    model=model,
+                    prompt=user_prompt,
+                    system=LLM_SYSTEM_PROMPT,
+                    context=context,
+                    keep_alive=OLLAMA_KEEP_ALIVE
+                )
+                response, context = result.response, result.context
+            else:
+                response = await model_registry.get_chain(model).ainvoke({
+                    "question": question,
+                    "chat_history": history,
+                    "context": notes
+                })
+                context = None
+            
+            cleaned_response = clean_response_formatting(response)
+            session_store.record_turn(session, question, cleaned_response, context, model)
+            success = True
+        except Exception as e:
+            cleaned_response = f"Error processing with {model}: {str(e)}"
+            success = False
+        
+        processing_time = time.time() - start_time
+        
+        return {
+            "success": success,
+            "response": cleaned_response,
+            "model": model,
+            "prompt": question,
+            "processing_time": round(processing_time, 3),
+            "session_id": session.session_id,
+            "history_tokens": session.history_tokens,
+            "context_reused": context_reused
+        }
+
+
+async def process_llm_batch(requests: List[Dict], max_parallel: Optional[int] = None) -> Dict:
+    """Process a list of LLM requests and return per-item results in order
+
+    Cached answers are served directly and duplicate prompts are generated
+    once. The remaining prompts are grouped by model and dispatched with
+    the chain's abatch with one llm_gate slot per generation in flight: the
+    batch waits for a first slot like any request, then adds whichever slots
+    are free, up to max_parallel (default LLM_BATCH_PARALLELISM). A failing
+    item is reported in its own result and never fails the batch.
+    """
+    
+    from langchain_core.runnables import RunnableLambda
+    
+    batch_start = time.time()
+    parallelism = min(max_parallel or LLM_BATCH_PARALLELISM, LLM_BATCH_MAX_PARALLELISM)
+    results: List[Optional[Dict]] = [None] * len(requests)
+    # Cache key -> indexes of the items waiting for that generation
+    pending: Dict[str, List[int]] = {}
+    jobs: Dict[str, Dict] = {}
+    
+    for index, item in enumerate(requests):
+        question, chat_history = item["prompt"], item["chat_history"]
+        model = select_model(item["model"], question, chat_history)
+        cached = await lookup_cached_response(question, model, chat_history)
+        if cached is not None:
+            results[index] = {**cached, "index": index, "queue_time": 0.0}
+            continue
+        key, _ = ResponseCache.make_key(model, LLM_SYSTEM_PROMPT, question, chat_history)
+        if key not in pending:
+            pending[key] = []
+            jobs[key] = {"model": model, "question": question, "chat_history": chat_history}
+        pending[key].append(index)
+    
+    if jobs:
+        contexts = await retrieve_contexts_async([job["question"] for job in jobs.values()])
+        for job, context in zip(jobs.values(), contexts):
+            job["context"] = context
+        await llm_gate.acquire()
+        slots = 1 + llm_gate.try_acquire(parallelism - 1)
+        try:
+            by_model: Dict[str, List[str]] = {}
+            for key, job in jobs.items():
+                by_model.setdefault(job["model"], []).append(key)
+            
+            for model, keys in by_model.items():
+                chain = model_registry.get_chain(model)
+                
+                async def timed_invoke(inputs: Dict, chain=chain) -> Dict:
+                    started = time.time()
+                    response = await chain.ainvoke(inputs)
+                    return {"response": response, "started": started, "finished": time.time()}
+                
+                outputs = await RunnableLambda(timed_invoke).abatch(
+                    [
+                        {"question": jobs[key]["question"], "chat_history": jobs[key]["chat_history"],
+                         "context": jobs[key]["context"]}
+                        for key in keys
+                    ],
+                    config={"max_concurrency": slots},
+                    return_exceptions=True
+                )
+                
+                for key, output in zip(keys, outputs):
+                    job = jobs[key]
+                    if isinstance(output, Exception):
+                        success = False
+                        response = f"Error processing with {model}: {str(output)}"
+                        queue_time = processing_time = None
+                    else:
+                        success = True
+                        response = clean_response_formatting(output["response"])
+                        queue_time = round(output["started"] - batch_start, 3)
+                        processing_time = round(output["finished"] - output["started"], 3)
+                        if LLM_CACHE_ENABLED:
+                            await response_cache.store(model, LLM_SYSTEM_PROMPT, job["question"], response, job["chat_history"])
+                    
+                    for index in pending[key]:
+                        results[index] = {
+                            "index": index,
+                            "success": success,
+                            "response": response,
+                            "model": model,
+                            "prompt": requests[index]["prompt"],
+                            "processing_time": processing_time,
+                            "queue_time": queue_time
+                        }
+        finally:
+            for _ in range(slots):
+                llm_gate.release()
+    
+    success_count = sum(1 for result in results if result["success"])
+    return {
+        "results": results,
+        "total_count": len(results),
+        "success_count": success_count,
+        "failure_count": len(results) - success_count,
+        "processing_time": round(time.time() - batch_start, 3)
+    }
+
+
 def clean_response_formatting(response: str) -> str:
     """Clean up excessive newlines and formatting issues in LLM responses"""
     if not response:
         return response
     
     # Replace multiple consecutive newlines with at most 2 newlines
-    import re
     cleaned = re.sub(r'\n{3,}', '\n\n', response)
     
     # Remove leading/trailing whitespace
@@ -218,4 +786,289 @@ def clean_response_formatting(response: str) -> str:
     return cleaned
 
 
- 
\ No newline at end of file
+class IncrementalResponseCleaner:
+    """Apply clean_response_formatting to a response that arrives in chunks
+
+    Trailing whitespace of every chunk is held back until the next
+    non-whitespace text arrives, so whitespace runs are never split across
+    chunks and the concatenated output equals clean_response_formatting()
+    of the full response. Trailing whitespace still pending at the end of
+    the stream is simply dropped.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._started = False
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk and return the cleaned text that is safe to emit"""
+        text = self._pending + chunk
+        stripped = text.rstrip()
+        if not stripped:
+            self._pending = text
+            return ""
+
+        self._pending = text[len(stripped):]
+        if not self._started:
+            stripped = stripped.lstrip()
+            self._started = True
+
+        cleaned = re.sub(r'\n{3,}', '\n\n', stripped)
+        cleaned = re.sub(r' +', ' ', cleaned)
+        cleaned = re.sub(r'\n\s*\n\s*\n', '\n\n', cleaned)
+        return cleaned
+
+
+async def stream_with_llm(question: str, model: str = "gemma3", chat_history: str = "",
+                          context: str = "") -> AsyncIterator[Dict]:
+    """Stream an LLM response as token frames followed by a final summary frame
+
+    ``context`` is the retrieved notes section of the prompt. Callers are
+    responsible for holding a llm_gate slot while iterating; see
+    open_llm_stream.
+    """
+    
+    start_time = time.time()
+    first_token_time = None
+    chunks = 0
+    cleaner = IncrementalResponseCleaner()
+    parts = []
+    
+    try:
+        async for chunk in model_registry.get_chain(model).astream({
+            "question": question,
+            "chat_history": chat_history,
+            "context": context
+        }):
+            if not chunk:
+                continue
+            if first_token_time is None:
+                first_token_time = time.time()
+            chunks += 1
+            
+            piece = cleaner.feed(chunk)
+            if piece:
+                parts.append(piece)
+                yield {"type": "token", "content": piece}
+        
+        # Held-back trailing whitespace is dropped, matching strip()
+        success = True
+        response = "".join(parts)
+        if LLM_CACHE_ENABLED:
+            await response_cache.store(model, LLM_SYSTEM_PROMPT, question, response, chat_history)
+    except Exception as e:
+        success = False
+        response = f"Error processing with {model}: {str(e)}"
+    
+    end_time = time.time()
+    time_to_first_token = None
+    chunks_per_second = None
+    if first_token_time is not None:
+        time_to_first_token = round(first_token_time - start_time, 3)
+        generation_time = end_time - first_token_time
+        if generation_time > 0:
+            chunks_per_second = round(chunks / generation_time, 2)
+    
+    yield {
+        "type": "final",
+        "success": success,
+        "response": response,
+        "model": model,
+        "prompt": question,
+        "processing_time": round(end_time - start_time, 3),
+        "time_to_first_token": time_to_first_token,
+        "chunks_per_second": chunks_per_second,
+        "chunks": chunks
+    }
+
+
+async def open_llm_stream(question: str, model: str = "gemma3", chat_history: str = "") -> AsyncIterator[Dict]:
+    """Prepare a streamed LLM response and return its frame iterator
+
+    Cache hits are replayed as a single token frame without touching the
+    model. Identical concurrent requests subscribe to one shared generation
+    through llm_flight. The first of them takes a llm_gate slot up front, so
+    saturation raises LLMBusyError here rather than as an error frame inside
+    the stream; the slot is released when the generation finishes or its
+    last subscriber goes away.
+    """
+    model = select_model(model, question, chat_history)
+    cached = await lookup_cached_response(question, model, chat_history)
+    if cached is not None:
+        return _replay_cached_response(cached)
+    
+    async def open_source() -> AsyncIterator[Dict]:
+        [context] = await retrieve_contexts_async([question])
+        await llm_gate.acquire()
+        return _gated_stream(stream_with_llm(question, model, chat_history, context))
+    
+    key, _ = ResponseCache.make_key(model, LLM_SYSTEM_PROMPT, question, chat_history)
+    return await llm_flight.stream(key, open_source)
+
+
+async def _replay_cached_response(result: Dict) -> AsyncIterator[Dict]:
+    yield {"type": "token", "content": result["response"]}
+    yield {
+        "type": "final",
+        **result,
+        "time_to_first_token": result["processing_time"],
+        "chunks": 0
+    }
+
+
+async def _gated_stream(frames: AsyncIterator[Dict]) -> AsyncIterator[Dict]:
+    try:
+        async for frame in frames:
+            yield frame
+    finally:
+        llm_gate.release()
+
+
+def run_command(intent: Intent) -> Dict:
+    """Execute a launch, list or health intent without the LLM"""
+    if intent.name == INTENT_OPEN_APP:
+        result = open_app(intent.app_name)
+        return {"success": result["success"], "message": result["message"], "result": result}
+    if intent.name == INTENT_LIST_APPS:
+        result = get_available_apps()
+        return {"success": True, "message": f"Available apps: {', '.join(result['available_apps'])}", "result": result}
+    if intent.name == INTENT_HEALTH:
+        result = get_health_status()
+        return {"success": True, "message": f"Status: {result['status']}", "result": result}
+    raise ValueError(f"Not a command intent: {intent.name}")
+
+
+def _intent_fields(intent: Intent) -> Dict:
+    return {"intent": intent.name, "classification_time_us": intent.classification_time_us}
+
+
+async def _command_response(intent: Intent, question: str) -> Dict:
+    start_time = time.time()
+    # Launching may stat files and rebuild the fuzzy matcher
+    command = await asyncio.to_thread(run_command, intent)
+    return {
+        "success": command["success"],
+        "response": command["message"],
+        "model": RULES_MODEL,
+        "prompt": question,
+        "processing_time": round(time.time() - start_time, 3),
+        "action": command["result"],
+        **_intent_fields(intent)
+    }
+
+
+async def process_prompt_async(question: str, model: str = "gemma3", chat_history: str = "") -> Dict:
+    """Answer a prompt: commands run directly, anything else goes to the LLM
+
+    With INTENT_FAST_PATH_ENABLED the prompt is classified first (on a
+    worker thread, since matching may rebuild the app matcher);
+    launch/list/health commands are executed without taking a gate slot
+    and reported with model "rules".
+    """
+    if not INTENT_FAST_PATH_ENABLED:
+        return await process_with_llm_async(question, model, chat_history)
+    
+    intent = await asyncio.to_thread(intent_classifier.classify, question)
+    if intent.is_command:
+        return await _command_response(intent, question)
+    result = await process_with_llm_async(question, model, chat_history)
+    return {**result, **_intent_fields(intent)}
+
+
+async def open_prompt_stream(question: str, model: str = "gemma3", chat_history: str = "") -> AsyncIterator[Dict]:
+    """Streaming counterpart of process_prompt_async
+
+    A command's result is sent as a single token frame and a final frame;
+    otherwise this is open_llm_stream with the intent added to the final
+    frame.
+    """
+    if not INTENT_FAST_PATH_ENABLED:
+        return await open_llm_stream(question, model, chat_history)
+    
+    intent = await asyncio.to_thread(intent_classifier.classify, question)
+    if intent.is_command:
+        return _replay_cached_response(await _command_response(intent, question))
+    frames = await open_llm_stream(question, model, chat_history)
+    return _with_final_fields(frames, _intent_fields(intent))
+
+
+async def _with_final_fields(frames: AsyncIterator[Dict], fields: Dict) -> AsyncIterator[Dict]:
+    try:
+        async for frame in frames:
+            yield {**frame, **fields} if frame["type"] == "final" else frame
+    finally:
+        await frames.aclose()
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+async def open_voice_pipeline(audio: bytes, sample_rate: int, model: str = "gemma3",
+                              chat_history: str = "") -> AsyncIterator[Dict]:
+    """Transcribe audio, classify it and act on it; returns the frame iterator
+
+    Speech is decoded on speech_recognizer's threads and the transcript is
+    classified by intent_classifier. A command is executed before this
+    returns; a question opens a LLM stream with open_llm_stream, so a
+    saturated gate raises LLMBusyError here rather than inside the stream.
+    The frames are a transcript frame, an intent frame, then an action
+    frame or the LLM token/final frames, and last a done frame with
+    per-stage latencies in milliseconds.
+    """
+    if len(audio) > SPEECH_MAX_AUDIO_BYTES:
+        raise AudioTooLargeError(len(audio), SPEECH_MAX_AUDIO_BYTES)
+    
+    pipeline_start = time.perf_counter()
+    timings: Dict[str, float] = {}
+    
+    stage_start = time.perf_counter()
+    transcript = await speech_recognizer.transcribe(audio, sample_rate)
+    timings["stt"] = _elapsed_ms(stage_start)
+    
+    # A cache miss in match_app_name rebuilds the matcher from the index
+    intent = await asyncio.to_thread(intent_classifier.classify, transcript["text"])
+    timings["intent"] = round(intent.classification_time_us / 1000, 3)
+    
+    action = None
+    llm_frames = None
+    stage_start = time.perf_counter()
+    if intent.is_command:
+        # Launching may stat files and rebuild the fuzzy matcher
+        action = {"intent": intent.name, **await asyncio.to_thread(run_command, intent)}
+        timings["action"] = _elapsed_ms(stage_start)
+    elif intent.name == INTENT_LLM:
+        llm_frames = await open_llm_stream(transcript["text"], model, chat_history)
+        timings["llm_queue"] = _elapsed_ms(stage_start)
+    
+    return _voice_pipeline_frames(transcript, intent, action, llm_frames, timings, pipeline_start)
+
+
+async def _voice_pipeline_frames(transcript: Dict, intent: Intent, action: Optional[Dict],
+                                 llm_frames: Optional[AsyncIterator[Dict]], timings: Dict[str, float],
+                                 pipeline_start: float) -> AsyncIterator[Dict]:
+    # Closing the LLM stream on any exit (a client disconnect included)
+    # releases its gate slot at once rather than when it is collected
+    try:
+        yield {"type": "transcript", **transcript}
+        yield {
+            "type": "intent",
+            **_intent_fields(intent),
+            "app_name": intent.app_name,
+            "matched_name": intent.matched_name,
+            "match_score": intent.match_score
+        }
+        if action is not None:
+            yield {"type": "action", **action}
+        if llm_frames is not None:
+            stage_start = time.perf_counter()
+            async for frame in llm_frames:
+                if frame["type"] == "token" and "llm_first_token" not in timings:
+                    timings["llm_first_token"] = _elapsed_ms(stage_start)
+                yield frame
+            timings["llm"] = _elapsed_ms(stage_start)
+        timings["total"] = _elapsed_ms(pipeline_start)
+        yield {"type": "done", "timings_ms": timings}
+    finally:
+        if llm_frames is not None:
+            await llm_frames.aclose()
@@ -0,0 +1,156 @@
+"""
+Server-side conversation sessions for the LLM endpoints
+"""
+
+import asyncio
+import re
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .config import SESSION_MAX_COUNT, SESSION_SUMMARY_TOKENS, SESSION_TOKEN_BUDGET, SESSION_TTL
+from .exceptions import SessionNotFoundError
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+@dataclass
+class ChatTurn:
+    """A single message in a session"""
+    role: str
+    content: str
+    tokens: int
+
+
+@dataclass
+class ChatSession:
+    """Conversation state kept on the server between turns"""
+    session_id: str
+    model: str
+    created_at: float
+    updated_at: float
+    turns: List[ChatTurn] = field(default_factory=list)
+    summary: str = ""
+    # Ollama KV context returned by the previous generation, if reused,
+    # and the model that produced it
+    context: Optional[List[int]] = None
+    context_model: Optional[str] = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    @property
+    def history_tokens(self) -> int:
+        """Estimated tokens of summary plus retained turns"""
+        return estimate_tokens(self.summary) + sum(turn.tokens for turn in self.turns)
+
+
+class SessionStore:
+    """In-memory session store with idle expiry and a token budget
+
+    When a session's history exceeds ``token_budget`` the oldest turns are
+    folded into a rolling summary (the first sentence of each evicted
+    message), which is itself capped at ``summary_tokens``.
+    """
+
+    def __init__(self, token_budget: int, summary_tokens: int, ttl: float, max_sessions: int):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, model: str) -> ChatSession:
+        """Create a new empty session"""
+        self._reap()
+        while len(self._sessions) >= self.max_sessions:
+            self._sessions.popitem(last=False)
+
+        now = time.time()
+        session = ChatSession(session_id=uuid.uuid4().hex, model=model, created_at=now, updated_at=now)
+        self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id: str) -> ChatSession:
+        """Look up a live session or raise SessionNotFoundError"""
+        self._reap()
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionNotFoundError(session_id)
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> None:
+        """Remove a session"""
+        if self._sessions.pop(session_id, None) is None:
+            raise SessionNotFoundError(session_id)
+
+    def render_history(self, session: ChatSession) -> str:
+        """Render summary and turns in the chat_history format used by /llm"""
+        lines = []
+        if session.summary:
+            lines.append(f"Summary of earlier conversation:\n{session.summary}")
+        lines.extend(f"{turn.role}: {turn.content}" for turn in session.turns)
+        return "\n".join(lines)
+
+    def record_turn(self, session: ChatSession, question: str, answer: str,
+                    context: Optional[List[int]] = None, model: Optional[str] = None) -> None:
+        """Append a question/answer pair and enforce the token budget"""
+        session.turns.append(ChatTurn("user", question, estimate_tokens(question)))
+        session.turns.append(ChatTurn("assistant", answer, estimate_tokens(answer)))
+        session.context = context
+        session.context_model = model
+        session.updated_at = time.time()
+
+        trimmed = False
+        # Always keep the latest exchange verbatim
+        while session.history_tokens > self.token_budget and len(session.turns) > 2:
+            self._fold_into_summary(session, session.turns.pop(0))
+            trimmed = True
+
+        # The KV context covers the full, untrimmed conversation; drop it once
+        # it no longer matches the history or outgrows the budget so the next
+        # turn re-prefills from the trimmed history
+        if trimmed or (session.context and len(session.context) > self.token_budget):
+            session.context = None
+
+    def _fold_into_summary(self, session: ChatSession, turn: ChatTurn) -> None:
+        first_sentence = re.split(r'(?<=[.!?])\s', turn.content.strip(), maxsplit=1)[0]
+        lines = session.summary.splitlines() if session.summary else []
+        lines.append(f"{turn.role}: {first_sentence}")
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_tokens:
+            lines.pop(0)
+        session.summary = "\n".join(lines)
+
+    def _reap(self) -> None:
+        cutoff = time.time() - self.ttl
+        expired = [sid for sid, session in self._sessions.items() if session.updated_at < cutoff]
+        for session_id in expired:
+            del self._sessions[session_id]
+
+
+def session_info(session: ChatSession) -> Dict:
+    """Serializable view of a session"""
+    return {
+        "session_id": session.session_id,
+        "model": session.model,
+        "created_at": session.created_at,
+        "updated_at": session.updated_at,
+        "turns": [{"role": turn.role, "content": turn.content} for turn in session.turns],
+        "summary": session.summary,
+        "history_tokens": session.history_tokens,
+    }
+
+
+session_store = SessionStore(
+    token_budget=SESSION_TOKEN_BUDGET,
+    summary_tokens=SESSION_SUMMARY_TOKENS,
+    ttl=SESSION_TTL,
+    max_sessions=SESSION_MAX_COUNT,
+)
@@ -0,0 +1,150 @@
+"""
+Speech-to-text for the voice pipeline
+
+vosk is imported and its model loaded on first use (or by warm_up) rather
+than at module import, so starting the API does not pay for it.
+"""
+
+import asyncio
+import io
+import json
+import logging
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .config import SPEECH_MAX_SAMPLE_RATE, SPEECH_MIN_SAMPLE_RATE
+from .exceptions import AudioDecodeError, SpeechUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# Audio is fed to the recognizer in pieces of this many bytes
+FEED_BYTES = 8000
+
+
+def read_pcm16(audio: bytes, sample_rate: int) -> Tuple[bytes, int]:
+    """Return mono PCM16 bytes and their sample rate
+
+    ``audio`` is either a 16-bit PCM WAV file (any rate, channels are
+    averaged) or headerless PCM16 mono at ``sample_rate``.
+    """
+    if audio[:4] != b"RIFF":
+        return audio[:len(audio) - len(audio) % 2], sample_rate
+
+    try:
+        with wave.open(io.BytesIO(audio)) as wav:
+            channels, sample_width = wav.getnchannels(), wav.getsampwidth()
+            sample_rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise AudioDecodeError(f"Invalid WAV file: {e}")
+    if sample_width != 2:
+        raise AudioDecodeError(f"Only 16-bit PCM WAV is supported, got {8 * sample_width}-bit")
+    if not SPEECH_MIN_SAMPLE_RATE <= sample_rate <= SPEECH_MAX_SAMPLE_RATE:
+        raise AudioDecodeError(f"Unsupported WAV sample rate {sample_rate} Hz "
+                               f"(expected {SPEECH_MIN_SAMPLE_RATE}-{SPEECH_MAX_SAMPLE_RATE})")
+    if channels > 1:
+        import numpy as np
+
+        samples = np.frombuffer(frames, dtype="<i2").reshape(-1, channels)
+        frames = samples.mean(axis=1).astype("<i2").tobytes()
+    return frames, sample_rate
+
+
+class SpeechRecognizer:
+    """Vosk decoding on a dedicated thread pool
+
+    Decoding is CPU-bound and runs in native code that releases the GIL,
+    so it is kept off the event loop on ``max_workers`` threads. Reset
+    recognizers are kept per sample rate and reused, since building one
+    allocates fresh decoder state.
+    """
+
+    def __init__(self, model_path: str, max_workers: int = 2):
+        self.model_path = model_path
+        self.max_workers = max(1, max_workers)
+        self.ready = False
+        self.load_time: Optional[float] = None
+        self.load_error: Optional[str] = None
+        self._model = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._idle: Dict[int, List] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="speech")
+        return self._executor
+
+    def load(self):
+        """Return the Vosk model, loading it on first use"""
+        with self._lock:
+            if self._model is None:
+                start_time = time.time()
+                try:
+                    import vosk
+
+                    vosk.SetLogLevel(-1)
+                    self._model = vosk.Model(self.model_path)
+                except Exception as e:
+                    self.load_error = str(e)
+                    raise SpeechUnavailableError(f"Could not load Vosk model from {self.model_path}: {e}")
+                self.load_time = round(time.time() - start_time, 3)
+                self.load_error = None
+                self.ready = True
+            return self._model
+
+    def _new_recognizer(self, sample_rate: int):
+        from vosk import KaldiRecognizer
+
+        return KaldiRecognizer(self.load(), sample_rate)
+
+    def _acquire(self, sample_rate: int):
+        with self._lock:
+            idle = self._idle.get(sample_rate)
+            if idle:
+                return idle.pop()
+        return self._new_recognizer(sample_rate)
+
+    def _release(self, recognizer, sample_rate: int) -> None:
+        recognizer.Reset()
+        with self._lock:
+            idle = self._idle.setdefault(sample_rate, [])
+            if len(idle) < self.max_workers:
+                idle.append(recognizer)
+
+    def recognize(self, pcm: bytes, sample_rate: int) -> Dict:
+        """Decode PCM16 mono audio in the calling thread"""
+        start_time = time.time()
+        recognizer = self._acquire(sample_rate)
+        segments = []
+        try:
+            for offset in range(0, len(pcm), FEED_BYTES):
+                if recognizer.AcceptWaveform(pcm[offset:offset + FEED_BYTES]):
+                    segments.append(json.loads(recognizer.Result()).get("text", ""))
+            segments.append(json.loads(recognizer.FinalResult()).get("text", ""))
+        finally:
+            self._release(recognizer, sample_rate)
+
+        return {
+            "text": " ".join(segment for segment in segments if segment),
+            "audio_duration": round(len(pcm) / (2 * sample_rate), 3),
+            "decode_time": round(time.time() - start_time, 3)
+        }
+
+    async def transcribe(self, audio: bytes, sample_rate: int = 16000) -> Dict:
+        """Transcribe a WAV file or raw PCM16 without blocking the event loop"""
+        pcm, sample_rate = read_pcm16(audio, sample_rate)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.recognize, pcm, sample_rate)
+
+    async def warm_up(self) -> None:
+        """Load the model in the background; failures are logged, not raised"""
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.load)
+            logger.info(f"Loaded Vosk model from {self.model_path} in {self.load_time}s")
+        except Exception as e:
+            logger.warning(f"Speech warm-up failed: {e}")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+IVF approximate search against exact search over a segment index
+
+Fills a memory-mapped segment index in a temporary directory with
+clustered synthetic unit vectors (embeddings of related notes sit close
+together), trains IVF centroids on it, then inserts more rows that are
+assigned to the existing lists. For exact search and for each --nprobe it
+reports:
+  - recall@k: the share of the exact top k that the search returns
+  - single-query latency p50/p95
+  - batched throughput in queries/s
+
+Run from the backend directory:
+    python benchmarks/bench_ann.py --rows 300000 --nprobe 4,16,64
+Pass --max-p95-ms / --min-recall to exit non-zero on regressions; both are
+checked at the last --nprobe value.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.retrieval import SegmentStore  # noqa: E402
+
+
+def make_vectors(rng, rows: int, centers: np.ndarray, spread: float) -> np.ndarray:
+    """Rows scattered around randomly chosen cluster centres"""
+    picked = centers[rng.integers(0, len(centers), size=rows)]
+    return picked + spread * rng.normal(size=picked.shape).astype(np.float32)
+
+
+def add_rows(store: SegmentStore, vectors: np.ndarray, first_id: int, batch: int = 8192) -> None:
+    for start in range(0, len(vectors), batch):
+        rows = range(first_id + start, first_id + min(start + batch, len(vectors)))
+        store.add(vectors[start:start + batch], [{"source": f"doc{i // 8}.md", "chunk": i % 8, "text": ""} for i in rows])
+    store.flush()
+
+
+def measure(store: SegmentStore, queries: np.ndarray, k: int, batch: int, **options):
+    """(ids, per-query latencies in ms, batched queries/s) of one search setting"""
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        store.search(query, k, **options)
+        latencies.append((time.perf_counter() - started) * 1000)
+    start = time.perf_counter()
+    ids = np.concatenate([
+        store.search(queries[offset:offset + batch], k, **options)[1]
+        for offset in range(0, len(queries), batch)
+    ])
+    return ids, latencies, len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--insert-rows", type=int, default=20000, help="rows added after training")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--spread", type=float, default=0.05, help="noise per dimension around each cluster centre")
+    parser.add_argument("--dtype", choices=["int8", "float16"], default="int8")
+    parser.add_argument("--lists", type=int, default=None, help="IVF lists (default about sqrt(rows))")
+    parser.add_argument("--nprobe", default="1,4,16,64", help="comma-separated nprobe values")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-p95-ms", type=float, default=None)
+    parser.add_argument("--min-recall", type=float, default=None)
+    args = parser.parse_args()
+    nprobes = [int(n) for n in args.nprobe.split(",")]
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.normal(size=(args.clusters, args.dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    queries = make_vectors(rng, args.queries, centers, args.spread)
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        store = SegmentStore(index_dir, dtype=args.dtype, index_type="ivf", lists=args.lists,
+                             ivf_min_rows=0, auto_compact=False)
+        start = time.perf_counter()
+        add_rows(store, make_vectors(rng, args.rows, centers, args.spread), 0)
+        write_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.compact(force=True)
+        train_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        add_rows(store, make_vectors(rng, args.insert_rows, centers, args.spread), args.rows)
+        insert_seconds = time.perf_counter() - start
+
+        stats = store.stats()
+        print(f"index:                  {len(store)} rows x dim {args.dim}, {args.dtype}, {stats['lists']} lists")
+        print(f"write segments:         {args.rows / write_seconds:10.1f} rows/s")
+        print(f"train + regroup:        {train_seconds:10.2f} s")
+        if args.insert_rows:
+            print(f"incremental insert:     {args.insert_rows / insert_seconds:10.1f} rows/s")
+        print()
+        print(f"{'search':<12}{f'recall@{args.k}':>10}{'p50 ms':>10}{'p95 ms':>10}{'queries/s':>12}")
+
+        exact_ids, latencies, qps = measure(store, queries, args.k, args.batch, exact=True)
+        print(f"{'exact':<12}{1.0:>10.3f}{np.percentile(latencies, 50):>10.3f}"
+              f"{np.percentile(latencies, 95):>10.3f}{qps:>12.1f}")
+        for nprobe in nprobes:
+            ids, latencies, qps = measure(store, queries, args.k, args.batch, nprobe=nprobe)
+            recall = float(np.mean([len(np.intersect1d(a, e)) / len(e) for a, e in zip(ids, exact_ids)]))
+            p95 = float(np.percentile(latencies, 95))
+            print(f"{f'nprobe {nprobe}':<12}{recall:>10.3f}{np.percentile(latencies, 50):>10.3f}{p95:>10.3f}{qps:>12.1f}")
+
+    failed = False
+    if args.max_p95_ms is not None and p95 > args.max_p95_ms:
+        print(f"FAIL: p95 latency at nprobe {nprobes[-1]} exceeds {args.max_p95_ms} ms")
+        failed = True
+    if args.min_recall is not None and recall < args.min_recall:
+        print(f"FAIL: recall@{args.k} at nprobe {nprobes[-1]} below {args.min_recall}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
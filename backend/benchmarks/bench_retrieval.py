@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Retrieval latency and recall benchmark over a synthetic corpus
+
+Builds a corpus of topic-flavoured chunks from a random vocabulary, indexes
+it with the offline hashing embedder, then asks queries made of a handful
+of words sampled from one known chunk (plus noise words). Reports:
+  - ingest throughput (embed + append)
+  - single-query latency, split into embedding and store search
+  - batched search throughput (one matrix product per batch)
+  - recall@k: how often the source chunk is among the top k
+  - BM25 keyword search latency and recall@k, and recall@k of the
+    hybrid (dense + BM25 fused by reciprocal rank) search
+
+With --store float16 or int8 the chunks are written to a memory-mapped
+segment index in a temporary directory, and the time to open it again
+(a worker's cold start) and its size on disk are reported too.
+
+Run from the backend directory:
+    python benchmarks/bench_retrieval.py --chunks 20000 --k 5
+    python benchmarks/bench_retrieval.py --store int8
+Pass --max-p95-ms / --min-recall to exit non-zero on regressions.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.embeddings import HashingEmbedder  # noqa: E402
+from app.retrieval import Chunk, Retriever, SegmentStore  # noqa: E402
+
+
+def make_corpus(rng, num_chunks: int, chunk_words: int, topics: int = 50, vocab_size: int = 20000):
+    """Chunks whose words come mostly from one topic's slice of the vocabulary"""
+    vocab = np.array([f"w{i:05d}{chr(97 + i % 26)}" for i in range(vocab_size)])
+    topic_words = [rng.choice(vocab_size, size=400, replace=False) for _ in range(topics)]
+    chunks = []
+    for index in range(num_chunks):
+        own = rng.choice(topic_words[index % topics], size=int(chunk_words * 0.7))
+        common = rng.integers(0, vocab_size, size=chunk_words - len(own))
+        words = vocab[np.concatenate([own, common])]
+        rng.shuffle(words)
+        chunks.append(Chunk(f"doc{index // 8}.md", index % 8, " ".join(words)))
+    return chunks, vocab
+
+
+def make_queries(rng, chunks, vocab, count: int, query_words: int, noise_words: int):
+    """(query text, id of the chunk it was sampled from) pairs"""
+    queries = []
+    for target in rng.integers(0, len(chunks), size=count):
+        words = rng.choice(chunks[target].text.split(), size=query_words, replace=False).tolist()
+        words += vocab[rng.integers(0, len(vocab), size=noise_words)].tolist()
+        queries.append((" ".join(words), int(target)))
+    return queries
+
+
+def percentile(values, q: float) -> float:
+    return float(np.percentile(values, q))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--chunk-words", type=int, default=120)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--query-words", type=int, default=8)
+    parser.add_argument("--noise-words", type=int, default=2)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--store", choices=["memory", "float16", "int8"], default="memory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-p95-ms", type=float, default=None)
+    parser.add_argument("--min-recall", type=float, default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    chunks, vocab = make_corpus(rng, args.chunks, args.chunk_words)
+    queries = make_queries(rng, chunks, vocab, args.queries, args.query_words, args.noise_words)
+    embedder = HashingEmbedder(args.dim)
+    index_dir = tempfile.TemporaryDirectory() if args.store != "memory" else None
+    if index_dir:
+        retriever = Retriever(embedder, index_dir.name, dtype=args.store, segment_rows=len(chunks), auto_compact=False)
+    else:
+        retriever = Retriever(embedder)
+
+    start = time.perf_counter()
+    for offset in range(0, len(chunks), retriever.batch_size):
+        retriever.add_chunks(chunks[offset:offset + retriever.batch_size])
+    retriever.store.flush()
+    ingest_seconds = time.perf_counter() - start
+
+    if index_dir:
+        start = time.perf_counter()
+        retriever.store = SegmentStore(index_dir.name)
+        open_ms = (time.perf_counter() - start) * 1000
+
+    texts = [text for text, _ in queries]
+    targets = np.array([target for _, target in queries])
+    query_vectors = embedder.embed_array(texts)
+
+    embed_ms, search_ms = [], []
+    for text, vector in zip(texts, query_vectors):
+        started = time.perf_counter()
+        embedder.embed_array([text])
+        embedded = time.perf_counter()
+        retriever.store.search(vector, args.k)
+        embed_ms.append((embedded - started) * 1000)
+        search_ms.append((time.perf_counter() - embedded) * 1000)
+    total_ms = [e + s for e, s in zip(embed_ms, search_ms)]
+
+    start = time.perf_counter()
+    ids = np.concatenate([
+        retriever.store.search(query_vectors[offset:offset + args.batch], args.k)[1]
+        for offset in range(0, len(query_vectors), args.batch)
+    ])
+    batch_seconds = time.perf_counter() - start
+
+    recall = float((ids == targets[:, None]).any(axis=1).mean())
+    top1 = float((ids[:, 0] == targets).mean())
+
+    keyword_ms, keyword_hits, hybrid_ms, hybrid_hits = [], 0, [], 0
+    for (text, target), vector in zip(queries, query_vectors):
+        key = (chunks[target].source, chunks[target].index)
+        started = time.perf_counter()
+        found = retriever.store.search_text(text, args.k)
+        keyword_ms.append((time.perf_counter() - started) * 1000)
+        keyword_hits += key in {(chunk["source"], chunk["chunk"]) for _, chunk in found}
+        started = time.perf_counter()
+        [fused] = retriever.search_hybrid([text], vector[None], args.k)
+        hybrid_ms.append((time.perf_counter() - started) * 1000)
+        hybrid_hits += key in {(result.source, result.chunk) for result in fused}
+
+    print(f"corpus:                 {len(chunks)} chunks x {args.chunk_words} words, dim {args.dim}, {args.store} store")
+    print(f"ingest:                 {len(chunks) / ingest_seconds:10.1f} chunks/s  ({ingest_seconds:.2f} s)")
+    if index_dir:
+        print(f"open index:             {open_ms:10.3f} ms  ({retriever.store.stats()['size_bytes'] / 2**20:.1f} MiB on disk)")
+    print(f"query embed:            p50 {percentile(embed_ms, 50):7.3f} ms  p95 {percentile(embed_ms, 95):7.3f} ms")
+    print(f"{f'store search (k={args.k}):':<24}p50 {percentile(search_ms, 50):7.3f} ms  p95 {percentile(search_ms, 95):7.3f} ms")
+    print(f"end to end:             p50 {percentile(total_ms, 50):7.3f} ms  p95 {percentile(total_ms, 95):7.3f} ms  "
+          f"(mean {statistics.mean(total_ms):.3f})")
+    print(f"{f'batched search ({args.batch}):':<24}{len(queries) / batch_seconds:10.1f} queries/s")
+    print(f"{f'recall@{args.k}:':<24}{recall:.3f}   (recall@1 {top1:.3f})")
+    print(f"{f'bm25 search (k={args.k}):':<24}p50 {percentile(keyword_ms, 50):7.3f} ms  "
+          f"p95 {percentile(keyword_ms, 95):7.3f} ms  recall@{args.k} {keyword_hits / len(queries):.3f}")
+    print(f"{'hybrid search:':<24}p50 {percentile(hybrid_ms, 50):7.3f} ms  "
+          f"p95 {percentile(hybrid_ms, 95):7.3f} ms  recall@{args.k} {hybrid_hits / len(queries):.3f}")
+
+    failed = False
+    if args.max_p95_ms is not None and percentile(total_ms, 95) > args.max_p95_ms:
+        print(f"FAIL: p95 latency exceeds {args.max_p95_ms} ms")
+        failed = True
+    if args.min_recall is not None and recall < args.min_recall:
+        print(f"FAIL: recall@{args.k} below {args.min_recall}")
+        failed = True
+    if index_dir:
+        index_dir.cleanup()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
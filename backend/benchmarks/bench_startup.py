@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the FastAPI backend
+
+Measures, in fresh interpreters:
+  - import time of app.main
+  - time from launching uvicorn to the first 200 from /health
+
+Run from the backend directory:
+    python benchmarks/bench_startup.py --runs 5
+Pass --max-import-ms / --max-first-response-ms to exit non-zero on
+regressions (e.g. in CI).
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import app.main; "
+    "print((time.perf_counter() - start) * 1000)"
+)
+
+
+def measure_import_ms() -> float:
+    """Import app.main in a fresh interpreter and return the time in ms"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response_ms(timeout: float = 30.0) -> float:
+    """Start uvicorn and return ms until /health first answers 200"""
+    port = free_port()
+    env = dict(os.environ, LLM_PREWARM_MODELS="")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"/health did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-first-response-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    import_times = [measure_import_ms() for _ in range(args.runs)]
+    response_times = [measure_first_response_ms() for _ in range(args.runs)]
+
+    import_median = statistics.median(import_times)
+    response_median = statistics.median(response_times)
+    print(f"import app.main:        median {import_median:8.1f} ms  (min {min(import_times):.1f}, max {max(import_times):.1f})")
+    print(f"launch to first 200:    median {response_median:8.1f} ms  (min {min(response_times):.1f}, max {max(response_times):.1f})")
+
+    failed = False
+    if args.max_import_ms is not None and import_median > args.max_import_ms:
+        print(f"FAIL: import time exceeds {args.max_import_ms} ms")
+        failed = True
+    if args.max_first_response_ms is not None and response_median > args.max_first_response_ms:
+        print(f"FAIL: time to first 200 exceeds {args.max_first_response_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
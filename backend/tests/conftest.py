@@ -0,0 +1,22 @@
+"""
+Shared test fixtures
+"""
+
+import pytest
+
+from app import services
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    """Keep cached LLM answers from leaking between tests"""
+    services.response_cache.clear()
+    yield
+    services.response_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def isolate_learned_aliases(tmp_path, monkeypatch):
+    """Keep aliases learned by fuzzy app launches out of the user's home"""
+    monkeypatch.setattr(services.app_matcher, "learned_path", str(tmp_path / "learned_aliases.json"))
+    monkeypatch.setattr(services.app_matcher, "learned", {})
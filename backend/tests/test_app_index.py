@@ -0,0 +1,82 @@
+"""
+Tests for the executable index
+"""
+
+import os
+import stat
+
+from fastapi.testclient import TestClient
+
+from app.app_index import IS_WINDOWS, ExecutableIndex
+from app.main import app
+
+client = TestClient(app)
+
+
+def make_executable(directory, name):
+    filename = f"{name}.exe" if IS_WINDOWS else name
+    path = directory / filename
+    path.write_text("")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+def test_index_lookup_and_priority(tmp_path, monkeypatch):
+    """Test that names resolve and earlier directories win"""
+    first, second = tmp_path / "first", tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    tool = make_executable(first, "tool")
+    make_executable(second, "tool")
+    other = make_executable(second, "Other")
+    monkeypatch.setenv("PATH", str(first))
+
+    index = ExecutableIndex(extra_directories=[str(second)])
+    assert index.lookup("tool") == tool
+    assert index.lookup("other") == other
+    assert index.lookup("missing") is None
+
+
+def test_index_rescans_only_changed_directories(tmp_path, monkeypatch):
+    """Test that a directory is re-listed when its mtime changes"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    make_executable(bin_dir, "old")
+    monkeypatch.setenv("PATH", str(bin_dir))
+
+    index = ExecutableIndex()
+    index.refresh()
+    listing = index._listings[str(bin_dir)]
+    index.refresh()
+    assert index._listings[str(bin_dir)] is listing
+
+    new = make_executable(bin_dir, "new")
+    os.utime(bin_dir, ns=(listing[0] + 10**9, listing[0] + 10**9))
+    index.refresh()
+    assert index.lookup("new") == new
+
+
+def test_common_app_resolution(tmp_path, monkeypatch):
+    """Test that COMMON_APPS entries resolve by absolute path or by PATH name"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    git = make_executable(bin_dir, "git")
+    monkeypatch.setenv("PATH", str(bin_dir))
+
+    index = ExecutableIndex(common_apps={
+        "git": "git",
+        "editor": git,
+        "missing": str(tmp_path / "nope.exe"),
+    })
+    assert index.resolve_common_app("git") == git
+    assert index.resolve_common_app("editor") == git
+    assert index.resolve_common_app("missing") is None
+    assert index.resolved_common_apps() == {"git": git, "editor": git}
+
+
+def test_list_apps_reports_resolved_apps():
+    """Test that /list-apps reports the apps that resolve"""
+    data = client.get("/list-apps").json()
+    assert isinstance(data["resolved_apps"], dict)
+    assert set(data["resolved_apps"]) <= set(data["available_apps"])
+    assert data["indexed_executables_count"] >= 0
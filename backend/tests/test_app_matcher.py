@@ -0,0 +1,134 @@
+"""
+Tests for fuzzy app-name matching
+"""
+
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from app import services
+from app.app_matcher import AppNameMatcher, compact_name, phonetic_key
+from app.main import app
+
+client = TestClient(app)
+
+ALIASES = {
+    "chrome": "chrome",
+    "google chrome": "chrome",
+    "vscode": "vscode",
+    "visual studio code": "vscode",
+    "notepad": "notepad",
+    "notepad++": "notepad++",
+    "spotify": "spotify",
+}
+
+
+def test_normalization_and_phonetic_keys():
+    """Test that spacing variants collapse and sound-alikes share a key"""
+    assert compact_name("V S Code") == "vscode"
+    assert compact_name("note pad") == compact_name("notepad")
+    assert compact_name("notepad++") != compact_name("notepad")
+    assert phonetic_key("crome") == phonetic_key("chrome")
+
+
+def test_matcher_scores():
+    """Test exact, misspelled, phonetic and unrelated queries"""
+    matcher = AppNameMatcher(threshold=0.6)
+    matcher.build(ALIASES)
+
+    exact = matcher.match("v s code")
+    assert (exact.target, exact.score) == ("vscode", 1.0)
+
+    assert matcher.match("crome").target == "chrome"
+    assert matcher.match("spotfy").target == "spotify"
+    assert matcher.match("visual studio cod").target == "vscode"
+    assert 0.6 <= matcher.match("spotfy").score < 1.0
+    assert matcher.match("weather forecast") is None
+
+
+def test_phonetic_collisions_need_similar_spelling():
+    """Test that sound-alike keys of short or unrelated names do not match"""
+    matcher = AppNameMatcher(threshold=0.7)
+    matcher.build(ALIASES, executables=["dir", "nodejs", "reset"])
+
+    assert phonetic_key("door") == phonetic_key("dir")
+    assert matcher.match("door") is None
+    assert matcher.match("notes") is None
+    assert matcher.match("rocket") is None
+    assert matcher.match("crome").score == 0.85
+
+
+def test_executables_rank_below_known_apps():
+    """Test that a PATH executable scores below an alias spelled as closely"""
+    matcher = AppNameMatcher(threshold=0.5)
+    matcher.build({"spotify": "spotify"}, executables=["spotifyd", "htop"])
+
+    assert matcher.match("spotifi").target == "spotify"
+    exact = matcher.match("htop")
+    assert (exact.score, exact.known) == (1.0, False)
+    assert matcher.match("spotifyd").known is False
+    known = AppNameMatcher(threshold=0.5)
+    known.build({"spotifyd": "spotifyd"})
+    assert matcher.match("spotifydd").score < known.match("spotifydd").score
+
+
+def test_matcher_is_fast_on_large_candidate_sets():
+    """Test that a lookup over thousands of names stays well under a millisecond"""
+    matcher = AppNameMatcher(threshold=0.6)
+    names = {f"tool{i}x": f"tool{i}x" for i in range(5000)}
+    names.update(ALIASES)
+    matcher.build(names)
+
+    start = time.perf_counter()
+    for _ in range(100):
+        matcher.match("crome")
+    assert (time.perf_counter() - start) / 100 < 0.001
+
+
+def test_learned_aliases_persist(tmp_path):
+    """Test that learned aliases are saved and picked up by a new matcher"""
+    path = tmp_path / "aliases.json"
+    matcher = AppNameMatcher(threshold=0.6, learned_path=str(path))
+    matcher.build(ALIASES)
+    matcher.learn("my music", "spotify")
+    assert matcher.match("my music").target == "spotify"
+    assert json.loads(path.read_text()) == {"my music": "spotify"}
+
+    reloaded = AppNameMatcher(threshold=0.6, learned_path=str(path))
+    reloaded.build(ALIASES)
+    assert reloaded.match("my musik").target == "spotify"
+
+
+def test_open_app_reports_fuzzy_match(monkeypatch):
+    """Test that a misheard name opens the matched app and reports the score"""
+    launched = []
+    monkeypatch.setattr(services.app_index, "resolve_common_app", lambda name: f"/apps/{name}")
+    monkeypatch.setattr(services.subprocess, "Popen", lambda args, **kwargs: launched.append(args))
+
+    data = client.get("/open-app/crome").json()
+    assert data["success"] is True
+    assert data["app_name"] == "crome"
+    assert data["matched_name"] == "chrome"
+    assert 0 < data["match_score"] < 1
+    assert launched == [["/apps/chrome"]]
+    assert services.app_matcher.learned == {"crome": "chrome"}
+
+
+def test_open_app_does_not_learn_unsure_matches(monkeypatch):
+    """Test that a match below APP_CONFIDENT_MATCH_SCORE launches but is not remembered"""
+    monkeypatch.setattr(services.app_index, "resolve_common_app", lambda name: f"/apps/{name}")
+    monkeypatch.setattr(services.subprocess, "Popen", lambda args, **kwargs: None)
+
+    data = client.get("/open-app/chromes").json()
+    assert data["matched_name"] == "chrome"
+    assert data["match_score"] < services.APP_CONFIDENT_MATCH_SCORE
+    assert services.app_matcher.learned == {}
+
+
+def test_list_apps_includes_aliases():
+    """Test that configured aliases are published for speech grammars"""
+    services.app_matcher.learned["my music"] = "spotify"
+    data = client.get("/list-apps").json()
+    assert data["aliases"]["google chrome"] == "chrome"
+    assert data["aliases"]["my music"] == "spotify"
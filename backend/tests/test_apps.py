@@ -2,10 +2,13 @@
 Tests for the apps router
 """
 
+import asyncio
+
 import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.routers import apps
 
 client = TestClient(app)
 
@@ -58,6 +61,28 @@ def test_open_app_post():
     assert "app_name" in data
 
 
+def test_app_routes_run_off_the_event_loop(monkeypatch):
+    """Test that launching and listing apps do not block the event loop"""
+    def assert_no_loop():
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+
+    def fake_open_app(app_name):
+        assert_no_loop()
+        return {"success": True, "message": f"Successfully opened {app_name}", "app_name": app_name}
+
+    def fake_available_apps():
+        assert_no_loop()
+        return {"available_apps": ["notepad"], "total_count": 1, "note": ""}
+
+    monkeypatch.setattr(apps, "open_app", fake_open_app)
+    monkeypatch.setattr(apps, "get_available_apps", fake_available_apps)
+
+    assert client.get("/open-app/notepad").json()["success"] is True
+    assert client.post("/open-app/notepad").json()["success"] is True
+    assert client.get("/list-apps").json()["total_count"] == 1
+
+
 def test_llm_endpoint():
     """Test the LLM endpoint"""
     test_data = {
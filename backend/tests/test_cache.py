@@ -0,0 +1,107 @@
+"""
+Tests for the LLM response cache
+"""
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.runnables import RunnableLambda
+
+from app import services
+from app.cache import ResponseCache
+from app.embeddings import HashingEmbedder
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.mark.asyncio
+async def test_exact_hit_uses_normalised_question():
+    """Test that case, spacing and trailing punctuation do not split entries"""
+    cache = ResponseCache(max_entries=10, max_bytes=1 << 20, ttl=60, similarity_threshold=0.9)
+    await cache.store("gemma3", "system", "What is Python?", "A language.")
+
+    assert await cache.lookup("gemma3", "system", "  what is   python ") == ("A language.", "exact")
+    assert await cache.lookup("llama3", "system", "What is Python?") == (None, None)
+    assert await cache.lookup("gemma3", "system", "What is Python?", "user: hi") == (None, None)
+    assert cache.stats()["exact_hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_ttl_and_memory_cap_eviction():
+    """Test that expired entries miss and the byte cap evicts LRU entries"""
+    cache = ResponseCache(max_entries=10, max_bytes=1 << 20, ttl=0.01, similarity_threshold=0.9)
+    await cache.store("gemma3", "system", "question", "answer")
+    time.sleep(0.02)
+    assert await cache.lookup("gemma3", "system", "question") == (None, None)
+    assert cache.stats()["entries"] == 0
+
+    cache = ResponseCache(max_entries=10, max_bytes=2000, ttl=60, similarity_threshold=0.9)
+    for i in range(5):
+        await cache.store("gemma3", "system", f"question {i}", "x" * 500)
+    assert cache.size_bytes <= 2000
+    assert cache.stats()["evictions"] > 0
+    assert await cache.lookup("gemma3", "system", "question 4") == ("x" * 500, "exact")
+    assert await cache.lookup("gemma3", "system", "question 0") == (None, None)
+
+
+@pytest.mark.asyncio
+async def test_semantic_tier():
+    """Test that a close paraphrase is served from the semantic tier"""
+    cache = ResponseCache(max_entries=10, max_bytes=1 << 20, ttl=60, similarity_threshold=0.8,
+                          embedder_factory=lambda: HashingEmbedder(256))
+    await cache.store("gemma3", "system", "what is the capital of france", "Paris.")
+
+    assert await cache.lookup("gemma3", "system", "what's the capital of france") == ("Paris.", "semantic")
+    assert await cache.lookup("gemma3", "system", "how do I bake bread") == (None, None)
+
+
+class ClearingEmbedder(HashingEmbedder):
+    """Hashing embedder that runs on_embed (once) while a query is being embedded"""
+    on_embed = None
+
+    async def aembed_query(self, text):
+        if self.on_embed is not None:
+            self.on_embed()
+            self.on_embed = None
+        return await super().aembed_query(text)
+
+
+@pytest.mark.asyncio
+async def test_semantic_lookup_survives_clear_during_embedding():
+    """Test that entries dropped while the question is embedded are a miss, not a KeyError"""
+    embedder = ClearingEmbedder(256)
+    cache = ResponseCache(max_entries=10, max_bytes=1 << 20, ttl=60, similarity_threshold=0.8,
+                          embedder_factory=lambda: embedder)
+    await cache.store("gemma3", "system", "what is the capital of france", "Paris.")
+
+    embedder.on_embed = cache.clear
+    assert await cache.lookup("gemma3", "system", "what's the capital of france") == (None, None)
+
+    await cache.store("gemma3", "system", "what is the capital of france", "Paris.")
+    assert await cache.lookup("gemma3", "system", "what's the capital of france") == ("Paris.", "semantic")
+
+
+def test_llm_endpoint_reports_cache_hit(monkeypatch):
+    """Test that a repeated question is answered from cache without the model"""
+    calls = []
+
+    def answer(inputs):
+        calls.append(inputs["question"])
+        return "Cached answer."
+
+    monkeypatch.setattr(services.model_registry, "get_chain", lambda model: RunnableLambda(answer))
+
+    first = client.post("/llm", json={"prompt": "Tell me a joke"}).json()
+    second = client.post("/llm", json={"prompt": "tell me a joke!"}).json()
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["cache_tier"] == "exact"
+    assert second["response"] == "Cached answer."
+    assert len(calls) == 1
+
+    stats = client.get("/llm/cache").json()
+    assert stats["exact_hits"] == 1
+    assert stats["entries"] == 1
@@ -0,0 +1,171 @@
+"""
+Tests for the LLM concurrency gate
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import services
+from app.concurrency import ConcurrencyGate, SingleFlight
+from app.exceptions import LLMBusyError
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.mark.asyncio
+async def test_gate_hands_slot_to_waiter():
+    """Test that a released slot goes to the oldest waiter"""
+    gate = ConcurrencyGate(max_concurrency=1, max_queue=1, queue_timeout=1, retry_after=2)
+    await gate.acquire()
+    waiter = asyncio.create_task(gate.acquire())
+    await asyncio.sleep(0)
+    assert gate.waiting == 1
+
+    gate.release()
+    await waiter
+    assert gate.active == 1
+    assert gate.waiting == 0
+
+    gate.release()
+    assert gate.active == 0
+
+
+@pytest.mark.asyncio
+async def test_gate_rejects_when_queue_full():
+    """Test that a full queue fails fast with 429 and Retry-After"""
+    gate = ConcurrencyGate(max_concurrency=1, max_queue=0, queue_timeout=1, retry_after=7)
+    await gate.acquire()
+    with pytest.raises(LLMBusyError) as exc_info:
+        await gate.acquire()
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers["Retry-After"] == "7"
+    assert gate.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_gate_times_out_queued_request():
+    """Test that a queued request gives up with 503 after queue_timeout"""
+    gate = ConcurrencyGate(max_concurrency=1, max_queue=1, queue_timeout=0.01, retry_after=3)
+    await gate.acquire()
+    with pytest.raises(LLMBusyError) as exc_info:
+        await gate.acquire()
+    assert exc_info.value.status_code == 503
+    assert gate.waiting == 0
+    assert gate.active == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_call():
+    """Test that concurrent identical calls run the factory once"""
+    flight = SingleFlight()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"response": "shared"}
+
+    results = await asyncio.gather(*(flight.run("key", generate) for _ in range(3)))
+    assert results == [{"response": "shared"}] * 3
+    assert len(calls) == 1
+    assert flight.coalesced == 2
+    assert flight.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancels_only_with_last_waiter():
+    """Test that upstream work survives until its last waiter is cancelled"""
+    flight = SingleFlight()
+    started = asyncio.Event()
+    upstream_cancelled = asyncio.Event()
+
+    async def generate():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            upstream_cancelled.set()
+            raise
+
+    first = asyncio.create_task(flight.run("key", generate))
+    second = asyncio.create_task(flight.run("key", generate))
+    await started.wait()
+
+    first.cancel()
+    await asyncio.sleep(0)
+    assert not upstream_cancelled.is_set()
+
+    second.cancel()
+    await asyncio.wait_for(upstream_cancelled.wait(), 1)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_stream_fan_out():
+    """Test that stream subscribers share one source and all see every frame"""
+    flight = SingleFlight()
+    opened = []
+
+    async def source():
+        for i in range(3):
+            await asyncio.sleep(0)
+            yield {"type": "token", "content": str(i)}
+
+    async def open_source():
+        opened.append(1)
+        return source()
+
+    async def consume():
+        stream = await flight.stream("key", open_source)
+        return [frame["content"] async for frame in stream]
+
+    results = await asyncio.gather(consume(), consume())
+    assert results == [["0", "1", "2"]] * 2
+    assert len(opened) == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_stream_cancelled_by_last_subscriber():
+    """Test that the shared source is closed once every subscriber leaves"""
+    flight = SingleFlight()
+    closed = asyncio.Event()
+
+    async def source():
+        try:
+            while True:
+                await asyncio.sleep(0.001)
+                yield {"type": "token", "content": "x"}
+        finally:
+            closed.set()
+
+    async def open_source():
+        return source()
+
+    first = await flight.stream("key", open_source)
+    second = await flight.stream("key", open_source)
+    await first.__anext__()
+    await second.__anext__()
+
+    await first.aclose()
+    await asyncio.sleep(0.01)
+    assert not closed.is_set()
+
+    await second.aclose()
+    await asyncio.wait_for(closed.wait(), 1)
+
+
+def test_llm_endpoint_saturated(monkeypatch):
+    """Test that the LLM endpoints return 429 while health stays available"""
+    monkeypatch.setattr(services.llm_gate, "active", services.llm_gate.max_concurrency)
+    monkeypatch.setattr(services.llm_gate, "max_queue", 0)
+
+    for path in ("/llm", "/llm/stream"):
+        response = client.post(path, json={"prompt": "Hello"})
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["llm_active"] == services.llm_gate.max_concurrency
@@ -0,0 +1,152 @@
+"""
+Tests for the rule-based intent fast path
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake import FakeStreamingListLLM
+from langchain_core.output_parsers import StrOutputParser
+
+from app import services
+from app.app_matcher import AppNameMatcher
+from app.intents import IntentClassifier
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def classifier():
+    matcher = AppNameMatcher(threshold=0.6)
+    matcher.build({"spotify": "spotify", "calculator": "calculator", "calc": "calculator",
+                   "visual studio code": "vscode", "vscode": "vscode", "yes": "yes"})
+    return IntentClassifier(matcher.match, common_apps={"spotify", "calculator", "vscode"})
+
+
+@pytest.fixture
+def launched(monkeypatch):
+    """Record open_app calls instead of starting processes"""
+    calls = []
+
+    def fake_open_app(app_name):
+        calls.append(app_name)
+        return {"success": True, "message": f"Successfully opened {app_name}", "app_name": app_name}
+
+    monkeypatch.setattr(services, "open_app", fake_open_app)
+    return calls
+
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    """Fail the test if any LLM chain is used"""
+    def get_chain(model):
+        raise AssertionError("LLM should not be called")
+    monkeypatch.setattr(services.model_registry, "get_chain", get_chain)
+
+
+@pytest.mark.parametrize("text, intent, matched", [
+    ("open spotify", "open_app", "spotify"),
+    ("Please launch the calculator app.", "open_app", "calculator"),
+    ("can you start visual studio code for me", "open_app", "vscode"),
+    ("hey assistant, open spotify", "open_app", "spotify"),
+    ("open crome-like spotifi", "llm", None),
+    ("open https://example.com", "open_app", None),
+    ("calc", "open_app", "calculator"),
+    ("yes", "llm", None),
+    ("list apps", "list_apps", None),
+    ("What apps can you open?", "list_apps", None),
+    ("health check", "health", None),
+    ("are you ok?", "health", None),
+    ("start a story about dragons", "llm", None),
+    ("What is the capital of France?", "llm", None),
+    ("   ", "none", None),
+])
+def test_classifier(classifier, text, intent, matched):
+    """Test that commands are recognised and everything else goes to the LLM"""
+    result = classifier.classify(text)
+    assert result.name == intent
+    assert result.matched_name == matched
+    assert result.classification_time_us >= 0
+
+
+@pytest.mark.parametrize("text", [
+    "launch the rocket", "open the door", "start the car", "open notes", "run the tests",
+])
+def test_launch_verbs_need_a_known_or_confident_app(text):
+    """Test that a loose match on a PATH executable does not turn a sentence into a launch"""
+    matcher = AppNameMatcher(threshold=0.6)
+    matcher.build({"notepad": "notepad", "spotify": "spotify"},
+                  executables=["reset", "dir", "cargo", "nodejs", "test", "rockettool"])
+    classifier = IntentClassifier(matcher.match, common_apps={"notepad", "spotify"})
+
+    assert classifier.classify(text).name == "llm"
+    assert classifier.classify("run test").name == "open_app"
+
+
+def test_llm_endpoint_ignores_loose_executable_matches(monkeypatch, launched):
+    """Test that "run the tests" reaches the LLM with a "test" binary indexed"""
+    monkeypatch.setattr(services.app_index, "names", lambda: ["test", "reset", "dir", "cargo", "nodejs"])
+    monkeypatch.setattr(services.app_index, "refresh_count", object())
+    llm = FakeStreamingListLLM(responses=["Use pytest."])
+    chain = services.model_registry.prompt | llm | StrOutputParser()
+    monkeypatch.setattr(services.model_registry, "get_chain", lambda model: chain)
+
+    for prompt in ["launch the rocket", "open the door", "start the car", "open notes", "run the tests"]:
+        data = client.post("/llm", json={"prompt": prompt}).json()
+        assert data["intent"] == "llm", prompt
+    assert launched == []
+
+
+def test_long_prompts_skip_patterns(classifier):
+    """Test that prompts over max_words are sent to the LLM unchecked"""
+    assert classifier.classify("open spotify and then tell me about the history of jazz").name == "llm"
+
+
+def test_llm_endpoint_runs_launch_command(launched, no_llm):
+    """Test that a launch command sent to /llm opens the app without the LLM"""
+    response = client.post("/llm", json={"prompt": "open calculator"})
+    assert response.status_code == 200
+    data = response.json()
+    assert launched == ["calculator"]
+    assert data["intent"] == "open_app"
+    assert data["model"] == services.RULES_MODEL
+    assert data["response"] == "Successfully opened calculator"
+    assert data["action"]["app_name"] == "calculator"
+    assert data["classification_time_us"] is not None
+
+
+def test_llm_stream_lists_apps(no_llm):
+    """Test that a list command is answered on the stream endpoint too"""
+    response = client.post("/llm/stream", json={"prompt": "show me all apps"})
+    frames = [json.loads(line) for line in response.text.splitlines()]
+    assert frames[0]["type"] == "token"
+    assert frames[0]["content"].startswith("Available apps: ")
+    assert frames[-1]["intent"] == "list_apps"
+    assert "calculator" in frames[-1]["action"]["available_apps"]
+
+
+def test_llm_endpoint_reports_llm_intent(monkeypatch):
+    """Test that questions still reach the LLM and report their intent"""
+    llm = FakeStreamingListLLM(responses=["Paris."])
+    chain = services.model_registry.prompt | llm | StrOutputParser()
+    monkeypatch.setattr(services.model_registry, "get_chain", lambda model: chain)
+
+    data = client.post("/llm", json={"prompt": "What is the capital of France?"}).json()
+    assert data["response"] == "Paris."
+    assert data["intent"] == "llm"
+    assert data["action"] is None
+
+
+def test_fast_path_can_be_disabled(monkeypatch, launched):
+    """Test that with the fast path off every prompt goes to the LLM"""
+    llm = FakeStreamingListLLM(responses=["Sure."])
+    chain = services.model_registry.prompt | llm | StrOutputParser()
+    monkeypatch.setattr(services.model_registry, "get_chain", lambda model: chain)
+    monkeypatch.setattr(services, "INTENT_FAST_PATH_ENABLED", False)
+
+    data = client.post("/llm", json={"prompt": "open calculator"}).json()
+    assert data["response"] == "Sure."
+    assert data["intent"] is None
+    assert launched == []
@@ -0,0 +1,82 @@
+"""
+Tests for the batch LLM endpoint
+"""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+from langchain_core.runnables import RunnableLambda
+
+from app import services
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_llm_batch_endpoint(monkeypatch):
+    """Test ordering, per-item failures, duplicate folding and parallelism"""
+    calls = []
+    running = []
+
+    async def answer(inputs):
+        calls.append(inputs["question"])
+        running.append(1)
+        peak = len(running)
+        await asyncio.sleep(0.01)
+        running.pop()
+        if inputs["question"] == "fail":
+            raise ValueError("boom")
+        return f"Answer to {inputs['question']} ({peak})"
+
+    monkeypatch.setattr(services.model_registry, "get_chain", lambda model: RunnableLambda(answer))
+
+    prompts = ["one", "two", "fail", "three", "one", "four"]
+    response = client.post("/llm/batch", json={
+        "requests": [{"prompt": prompt} for prompt in prompts],
+        "max_parallel": 2
+    })
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["total_count"] == 6
+    assert data["failure_count"] == 1
+    assert [item["index"] for item in data["results"]] == list(range(6))
+    assert [item["prompt"] for item in data["results"]] == prompts
+    assert data["results"][2]["success"] is False
+    assert "boom" in data["results"][2]["response"]
+    assert data["results"][0]["response"] == data["results"][4]["response"]
+    assert data["results"][0]["queue_time"] is not None
+    assert sorted(calls) == ["fail", "four", "one", "three", "two"]
+    assert max(int(item["response"][-2]) for item in data["results"] if item["success"]) <= 2
+
+
+def test_llm_batch_respects_gate_limit(monkeypatch):
+    """Test that a batch never runs more generations than the gate has free slots"""
+    running = []
+    peak = []
+
+    async def answer(inputs):
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+        return "ok"
+
+    monkeypatch.setattr(services.model_registry, "get_chain", lambda model: RunnableLambda(answer))
+    monkeypatch.setattr(services.llm_gate, "max_concurrency", 3)
+    monkeypatch.setattr(services.llm_gate, "active", 1)  # Another request holds a slot
+
+    response = client.post("/llm/batch", json={
+        "requests": [{"prompt": f"gate {i}"} for i in range(8)],
+        "max_parallel": 8
+    })
+    assert response.status_code == 200
+    assert response.json()["success_count"] == 8
+    assert max(peak) == 2
+    assert services.llm_gate.active == 1
+
+
+def test_llm_batch_rejects_empty_batch():
+    """Test that an empty batch is a validation error"""
+    response = client.post("/llm/batch", json={"requests": []})
+    assert response.status_code == 422
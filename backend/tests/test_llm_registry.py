@@ -0,0 +1,61 @@
+"""
+Tests for per-model chains and model routing
+"""
+
+from fastapi.testclient import TestClient
+from langchain_core.runnables import RunnableLambda
+
+from app import services
+from app.llm_registry import ModelRegistry, ModelRouter, resolve_model
+from app.main import app
+
+client = TestClient(app)
+
+
+def make_router():
+    return ModelRouter(small_model="small", large_model="large", max_words=5,
+                       max_history_chars=50, complex_pattern=r"\b(explain|why)\b")
+
+
+def test_registry_builds_one_chain_per_model():
+    """Test that chains are built lazily and reused per model name"""
+    registry = ModelRegistry("system", "{chat_history} {question}", base_url="http://localhost:11434", keep_alive="5m")
+    assert registry.models == []
+
+    gemma = registry.get_chain("gemma3")
+    assert registry.get_chain("gemma3") is gemma
+    assert registry.get_chain("llama3.2") is not gemma
+    assert registry.models == ["gemma3", "llama3.2"]
+
+
+def test_router_rules():
+    """Test that short simple prompts go small and long or hard ones go large"""
+    router = make_router()
+    assert router.route("what time is it") == "small"
+    assert router.route("please tell me everything about the roman empire") == "large"
+    assert router.route("explain recursion") == "large"
+    assert router.route("and then?", chat_history="x" * 100) == "large"
+
+    assert resolve_model(router, "fallback", "gemma3", "explain recursion") == "gemma3"
+    assert resolve_model(None, "fallback", "auto", "hi") == "fallback"
+    assert resolve_model(router, "fallback", "auto", "hi") == "small"
+
+
+def test_llm_endpoint_honors_model(monkeypatch):
+    """Test that the requested or routed model is the one actually used"""
+    used = []
+
+    def chain_for(model):
+        used.append(model)
+        return RunnableLambda(lambda inputs: f"from {model}")
+
+    monkeypatch.setattr(services.model_registry, "get_chain", chain_for)
+    monkeypatch.setattr(services, "model_router", make_router())
+
+    data = client.post("/llm", json={"prompt": "Hello", "model": "llama3.2"}).json()
+    assert data["model"] == "llama3.2"
+    assert data["response"] == "from llama3.2"
+
+    data = client.post("/llm", json={"prompt": "Why is the sky blue?", "model": "auto"}).json()
+    assert data["model"] == "large"
+    assert used == ["llama3.2", "large"]
@@ -0,0 +1,66 @@
+"""
+Tests for the streaming LLM endpoint
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake import FakeStreamingListLLM
+from langchain_core.output_parsers import StrOutputParser
+
+from app import services
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def fake_chain(monkeypatch):
+    """Replace every model chain with a fake streaming LLM"""
+    def install(response: str):
+        llm = FakeStreamingListLLM(responses=[response])
+        chain = services.model_registry.prompt | llm | StrOutputParser()
+        monkeypatch.setattr(services.model_registry, "get_chain", lambda model: chain)
+    return install
+
+
+def test_incremental_cleaner_matches_full_cleaning():
+    """Test that chunked cleaning produces the same text as full cleaning"""
+    raw = "  \n Hello   there.\n\n\n\nSecond  paragraph \n \n \n end.  \n\n"
+    for size in (1, 2, 3, 7):
+        cleaner = services.IncrementalResponseCleaner()
+        pieces = [cleaner.feed(raw[i:i + size]) for i in range(0, len(raw), size)]
+        assert "".join(pieces) == services.clean_response_formatting(raw)
+
+
+def test_llm_stream_endpoint(fake_chain):
+    """Test that the stream ends with a final frame carrying timing metadata"""
+    fake_chain("Python is   a language.\n\n\n\nIt is popular.")
+    response = client.post("/llm/stream", json={"prompt": "What is Python?"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    frames = [json.loads(line) for line in response.text.splitlines()]
+    tokens = [frame for frame in frames[:-1] if frame["type"] == "token"]
+    final = frames[-1]
+    assert len(tokens) == len(frames) - 1
+    assert final["type"] == "final"
+    assert final["success"] is True
+    assert final["response"] == "Python is a language.\n\nIt is popular."
+    assert "".join(frame["content"] for frame in tokens) == final["response"]
+    assert final["model"] == "gemma3"
+    assert final["time_to_first_token"] is not None
+    assert final["chunks"] > 0
+
+
+def test_llm_stream_replays_cached_answer(fake_chain):
+    """Test that a repeated streamed question is replayed from the cache"""
+    fake_chain("Streams are fun.")
+    client.post("/llm/stream", json={"prompt": "Are streams fun?"})
+    response = client.post("/llm/stream", json={"prompt": "Are streams fun?"})
+
+    frames = [json.loads(line) for line in response.text.splitlines()]
+    assert frames[0] == {"type": "token", "content": "Streams are fun."}
+    assert frames[-1]["cached"] is True
+    assert frames[-1]["response"] == "Streams are fun."
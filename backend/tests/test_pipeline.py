@@ -0,0 +1,190 @@
+"""
+Tests for the voice pipeline endpoint
+"""
+
+import asyncio
+import io
+import json
+import struct
+import wave
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake import FakeStreamingListLLM
+from langchain_core.output_parsers import StrOutputParser
+
+from app import services
+from app.main import app
+from app.speech import SpeechRecognizer, read_pcm16
+
+client = TestClient(app)
+
+
+class FakeRecognizer:
+    """Stands in for vosk.KaldiRecognizer and always hears the same text"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.fed = 0
+
+    def AcceptWaveform(self, data: bytes) -> bool:
+        self.fed += len(data)
+        return False
+
+    def FinalResult(self) -> str:
+        return json.dumps({"text": self.text})
+
+    def Reset(self) -> None:
+        self.fed = 0
+
+
+@pytest.fixture
+def fake_speech(monkeypatch):
+    """Replace the speech recognizer with one that hears the given text"""
+    def install(text: str):
+        recognizer = SpeechRecognizer("unused")
+        monkeypatch.setattr(recognizer, "_new_recognizer", lambda sample_rate: FakeRecognizer(text))
+        monkeypatch.setattr(services, "speech_recognizer", recognizer)
+    return install
+
+
+def make_wav(samples, sample_rate: int = 16000, channels: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+    return buffer.getvalue()
+
+
+def read_frames(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_read_pcm16_downmixes_wav_and_passes_raw_pcm():
+    """Test that stereo WAV is averaged to mono and raw PCM is used as is"""
+    pcm, rate = read_pcm16(make_wav([100, 300, -50, -150], sample_rate=8000, channels=2), 16000)
+    assert rate == 8000
+    assert struct.unpack("<2h", pcm) == (200, -100)
+
+    pcm, rate = read_pcm16(b"\x01\x00\x02\x00\x03", 22050)
+    assert (pcm, rate) == (b"\x01\x00\x02\x00", 22050)
+
+
+def test_pipeline_launches_app(fake_speech, monkeypatch):
+    """Test that a spoken launch command opens the app without the LLM"""
+    fake_speech("open calculator")
+    launched = []
+
+    def fake_open_app(app_name):
+        launched.append(app_name)
+        return {"success": True, "message": f"Successfully opened {app_name}", "app_name": app_name}
+
+    monkeypatch.setattr(services, "open_app", fake_open_app)
+    response = client.post("/pipeline", content=make_wav([0] * 16000))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    frames = read_frames(response)
+    assert [frame["type"] for frame in frames] == ["transcript", "intent", "action", "done"]
+    assert frames[0]["text"] == "open calculator"
+    assert frames[0]["audio_duration"] == 1.0
+    assert frames[1]["intent"] == "open_app"
+    assert frames[1]["app_name"] == "calculator"
+    assert frames[1]["matched_name"] == "calculator"
+    assert frames[2]["intent"] == "open_app"
+    assert frames[2]["success"] is True
+    assert frames[2]["result"]["app_name"] == "calculator"
+    assert launched == ["calculator"]
+    assert set(frames[3]["timings_ms"]) == {"stt", "intent", "action", "total"}
+
+
+def test_pipeline_streams_llm_answer(fake_speech, monkeypatch):
+    """Test that a question is answered by the LLM in the same response"""
+    fake_speech("what is python")
+    llm = FakeStreamingListLLM(responses=["Python is a language."])
+    chain = services.model_registry.prompt | llm | StrOutputParser()
+    monkeypatch.setattr(services.model_registry, "get_chain", lambda model: chain)
+
+    response = client.post("/pipeline?sample_rate=8000", content=b"\x00\x00" * 8000)
+    frames = read_frames(response)
+    types = [frame["type"] for frame in frames]
+    assert types[:2] == ["transcript", "intent"]
+    assert frames[1]["intent"] == "llm"
+    assert "token" in types
+    final = next(frame for frame in frames if frame["type"] == "final")
+    assert final["response"] == "Python is a language."
+    assert final["prompt"] == "what is python"
+    timings = frames[-1]["timings_ms"]
+    assert frames[-1]["type"] == "done"
+    assert {"stt", "intent", "llm_queue", "llm_first_token", "llm", "total"} <= set(timings)
+
+
+class EndlessChain:
+    """A chain that streams tokens until it is cancelled"""
+
+    async def astream(self, inputs):
+        while True:
+            await asyncio.sleep(0.001)
+            yield "word "
+
+
+@pytest.mark.asyncio
+async def test_pipeline_disconnect_releases_llm_slot(fake_speech, monkeypatch):
+    """Test that closing the pipeline stream mid-answer frees the LLM gate slot"""
+    fake_speech("why is the sky blue")
+    monkeypatch.setattr(services.model_registry, "get_chain", lambda model: EndlessChain())
+    opened = []
+    open_llm_stream = services.open_llm_stream
+
+    async def keep_llm_stream(*args):
+        # Held, as a reference cycle would, so only an explicit close frees it
+        frames = await open_llm_stream(*args)
+        opened.append(frames)
+        return frames
+
+    monkeypatch.setattr(services, "open_llm_stream", keep_llm_stream)
+
+    frames = await services.open_voice_pipeline(b"\x00\x00" * 1600, 16000)
+    async for frame in frames:
+        if frame["type"] == "token":
+            break
+    assert services.llm_gate.active == 1
+
+    await frames.aclose()
+    for _ in range(100):
+        if services.llm_gate.active == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert services.llm_gate.active == 0
+    assert services.llm_flight.in_flight == 0
+
+
+def test_pipeline_rejects_bad_audio(fake_speech):
+    """Test that empty or unreadable audio is a client error"""
+    fake_speech("hello")
+    assert client.post("/pipeline", content=b"").status_code == 400
+    assert client.post("/pipeline", content=b"RIFF\x00\x00\x00\x00WAVEjunk").status_code == 400
+
+
+@pytest.mark.parametrize("sample_rate", [0, -16000, 4000, 96000])
+def test_pipeline_rejects_bad_sample_rate(fake_speech, sample_rate):
+    """Test that an out-of-range sample_rate is a 422 rather than a division by zero"""
+    fake_speech("hello")
+    response = client.post(f"/pipeline?sample_rate={sample_rate}", content=b"\x00\x00" * 1600)
+    assert response.status_code == 422
+
+
+def test_pipeline_rejects_wav_with_bad_sample_rate(fake_speech):
+    """Test that a WAV header with an unusable rate is a client error"""
+    fake_speech("hello")
+    assert client.post("/pipeline", content=make_wav([0] * 100, sample_rate=1000)).status_code == 400
+
+
+def test_pipeline_without_speech_model(monkeypatch):
+    """Test that a missing Vosk model is reported as 503"""
+    monkeypatch.setattr(services, "speech_recognizer", SpeechRecognizer("/nonexistent/vosk-model"))
+    response = client.post("/pipeline", content=b"\x00\x00" * 1600)
+    assert response.status_code == 503
+    assert "Vosk model" in response.json()["detail"]
@@ -0,0 +1,536 @@
+"""
+Tests for document retrieval and prompt injection
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.runnables import RunnableLambda
+
+from app import services
+from app.embeddings import HashingEmbedder
+from app.main import app
+from app.retrieval import (
+    DenseVectorStore, Retriever, SegmentStore, assign_lists, chunk_text, format_context, iter_file_chunks, reciprocal_rank_fusion,
+    train_centroids,
+)
+
+client = TestClient(app)
+
+NOTES = {
+    "garden.md": "The tomatoes in the garden need watering every morning before the heat of the day.",
+    "car.txt": "The car is due for an oil change and new winter tyres in November.",
+    "recipes.md": "Grandma's pancake recipe uses buttermilk, two eggs and a pinch of nutmeg.",
+}
+
+
+@pytest.fixture
+def notes_retriever(tmp_path, monkeypatch):
+    """A retriever over a few small notes, installed as the service retriever"""
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    for name, text in NOTES.items():
+        (notes_dir / name).write_text(text)
+    retriever = Retriever(HashingEmbedder(256), str(tmp_path / "index"), chunk_words=50, overlap=10)
+    retriever.ingest([str(notes_dir)])
+    monkeypatch.setattr(services, "get_retriever", lambda: retriever)
+    return retriever
+
+
+def test_chunk_text_windows_overlap():
+    """Test that chunks have the configured size and share overlap words"""
+    words = [f"w{i}" for i in range(25)]
+    chunks = chunk_text(" ".join(words), "doc", chunk_words=10, overlap=3)
+
+    assert [chunk.text.split() for chunk in chunks] == [words[0:10], words[7:17], words[14:24], words[21:25]]
+    assert [chunk.index for chunk in chunks] == [0, 1, 2, 3]
+    assert len(chunk_text(" ".join(words[:17]), "doc", chunk_words=10, overlap=3)) == 2
+    assert chunk_text("short note", "doc")[0].text == "short note"
+    assert chunk_text("", "doc") == []
+
+
+def test_store_search_matches_brute_force():
+    """Test batched top-k against a full sort, across storage growth"""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 16)).astype(np.float32)
+    store = DenseVectorStore(16, capacity=8)
+    for start in range(0, 300, 50):
+        store.add(vectors[start:start + 50], [{"row": i} for i in range(start, start + 50)])
+    queries = rng.normal(size=(5, 16)).astype(np.float32)
+
+    scores, ids = store.search(queries, 7)
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ unit.T, axis=1)[:, :7]
+    assert ids.shape == (5, 7)
+    assert (ids == expected).all()
+    assert (np.diff(scores, axis=1) <= 0).all()
+    assert store.search(queries, 1000)[1].shape == (5, 300)
+
+
+def unit_rows(rng, rows, dim=16):
+    vectors = rng.normal(size=(rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def chunk_rows(source, rows):
+    return [{"source": source, "chunk": i, "text": f"{source} chunk {i}"} for i in range(rows)]
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_segment_store_persists_quantized_segments(tmp_path, dtype):
+    """Test that flushed segments reopen memory-mapped and still find each row"""
+    rng = np.random.default_rng(1)
+    vectors = unit_rows(rng, 200)
+    store = SegmentStore(str(tmp_path), dtype=dtype, auto_compact=False)
+    store.add(vectors[:120], chunk_rows("a.md", 120))
+    assert len(store) == 0  # buffered until flush
+    store.flush()
+    store.add(vectors[120:], chunk_rows("b.md", 80))
+    store.flush()
+
+    reopened = SegmentStore(str(tmp_path))
+    assert len(reopened) == 200 and reopened.dim == 16 and reopened.dtype == dtype
+    assert reopened.stats()["segments"] == 2
+    assert isinstance(reopened._view.segments[0].vectors, np.memmap)
+    results = reopened.search_chunks(vectors[[5, 150]], 3)
+    assert results[0][0][1] == {"source": "a.md", "chunk": 5, "text": "a.md chunk 5"}
+    assert results[1][0][1]["source"] == "b.md" and results[1][0][1]["chunk"] == 30
+    assert results[0][0][0] == pytest.approx(1.0, abs=0.02)
+
+
+def test_segment_store_tombstones_and_compaction(tmp_path):
+    """Test that deletes hide rows at once and compaction drops them from disk"""
+    rng = np.random.default_rng(2)
+    vectors = unit_rows(rng, 30)
+    store = SegmentStore(str(tmp_path), auto_compact=False)
+    for i, source in enumerate(["a.md", "b.md", "c.md"]):
+        store.add(vectors[10 * i:10 * i + 10], chunk_rows(source, 10))
+        store.flush()
+
+    assert store.delete_sources(["b.md"]) == 10
+    assert store.delete_sources(["b.md"]) == 0
+    assert len(store) == 20 and store.sources() == {"a.md", "c.md"}
+    hits = store.search_chunks(vectors[15], 30)[0]
+    assert len(hits) == 20 and all(chunk["source"] != "b.md" for _, chunk in hits)
+
+    assert store.compact()
+    assert store.stats()["segments"] == 1 and store.stats()["deleted_chunks"] == 0
+    assert sorted({f.split(".")[0] for f in os.listdir(tmp_path) if f.startswith("seg-")}) == ["seg-000004"]
+    assert store.search_chunks(vectors[25], 1)[0][0][1] == {"source": "c.md", "chunk": 5, "text": "c.md chunk 5"}
+
+
+def test_segment_store_compacts_in_background(tmp_path):
+    """Test that exceeding max_segments triggers a background merge"""
+    rng = np.random.default_rng(3)
+    store = SegmentStore(str(tmp_path), max_segments=2)
+    for i in range(3):
+        store.add(unit_rows(rng, 5), chunk_rows(f"{i}.md", 5))
+        store.flush()
+
+    deadline = time.time() + 5
+    while store.stats()["segments"] > 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.stats()["segments"] == 1 and len(store) == 15
+
+
+def test_segment_store_shared_between_workers(tmp_path):
+    """Test that an instance sees segments and deletes written by another"""
+    rng = np.random.default_rng(4)
+    vectors = unit_rows(rng, 10)
+    reader = SegmentStore(str(tmp_path), auto_compact=False)
+    writer = SegmentStore(str(tmp_path), auto_compact=False)
+    assert len(reader) == 0
+
+    writer.add(vectors, chunk_rows("notes.md", 10))
+    writer.flush()
+    assert len(reader) == 10
+    assert reader.search_chunks(vectors[3], 1)[0][0][1]["chunk"] == 3
+
+    writer.delete_sources(["notes.md"])
+    assert len(reader) == 0 and reader.search_chunks(vectors[3], 1) == [[]]
+
+
+def test_segment_store_migrates_single_file_index(tmp_path):
+    """Test that a vectors.npy/chunks.jsonl index becomes the first segment"""
+    np.save(tmp_path / "vectors.npy", np.eye(4, dtype=np.float32))
+    (tmp_path / "chunks.jsonl").write_text("".join(json.dumps(chunk) + "\n" for chunk in chunk_rows("old.md", 4)))
+
+    store = SegmentStore(str(tmp_path))
+
+    assert len(store) == 4 and not (tmp_path / "vectors.npy").exists()
+    assert store.search_chunks(np.array([0, 0, 1, 0]), 1)[0][0][1]["chunk"] == 2
+
+
+def clustered_rows(rng, rows, centers, spread=0.05):
+    picked = centers[rng.integers(0, len(centers), size=rows)]
+    return picked + spread * rng.normal(size=picked.shape).astype(np.float32)
+
+
+def test_train_centroids_separates_clusters():
+    """Test that k-means puts each well-separated cluster in its own list"""
+    rng = np.random.default_rng(5)
+    centers = np.eye(8, dtype=np.float32)
+    labels = rng.integers(0, 8, size=400)
+    vectors = centers[labels] + 0.02 * rng.normal(size=(400, 8)).astype(np.float32)
+
+    centroids = train_centroids(vectors, 8)
+
+    assignments = assign_lists(vectors / np.linalg.norm(vectors, axis=1, keepdims=True), centroids)
+    assert len(set(zip(labels.tolist(), assignments.tolist()))) == 8
+
+
+def test_segment_store_ivf_search(tmp_path):
+    """Test IVF training, probed search against exact, inserts and deletes"""
+    rng = np.random.default_rng(6)
+    centers = unit_rows(rng, 40, 32)
+    store = SegmentStore(str(tmp_path), index_type="ivf", ivf_min_rows=1000, segment_rows=500, auto_compact=False)
+    vectors = clustered_rows(rng, 1500, centers)
+    for start in range(0, 1500, 500):
+        store.add(vectors[start:start + 500], chunk_rows(f"{start}.md", 500))
+    store.flush()
+    assert store.stats()["lists"] is None
+
+    assert store.compact()
+    assert store.stats()["segments"] == 1 and store.stats()["lists"] == 39
+    queries = clustered_rows(rng, 50, centers)
+    exact = store.search(queries, 10, exact=True)[1]
+    probed = store.search(queries, 10, nprobe=4)[1]
+    assert np.mean([len(np.intersect1d(a, e)) for a, e in zip(probed, exact)]) / 10 > 0.9
+    assert (store.search(queries, 10, nprobe=39)[1] == exact).all()
+
+    # New rows join the trained lists without retraining
+    store.add(vectors[:20], chunk_rows("new.md", 20))
+    store.flush()
+    assert store._view.segments[-1].lists is not None and store.stats()["lists"] == 39
+    hits = store.search_chunks(vectors[3], 2)[0]
+    assert {chunk["source"] for _, chunk in hits} == {"0.md", "new.md"}
+
+    store.delete_sources(["new.md"])
+    reader = SegmentStore(str(tmp_path), index_type="ivf")
+    assert reader.search_chunks(vectors[3], 1)[0][0][1]["source"] == "0.md"
+
+
+def test_bm25_ranks_exact_names():
+    """Test keyword ranking, stopword-only queries and tombstoned rows"""
+    store = DenseVectorStore(4)
+    texts = ["open spotify and play jazz", "play the jazz playlist loudly", "call mum about the spotify bill"]
+    store.add(np.eye(4)[:3], [{"source": f"{i}.txt", "chunk": 0, "text": text} for i, text in enumerate(texts)])
+
+    results = store.search_text("Spotify jazz", 3)
+    assert len(results) == 3 and results[0][1]["text"] == texts[0]
+    assert store.search_text("what is the", 3) == []
+    assert store.search_text("1", 3)[0][1]["source"] == "1.txt"  # file names are indexed too
+
+    store.delete_sources(["0.txt"])
+    assert [chunk["source"] for _, chunk in store.search_text("spotify", 3)] == ["2.txt"]
+
+
+def test_segment_store_keyword_search_survives_compaction(tmp_path):
+    """Test that postings are persisted and carried through compaction and IVF regrouping"""
+    rng = np.random.default_rng(7)
+    store = SegmentStore(str(tmp_path), index_type="ivf", ivf_min_rows=40, auto_compact=False)
+    for name in ["a.md", "b.md", "c.md"]:
+        chunks = [{"source": name, "chunk": i, "text": f"{name[0]}word{i} shared"} for i in range(20)]
+        store.add(unit_rows(rng, 20), chunks)
+        store.flush()
+    store.delete_sources(["b.md"])
+
+    assert store.compact()
+
+    reopened = SegmentStore(str(tmp_path))
+    assert os.path.exists(tmp_path / (reopened._view.segments[0].name + ".postings.npy"))
+    [(score, chunk)] = reopened.search_text("cword7", 5)
+    assert chunk == {"source": "c.md", "chunk": 7, "text": "cword7 shared"} and score > 0
+    assert reopened.search_text("bword3", 5) == []
+    assert len(reopened.search_text("shared", 100)) == 40
+
+
+def test_reciprocal_rank_fusion():
+    """Test that chunks ranked by both lists come first"""
+    a, b, c = ({"source": name, "chunk": 0} for name in "abc")
+    fused = reciprocal_rank_fusion([[(0.9, a), (0.8, b)], [(12.0, b), (3.0, c)]], k=60)
+    assert [chunk["source"] for _, chunk in fused] == ["b", "a", "c"]
+    assert fused[0][0] == pytest.approx(1 / 62 + 1 / 61)
+
+
+def test_hybrid_search_matches_file_names(notes_retriever):
+    """Test that a word only found in a file name still retrieves its chunks"""
+    [top] = notes_retriever.search("recipes", 1)
+    assert top.source.endswith("recipes.md")
+
+
+def test_hybrid_search_applies_keyword_cutoff(notes_retriever):
+    """Test that a chunk found only by keywords must pass min_keyword_score"""
+    [top] = notes_retriever.search("recipes", 1, min_score=0.9)
+    assert top.source.endswith("recipes.md")
+
+    notes_retriever.min_keyword_score = 5.0
+    assert notes_retriever.search("recipes", 1, min_score=0.9) == []
+
+
+def test_async_search_scores_off_the_event_loop(notes_retriever, monkeypatch):
+    """Test that asearch_batch scores the index on a worker thread"""
+    threads = []
+    search = notes_retriever._search
+
+    def recording_search(*args):
+        threads.append(threading.get_ident())
+        return search(*args)
+
+    monkeypatch.setattr(notes_retriever, "_search", recording_search)
+    [[top]] = asyncio.run(notes_retriever.asearch_batch(["pancake recipe"], 1))
+    assert top.source.endswith("recipes.md")
+    assert threads and threads[0] != threading.get_ident()
+
+
+def test_retriever_finds_relevant_note(notes_retriever, tmp_path):
+    """Test search, re-ingest skipping and reloading from the index directory"""
+    [top] = notes_retriever.search("when should I water the tomatoes", 1)
+    assert top.source.endswith("garden.md")
+
+    again = notes_retriever.ingest([str(tmp_path / "notes")])
+    assert again["files"] == 0 and again["total_chunks"] == 3
+
+    reloaded = Retriever(HashingEmbedder(256), str(tmp_path / "index"))
+    assert len(reloaded) == 3
+    assert reloaded.search("pancake recipe", 1)[0].source.endswith("recipes.md")
+
+
+def test_format_context_is_empty_without_results():
+    """Test that no results leave the prompt unchanged"""
+    assert format_context([]) == ""
+
+
+def test_llm_prompt_includes_retrieved_notes(notes_retriever, monkeypatch):
+    """Test that /llm injects the matching note into the prompt template"""
+    monkeypatch.setattr(services, "RETRIEVAL_ENABLED", True)
+    monkeypatch.setattr(services, "RETRIEVAL_MIN_SCORE", 0.2)
+    # Echo the rendered prompt back as the answer
+    chain = services.model_registry.prompt | RunnableLambda(lambda prompt: prompt.to_string())
+    monkeypatch.setattr(services.model_registry, "get_chain", lambda model: chain)
+
+    response = client.post("/llm", json={"prompt": "How often should the tomatoes get watering?"})
+
+    prompt = response.json()["response"]
+    assert "Relevant notes:" in prompt
+    assert "(garden.md) The tomatoes in the garden" in prompt
+    assert "pancake" not in prompt
+
+
+def test_cached_answers_dropped_when_index_changes(notes_retriever, monkeypatch, tmp_path):
+    """Test that an answer cached before an ingest is not replayed after it"""
+    monkeypatch.setattr(services, "RETRIEVAL_ENABLED", True)
+    monkeypatch.setattr(services, "RETRIEVAL_MIN_SCORE", 0.2)
+    chain = services.model_registry.prompt | RunnableLambda(lambda prompt: prompt.to_string())
+    monkeypatch.setattr(services.model_registry, "get_chain", lambda model: chain)
+    question = {"prompt": "When are the winter tyres for the car due?"}
+
+    client.post("/llm", json=question)
+    assert client.post("/llm", json=question).json()["cached"] is True
+
+    (tmp_path / "notes" / "car.txt").write_text("The car got its new winter tyres fitted in October.")
+    notes_retriever.ingest([str(tmp_path / "notes")])
+
+    response = client.post("/llm", json=question).json()
+    assert response["cached"] is False
+    assert "fitted in October" in response["response"]
+
+
+def test_llm_prompt_unchanged_when_retrieval_disabled(notes_retriever, monkeypatch):
+    """Test that the prompt has no notes section while retrieval is off"""
+    monkeypatch.setattr(services, "RETRIEVAL_ENABLED", False)
+    chain = services.model_registry.prompt | RunnableLambda(lambda prompt: prompt.to_string())
+    monkeypatch.setattr(services.model_registry, "get_chain", lambda model: chain)
+
+    response = client.post("/llm", json={"prompt": "How often should the tomatoes get watering?"})
+
+    assert "Relevant notes" not in response.json()["response"]
+
+
+def test_retrieval_endpoints(notes_retriever, tmp_path):
+    """Test ingest, search and stats over HTTP"""
+    extra = tmp_path / "extra.txt"
+    extra.write_text("The dentist appointment is on Tuesday at three.")
+
+    ingested = client.post("/retrieval/ingest", json={"paths": [str(extra)]}).json()
+    assert ingested["files"] == 1 and ingested["total_chunks"] == 4
+
+    found = client.post("/retrieval/search", json={"query": "dentist appointment", "k": 2}).json()
+    assert found["results"][0]["source"] == str(extra)
+    assert len(found["results"]) == 2
+
+    stats = client.get("/retrieval/stats").json()
+    assert stats["documents"] == 4 and stats["chunks"] == 4
+    assert stats["segments"] >= 1 and stats["dtype"] == "int8"
+
+    removed = client.delete("/retrieval/documents", params={"source": str(extra)}).json()
+    assert removed == {"removed_chunks": 1, "total_chunks": 3}
+    found = client.post("/retrieval/search", json={"query": "dentist appointment", "k": 4}).json()
+    assert all(result["source"] != str(extra) for result in found["results"])
+
+
+def test_ingest_without_sources_is_rejected(notes_retriever, monkeypatch):
+    """Test that an ingest with no paths and no configured sources is a 400"""
+    monkeypatch.setattr(services, "RETRIEVAL_SOURCES", [])
+    assert client.post("/retrieval/ingest", json={}).status_code == 400
+
+
+class CountingEmbedder(HashingEmbedder):
+    """Hashing embedder that counts the texts it embeds"""
+    def __init__(self, dim: int = 64):
+        super().__init__(dim)
+        self.embedded = 0
+
+    def embed_array(self, texts):
+        self.embedded += len(texts)
+        return super().embed_array(texts)
+
+
+def chunk_texts(path, chunk_words=10, overlap=3):
+    return [chunk.text for chunk in iter_file_chunks(str(path), chunk_words, overlap)]
+
+
+def test_ingest_reembeds_only_changed_chunks(tmp_path):
+    """Test skip by stat and hash, partial re-embedding and tombstoning of deleted files"""
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    words = [f"w{i}" for i in range(25)]
+    note = notes / "note.txt"
+    note.write_text(" ".join(words))
+    old = chunk_texts(note)
+    embedder = CountingEmbedder()
+    retriever = Retriever(embedder, str(tmp_path / "index"), chunk_words=10, overlap=3)
+
+    first = retriever.ingest([str(notes)])
+    assert first["files"] == 1 and first["chunks"] == len(old) and embedder.embedded == len(old)
+
+    os.utime(note, ns=(time.time_ns(), time.time_ns() + 10**9))  # touched, same content
+    again = Retriever(embedder, str(tmp_path / "index"), chunk_words=10, overlap=3).ingest([str(notes)])
+    assert again["unchanged_files"] == 1 and again["chunks"] == 0 and embedder.embedded == len(old)
+
+    words[22] = "edited"
+    note.write_text(" ".join(words))
+    new = chunk_texts(note)
+    reused = len(set(old) & set(new))
+    changed = retriever.ingest([str(notes)])
+    assert (changed["chunks"], changed["reused_chunks"], changed["removed_chunks"]) == (
+        len(new) - reused, reused, len(old) - reused)
+    assert changed["chunks"] <= 2 and len(retriever) == len(new)
+    assert embedder.embedded == len(old) + changed["chunks"]
+    assert retriever.search("edited", 1)[0].chunk >= len(old)  # new chunks get new numbers
+
+    note.unlink()
+    removed = retriever.ingest([str(notes)])
+    assert removed["removed_files"] == 1 and removed["removed_chunks"] == len(new) and len(retriever) == 0
+    assert retriever.manifest.files == {}
+
+
+class FailingEmbedder(CountingEmbedder):
+    """Counting embedder that raises once fail_at texts have been embedded"""
+    def __init__(self, fail_at: float = float("inf")):
+        super().__init__()
+        self.fail_at = fail_at
+
+    def embed_array(self, texts):
+        if self.embedded + len(texts) > self.fail_at:
+            raise RuntimeError("embedding backend went away")
+        return super().embed_array(texts)
+
+
+def test_failed_ingest_is_retried_without_losing_or_duplicating_chunks(tmp_path):
+    """Test that an embedder failing mid-ingest leaves the manifest and buffers as they were"""
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    (notes / "a.txt").write_text(" ".join(f"a{i}" for i in range(25)))
+    (notes / "b.txt").write_text(" ".join(f"b{i}" for i in range(25)))
+    embedder = FailingEmbedder()
+    retriever = Retriever(embedder, str(tmp_path / "index"), chunk_words=10, overlap=3, batch_size=2,
+                          segment_rows=3, auto_compact=False)
+    retriever.ingest([str(notes)])
+    before = json.loads(json.dumps(retriever.manifest.files))
+    old_a = chunk_texts(notes / "a.txt")
+
+    (notes / "a.txt").write_text(" ".join(f"a{i}" for i in range(40)) + " grown")
+    (notes / "b.txt").write_text(" ".join(f"new{i}" for i in range(25)))
+    fresh_a = len(set(chunk_texts(notes / "a.txt")) - set(old_a))
+    embedder.fail_at = embedder.embedded + fresh_a + 1  # a's new chunks are flushed, b's first batch is not
+    with pytest.raises(RuntimeError):
+        retriever.ingest([str(notes)])
+
+    assert retriever.manifest.files == before
+    assert Retriever(HashingEmbedder(64), str(tmp_path / "index")).manifest.files == before
+    assert retriever.store._pending_chunks == []
+
+    embedder.fail_at = float("inf")
+    retry = retriever.ingest([str(notes)])
+    assert retry["files"] == 2
+    live = [(chunk["source"], chunk["chunk"]) for _, chunk in retriever.store.search_chunks(np.ones(64), 100)[0]]
+    assert len(live) == len(set(live)) == len(retriever) == len(chunk_texts(notes / "a.txt")) + len(
+        chunk_texts(notes / "b.txt"))
+    [top] = retriever.search("new7 new8", 1)
+    assert top.source == str(notes / "b.txt")
+
+
+def test_ingest_reuses_chunks_after_an_insertion_shifts_them(tmp_path):
+    """Test that inserting a passage near the top of a long file re-embeds only the chunks around it"""
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    words = [f"w{i}" for i in range(3000)]
+    note = notes / "long.txt"
+    note.write_text(" ".join(words))
+    embedder = CountingEmbedder()
+    retriever = Retriever(embedder, str(tmp_path / "index"))
+    first = retriever.ingest([str(notes)])
+
+    note.write_text(" ".join(words[:50] + [f"new{i}" for i in range(300)] + words[50:]))
+    changed = retriever.ingest([str(notes)])
+    assert changed["chunks"] <= 5 and changed["reused_chunks"] >= first["chunks"] - 2
+    assert len(retriever) == len(chunk_texts(note, 200, 40))
+    live = [chunk for _, chunk in retriever.store.search_chunks(np.ones(64), 1000)[0]]
+    assert len({chunk["chunk"] for chunk in live}) == len(live) == len(retriever)
+    assert sorted(chunk["text"] for chunk in live) == sorted(chunk_texts(note, 200, 40))
+
+
+def test_ingest_job_endpoints(notes_retriever, tmp_path):
+    """Test that a background ingest job reports its progress until it completes"""
+    extra = tmp_path / "notes" / "dentist.txt"
+    extra.write_text("The dentist appointment is on Tuesday at three.")
+
+    response = client.post("/retrieval/jobs", json={"paths": [str(tmp_path / "notes")]})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    deadline = time.time() + 5
+    while (job := client.get(f"/retrieval/jobs/{job_id}").json())["status"] == "running" and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert job["status"] == "completed" and job["files_total"] == job["files_done"] == 4
+    assert job["files"] == 1 and job["unchanged_files"] == 3 and job["total_chunks"] == 4
+    assert job["chunks_per_second"] is not None
+    assert client.get("/retrieval/jobs").json()["jobs"][0]["job_id"] == job_id
+    assert client.get("/retrieval/jobs/missing").status_code == 404
+
+
+def test_watch_documents_ingests_settled_changes(notes_retriever, tmp_path):
+    """Test that the poller applies a new and a deleted file in one ingest job"""
+    notes = tmp_path / "notes"
+    (notes / "dentist.txt").write_text("The dentist appointment is on Tuesday at three.")
+    (notes / "car.txt").unlink()
+
+    async def watch_briefly():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(services.watch_documents([str(notes)], 0.01, 0.02), 1.0)
+
+    asyncio.run(watch_briefly())
+
+    assert {os.path.basename(source) for source in notes_retriever.store.sources()} == {
+        "garden.md", "recipes.md", "dentist.txt",
+    }
+    watched = [job for job in services.list_ingest_jobs() if job["trigger"] == "watch"]
+    assert len(watched) == 1 and watched[0]["files"] == 1 and watched[0]["removed_files"] == 1
@@ -0,0 +1,70 @@
+"""
+Tests for the conversation session endpoints
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.runnables import RunnableLambda
+
+from app import services
+from app.main import app
+from app.sessions import SessionStore
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def echo_chain(monkeypatch):
+    """Replace every model chain with one that records the chat history it receives"""
+    seen = []
+
+    def answer(inputs):
+        seen.append(inputs["chat_history"])
+        return f"Answer to {inputs['question']}"
+
+    monkeypatch.setattr(services.model_registry, "get_chain", lambda model: RunnableLambda(answer))
+    return seen
+
+
+def test_session_keeps_history(echo_chain):
+    """Test that later turns get the earlier turns from the server"""
+    response = client.post("/sessions", json={})
+    assert response.status_code == 200
+    session_id = response.json()["session_id"]
+
+    first = client.post(f"/sessions/{session_id}/turns", json={"prompt": "What is Python?"})
+    assert first.status_code == 200
+    assert first.json()["success"] is True
+    assert first.json()["session_id"] == session_id
+
+    client.post(f"/sessions/{session_id}/turns", json={"prompt": "Who made it?"})
+    assert echo_chain[0] == ""
+    assert "user: What is Python?" in echo_chain[1]
+    assert "assistant: Answer to What is Python?" in echo_chain[1]
+
+    data = client.get(f"/sessions/{session_id}").json()
+    assert [turn["role"] for turn in data["turns"]] == ["user", "assistant"] * 2
+
+    assert client.delete(f"/sessions/{session_id}").status_code == 200
+    assert client.get(f"/sessions/{session_id}").status_code == 404
+
+
+def test_unknown_session_turn():
+    """Test that posting to an unknown session returns 404"""
+    response = client.post("/sessions/missing/turns", json={"prompt": "Hello"})
+    assert response.status_code == 404
+
+
+def test_session_token_budget():
+    """Test that old turns are folded into a summary once over budget"""
+    store = SessionStore(token_budget=40, summary_tokens=20, ttl=60, max_sessions=10)
+    session = store.create("gemma3")
+    for i in range(6):
+        store.record_turn(session, f"Question number {i}. Extra words here.", "A" * 40, context=[1, 2, 3])
+
+    assert session.history_tokens <= 40 + store.summary_tokens
+    assert session.turns[-2].content.startswith("Question number 5")
+    assert session.summary
+    assert "Extra words" not in session.summary
+    # The KV context no longer matches the trimmed history
+    assert session.context is None
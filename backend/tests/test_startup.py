@@ -0,0 +1,41 @@
+"""
+Tests for lazy startup of the backend
+"""
+
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be loaded on first LLM use or by the warm-up task
+HEAVY_MODULES = ["langchain_core", "langchain_ollama", "ollama", "langsmith", "numpy", "torch", "transformers", "vosk"]
+
+
+def test_import_does_not_load_llm_stack():
+    """Test that importing app.main leaves the heavy LLM/ML modules unloaded"""
+    snippet = (
+        "import sys, app.main; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", snippet], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+
+
+def test_health_reports_readiness(monkeypatch):
+    """Test that /health answers before warm-up and reports readiness after"""
+    from app import services
+
+    client = TestClient(app)
+    assert client.get("/health").json()["llm_ready"] is False
+
+    monkeypatch.setattr(services.model_registry, "ready", True)
+    monkeypatch.setattr(services.model_registry, "warmup_time", 1.5)
+    data = client.get("/health").json()
+    assert data["llm_ready"] is True
+    assert data["llm_warmup_time"] == 1.5
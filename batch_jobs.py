@@ -0,0 +1,161 @@
+"""
+Batch transcription jobs for the Vosk STT server
+
+A job is a list of audio files spread over a fixed set of decoder workers.
+Results are collected in completion order and can be followed while the
+job runs.
+"""
+
+import queue
+import shutil
+import threading
+import time
+import uuid
+
+
+class BatchJob:
+    """Progress and results of one batch of files"""
+
+    def __init__(self, paths, names=None, cleanup_dir=None):
+        self.job_id = uuid.uuid4().hex
+        self.paths = list(paths)
+        # Reported instead of the paths, e.g. upload file names
+        self.names = list(names) if names is not None else self.paths
+        self.cleanup_dir = cleanup_dir
+        self.status = 'queued'
+        self.results = []
+        self.failed = 0
+        self.audio_seconds = 0.0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancelled = threading.Event()
+        self.pending = queue.Queue()
+        for index, path in enumerate(self.paths):
+            self.pending.put((index, path))
+        self._changed = threading.Condition()
+        self._running = 0
+
+    @property
+    def done(self):
+        return self.status in ('completed', 'cancelled')
+
+    def progress(self):
+        """Counts, timing and throughput (audio seconds per wall second)"""
+        end = self.finished_at or time.time()
+        wall_seconds = end - self.started_at if self.started_at else 0.0
+        status = self.status
+        if self.cancelled.is_set() and not self.done:
+            status = 'cancelling'
+        return {
+            'job_id': self.job_id,
+            'status': status,
+            'total': len(self.paths),
+            'completed': len(self.results),
+            'failed': self.failed,
+            'audio_seconds': round(self.audio_seconds, 3),
+            'wall_seconds': round(wall_seconds, 3),
+            'throughput': round(self.audio_seconds / wall_seconds, 2) if wall_seconds else 0.0,
+        }
+
+    def add_result(self, result):
+        with self._changed:
+            self.results.append(result)
+            if result.get('error'):
+                self.failed += 1
+            self.audio_seconds += result.get('duration', 0.0)
+            self._changed.notify_all()
+
+    def iter_results(self, poll_interval=1.0):
+        """Yield results as they complete until the job is done"""
+        sent = 0
+        while True:
+            with self._changed:
+                while sent == len(self.results) and not self.done:
+                    self._changed.wait(poll_interval)
+                batch = self.results[sent:]
+                finished = self.done
+            yield from batch
+            sent += len(batch)
+            if finished and sent == len(self.results):
+                return
+
+    def _worker_started(self):
+        with self._changed:
+            if self.started_at is None:
+                self.started_at = time.time()
+                self.status = 'running'
+            self._running += 1
+
+    def _worker_finished(self):
+        with self._changed:
+            self._running -= 1
+            last = self._running == 0
+            if last:
+                self.status = 'cancelled' if self.cancelled.is_set() else 'completed'
+                self.finished_at = time.time()
+                self._changed.notify_all()
+        if last and self.cleanup_dir:
+            shutil.rmtree(self.cleanup_dir, ignore_errors=True)
+
+
+class BatchJobManager:
+    """Runs jobs over ``workers`` decoder slots
+
+    ``run_file(worker_index, path)`` transcribes one file on the given
+    worker and returns a result dict. Each job gets one dispatcher thread
+    per worker; cancelling a job stops dispatching its remaining files and
+    drops results of files that were still decoding.
+    """
+
+    def __init__(self, run_file, workers, max_jobs=100):
+        self.run_file = run_file
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, paths, names=None, cleanup_dir=None):
+        job = BatchJob(paths, names, cleanup_dir)
+        with self._lock:
+            self._forget_finished()
+            self._jobs[job.job_id] = job
+        for worker_index in range(max(1, min(self.workers, len(job.paths)))):
+            job._worker_started()
+            threading.Thread(target=self._dispatch, args=(job, worker_index),
+                             name=f'batch-{job.job_id[:8]}-{worker_index}', daemon=True).start()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a job; returns it, or None if unknown"""
+        job = self.get(job_id)
+        if job is not None and not job.done:
+            job.cancelled.set()
+        return job
+
+    def _dispatch(self, job, worker_index):
+        try:
+            while not job.cancelled.is_set():
+                try:
+                    index, path = job.pending.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    result = self.run_file(worker_index, path)
+                except Exception as e:
+                    result = {'error': str(e), 'duration': 0.0}
+                if job.cancelled.is_set():
+                    break
+                job.add_result({'index': index, 'file': job.names[index], **result})
+        finally:
+            job._worker_finished()
+
+    def _forget_finished(self):
+        finished = [job for job in self._jobs.values() if job.done]
+        finished.sort(key=lambda job: job.created_at)
+        while len(self._jobs) >= self.max_jobs and finished:
+            del self._jobs[finished.pop(0).job_id]
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Concurrent-stream capacity of a running Vosk STT server
+
+Opens increasing numbers of /stream sessions in parallel, each sending
+real-time paced PCM chunks, and records per-chunk request latency. A level
+keeps up when the p95 chunk latency stays below the chunk duration; the
+highest such level is the server's stream capacity, also reported per core.
+
+Start the server first, e.g.:
+    STT_WORKERS=auto python vosk_server.py
+Then, from the repository root:
+    python benchmarks/bench_stt_load.py --streams 1 2 4 8 16 --seconds 10
+Use --wav to replay a 16 kHz mono PCM16 recording instead of synthetic audio.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+import urllib.request
+import wave
+
+import numpy as np
+
+
+def load_audio(path, seconds, sample_rate):
+    if path:
+        with wave.open(path, 'rb') as wav:
+            if wav.getframerate() != sample_rate or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                raise SystemExit(f"{path} must be {sample_rate} Hz mono PCM16")
+            return wav.readframes(wav.getnframes())
+    # Alternating 1.5 s voiced bursts and 0.5 s background noise
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    voiced = (t % 2.0) < 1.5
+    audio = voiced * 0.3 * np.sin(2 * np.pi * 180 * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    audio += 0.01 * rng.standard_normal(t.size)
+    return (audio * 32767).astype(np.int16).tobytes()
+
+
+def request(url, method='POST', data=None):
+    req = urllib.request.Request(url, data=data, method=method,
+                                 headers={'Content-Type': 'application/octet-stream'})
+    with urllib.request.urlopen(req, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def run_stream(base_url, chunks, chunk_seconds, latencies, errors):
+    try:
+        session_id = request(f"{base_url}/stream")['session_id']
+        next_send = time.perf_counter()
+        for chunk in chunks:
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            start = time.perf_counter()
+            request(f"{base_url}/stream/{session_id}", data=chunk)
+            latencies.append(time.perf_counter() - start)
+            next_send += chunk_seconds
+        request(f"{base_url}/stream/{session_id}", method='DELETE')
+    except Exception as e:
+        errors.append(str(e))
+
+
+def run_level(base_url, streams, chunks, chunk_seconds):
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(target=run_stream, args=(base_url, chunks, chunk_seconds, latencies, errors))
+        for _ in range(streams)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--chunk-ms", type=int, default=200)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--wav", default=None)
+    parser.add_argument("--server-cores", type=int, default=os.cpu_count(),
+                        help="cores available to the server (default: this machine's)")
+    args = parser.parse_args()
+
+    health = request(f"{args.url}/health", method='GET')
+    print(f"Server workers: {health.get('workers', 'unknown')}, cores: {args.server_cores}")
+
+    audio = load_audio(args.wav, args.seconds, args.sample_rate)
+    chunk_bytes = args.sample_rate * args.chunk_ms // 1000 * 2
+    chunk_seconds = args.chunk_ms / 1000
+    chunks = [audio[i:i + chunk_bytes] for i in range(0, len(audio), chunk_bytes)]
+
+    capacity = 0
+    print(f"{'streams':>8} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'errors':>7}  real-time")
+    for streams in args.streams:
+        latencies, errors = run_level(args.url, streams, chunks, chunk_seconds)
+        if not latencies:
+            print(f"{streams:>8} {'-':>9} {'-':>9} {'-':>9} {len(errors):>7}  no")
+            break
+        latencies_ms = sorted(latency * 1000 for latency in latencies)
+        p95 = latencies_ms[max(0, int(len(latencies_ms) * 0.95) - 1)]
+        keeps_up = not errors and p95 < args.chunk_ms
+        print(f"{streams:>8} {statistics.median(latencies_ms):9.1f} {p95:9.1f} {latencies_ms[-1]:9.1f} "
+              f"{len(errors):>7}  {'yes' if keeps_up else 'no'}")
+        if not keeps_up:
+            break
+        capacity = streams
+
+    print(f"\nReal-time stream capacity: {capacity} ({capacity / args.server_cores:.2f} per core)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Phrase grammars for recognizing "open X" voice commands
+"""
+
+import json
+import re
+import urllib.request
+
+COMMAND_VERBS = ['open', 'launch', 'start', 'run']
+OTHER_COMMANDS = ['list apps', 'show apps']
+UNKNOWN = '[unk]'
+
+
+def spoken_form(name):
+    """How an app name is said: 'notepad++' -> 'notepad plus plus'"""
+    name = name.lower().replace('++', ' plus plus').replace('+', ' plus ')
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', name).split())
+
+
+def fetch_app_names(backend_url, timeout=3.0):
+    """App names and aliases from the backend's /list-apps as {spoken name: app name}
+
+    Returns None when the backend cannot be reached.
+    """
+    try:
+        with urllib.request.urlopen(f"{backend_url}/list-apps", timeout=timeout) as response:
+            data = json.loads(response.read())
+    except Exception as e:
+        print(f"Could not fetch app list from {backend_url}: {e}")
+        return None
+
+    names = {spoken_form(name): name for name in data.get('available_apps', [])}
+    for alias, target in data.get('aliases', {}).items():
+        names.setdefault(spoken_form(alias), target)
+    names.pop('', None)
+    return names
+
+
+class CommandGrammar:
+    """Grammar phrases for a set of app names and the way back to the app"""
+
+    def __init__(self, app_names):
+        # spoken name -> app name
+        self.app_names = dict(app_names)
+        phrases = list(OTHER_COMMANDS)
+        for spoken in sorted(self.app_names):
+            phrases.append(spoken)
+            phrases.extend(f"{verb} {spoken}" for verb in COMMAND_VERBS)
+        phrases.append(UNKNOWN)
+        self.phrases = phrases
+        self.json = json.dumps(phrases)
+
+    def __bool__(self):
+        return bool(self.app_names)
+
+    def parse(self, text):
+        """Map recognized grammar text to a command dict, or None"""
+        text = ' '.join(text.split())
+        if not text or UNKNOWN in text:
+            return None
+        if text in OTHER_COMMANDS:
+            return {'action': 'list_apps'}
+        words = text.split(' ', 1)
+        spoken = words[1] if words[0] in COMMAND_VERBS and len(words) > 1 else text
+        app_name = self.app_names.get(spoken)
+        if app_name is None:
+            return None
+        return {'action': 'open_app', 'app_name': app_name}
+
+
+def result_confidence(result):
+    """Mean word confidence of a Vosk result produced with SetWords(True)"""
+    words = result.get('result') or []
+    if not words:
+        return 0.0
+    return sum(word.get('conf', 0.0) for word in words) / len(words)
@@ -0,0 +1,281 @@
+"""
+Process pool for Vosk decoding
+
+The server forks one loader process from its main thread at startup,
+before any other thread exists. The loader loads the model, forks the
+other decoder processes from itself (still single-threaded, so no lock
+can be inherited held) and all of them share the model's pages
+copy-on-write. Requests are forwarded over a pipe per worker. Each stream session is pinned to the
+worker it was opened on, the least loaded one at the time, so decoder
+state stays in a single process.
+"""
+
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+
+def resolve_worker_count(setting):
+    """Number of decoder processes for an STT_WORKERS value ('auto' = one per core)"""
+    if str(setting).strip().lower() == 'auto':
+        return os.cpu_count() or 1
+    return max(0, int(setting))
+
+
+class RecognizerPool:
+    """Reusable recognizers per sample rate for one-shot requests
+
+    Creating a KaldiRecognizer allocates a fresh decoder graph state; reusing
+    reset ones avoids that per request. At most ``size`` idle recognizers
+    are kept per sample rate.
+    """
+
+    def __init__(self, factory, size=4):
+        self.factory = factory
+        self.size = size
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, sample_rate=16000):
+        with self._lock:
+            idle = self._idle.get(sample_rate)
+            if idle:
+                return idle.pop()
+        return self.factory(sample_rate)
+
+    def release(self, recognizer, sample_rate=16000):
+        recognizer.Reset()
+        with self._lock:
+            idle = self._idle.setdefault(sample_rate, [])
+            if len(idle) < self.size:
+                idle.append(recognizer)
+
+
+class SessionRouter:
+    """Pins stream sessions to workers under a pool-wide session cap
+
+    A new session goes to the worker holding the fewest sessions, so one
+    worker never fills up while others sit idle. Sessions unused for
+    ``idle_timeout`` seconds are forgotten, as the workers reap them too.
+    """
+
+    def __init__(self, num_workers, max_sessions, idle_timeout=30.0):
+        self.num_workers = num_workers
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        # session id -> [worker index, last used]
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def assign(self, session_id):
+        """Worker for a new session, or None when the pool is full"""
+        cutoff = time.time() - self.idle_timeout
+        with self._lock:
+            for expired in [sid for sid, (_, last_used) in self._sessions.items() if last_used < cutoff]:
+                del self._sessions[expired]
+            if len(self._sessions) >= self.max_sessions:
+                return None
+            worker = min(range(self.num_workers), key=self._counts().__getitem__)
+            self._sessions[session_id] = [worker, time.time()]
+            return worker
+
+    def lookup(self, session_id):
+        """Worker holding a session (marking it used), or None if it is unknown"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            entry[1] = time.time()
+            return entry[0]
+
+    def release(self, session_id):
+        """Forget a session and return its worker, or None if it is unknown"""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        return entry[0] if entry else None
+
+    def counts(self):
+        """Sessions held by each worker"""
+        with self._lock:
+            return self._counts()
+
+    def _counts(self):
+        counts = [0] * self.num_workers
+        for worker, _ in self._sessions.values():
+            counts[worker] += 1
+        return counts
+
+
+def _decoder_main(conn, handler_factory, state):
+    """Worker loop: build the handler, report ready, then serve (request_id, method, args) messages"""
+    try:
+        handler = handler_factory(state)
+    except Exception as e:
+        conn.send((None, False, f"{type(e).__name__}: {e}"))
+        return
+    conn.send((None, True, os.getpid()))
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if message is None:
+            break
+        request_id, method, args = message
+        try:
+            conn.send((request_id, True, getattr(handler, method)(*args)))
+        except Exception as e:
+            conn.send((request_id, False, f"{type(e).__name__}: {e}"))
+
+
+def _loader_main(conns, parent_conns, setup, handler_factory):
+    """Loader process: run setup, fork the other workers from here, then serve as worker 0"""
+    for conn in parent_conns:
+        conn.close()
+    try:
+        state = setup() if setup is not None else None
+    except Exception as e:
+        for conn in conns:
+            conn.send((None, False, f"{type(e).__name__}: {e}"))
+        return
+    children = []
+    for conn in conns[1:]:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                for other in conns:
+                    if other is not conn:
+                        other.close()
+                _decoder_main(conn, handler_factory, state)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        children.append(pid)
+        conn.close()
+    _decoder_main(conns[0], handler_factory, state)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+
+class _WorkerHandle:
+    """Parent-side end of one decoder process"""
+
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.send_lock = threading.Lock()
+        self.pending = {}
+        # Set once the worker has built its handler, or has failed to
+        self.ready = threading.Event()
+        self.pid = None
+        self.error = None
+        self.reader = threading.Thread(target=self._read, name=f'{name}-reader', daemon=True)
+
+    def _read(self):
+        while True:
+            try:
+                request_id, ok, payload = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            if request_id is None:
+                if ok:
+                    self.pid = payload
+                else:
+                    self.error = payload
+                self.ready.set()
+                continue
+            future = self.pending.pop(request_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+        # Worker died: fail everything still waiting on it
+        if self.error is None:
+            self.error = 'Decoder worker exited'
+        self.ready.set()
+        for future in list(self.pending.values()):
+            future.set_exception(RuntimeError(self.error))
+        self.pending.clear()
+
+
+class DecoderPool:
+    """Fixed set of decoder processes sharing what ``setup`` loaded
+
+    Create it from the main thread before any other thread starts: it
+    forks a loader process at once, which runs ``setup()`` (e.g. loading
+    the model), forks the remaining workers from itself and then serves as
+    worker 0. ``handler_factory(state)`` runs in each worker with setup's
+    result and returns an object whose methods are called with ``call``;
+    ``wait_ready`` blocks until every worker has built it. Requires the
+    'fork' start method.
+    """
+
+    def __init__(self, num_workers, handler_factory, setup=None, timeout=30.0, name='decoder'):
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise RuntimeError('Decoder pool needs the fork start method (not available on this platform)')
+        context = multiprocessing.get_context('fork')
+        self.timeout = timeout
+        self._ids = itertools.count()
+        self._next = itertools.count()
+        pipes = [context.Pipe() for _ in range(num_workers)]
+        parent_conns = [parent_conn for parent_conn, _ in pipes]
+        child_conns = [child_conn for _, child_conn in pipes]
+        self.loader = context.Process(target=_loader_main, args=(child_conns, parent_conns, setup, handler_factory),
+                                      name=f'{name}-loader', daemon=True)
+        self.loader.start()
+        for child_conn in child_conns:
+            child_conn.close()
+        self.workers = [_WorkerHandle(conn, f'{name}-{index}') for index, conn in enumerate(parent_conns)]
+        for worker in self.workers:
+            worker.reader.start()
+
+    def __len__(self):
+        return len(self.workers)
+
+    def wait_ready(self, timeout=None):
+        """Wait for every worker to build its handler; RuntimeError if one failed"""
+        for worker in self.workers:
+            if not worker.ready.wait(timeout):
+                raise RuntimeError('Timed out waiting for decoder workers')
+            if worker.error is not None:
+                raise RuntimeError(worker.error)
+
+    def least_loaded(self):
+        """Worker index with the fewest outstanding requests (round-robin on ties)"""
+        start = next(self._next)
+        order = [(start + offset) % len(self.workers) for offset in range(len(self.workers))]
+        return min(order, key=lambda index: len(self.workers[index].pending))
+
+    def call(self, worker_index, method, *args):
+        """Run handler.method(*args) in a worker and wait for the result"""
+        worker = self.workers[worker_index]
+        request_id = next(self._ids)
+        future = Future()
+        worker.pending[request_id] = future
+        try:
+            with worker.send_lock:
+                worker.conn.send((request_id, method, args))
+            return future.result(timeout=self.timeout)
+        finally:
+            worker.pending.pop(request_id, None)
+
+    def outstanding(self):
+        return [len(worker.pending) for worker in self.workers]
+
+    def close(self):
+        for worker in self.workers:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(None)
+            except OSError:
+                pass
+        self.loader.join(timeout=5)
@@ -0,0 +1,186 @@
+"""
+Background loading and LRU unloading of Vosk models
+
+Each registered model is loaded on a background thread the first time it
+is asked for, so the server answers (health checks, clean rejections)
+while a model is still loading. Loaded models are charged their size on
+disk against a memory budget; when it is exceeded the least recently used
+unpinned models are unloaded.
+"""
+
+import os
+import threading
+import time
+
+# Seconds before a failed load is attempted again
+RETRY_AFTER_FAILURE = 30.0
+
+
+class ModelNotReady(Exception):
+    """The model is still loading or failed to load"""
+
+    def __init__(self, name, state, error=None):
+        self.name = name
+        self.state = state
+        self.error = error
+        message = f"Model '{name}' failed to load" if state == 'failed' else f"Model '{name}' is {state}"
+        super().__init__(f"{message}: {error}" if error else message)
+
+
+def directory_size(path):
+    """Total size in bytes of the files below path"""
+    total = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
+
+
+class ModelEntry:
+    """Load state of one registered model"""
+
+    def __init__(self, name, path, pinned=False):
+        self.name = name
+        self.path = path
+        self.pinned = pinned
+        self.state = 'unloaded'
+        self.value = None
+        self.error = None
+        self.size_bytes = 0
+        self.load_seconds = None
+        self.loaded_at = None
+        self.failed_at = None
+        self.last_used = 0.0
+        self.ready = threading.Event()
+
+    def status(self):
+        return {
+            'path': self.path,
+            'state': self.state,
+            'pinned': self.pinned,
+            'size_mb': round(self.size_bytes / 2**20, 1),
+            'load_seconds': self.load_seconds,
+            'error': self.error,
+        }
+
+
+class ModelRegistry:
+    """Named models loaded in the background and unloaded least recently used first
+
+    ``loader(name, path)`` builds the value served for a model (it may do
+    more than load it, e.g. start decoders); ``unloader(value)`` releases
+    it. ``memory_budget`` is in bytes, 0 for no limit. Pinned models are
+    never unloaded.
+    """
+
+    def __init__(self, paths, loader, unloader=None, memory_budget=0, pinned=()):
+        self.loader = loader
+        self.unloader = unloader
+        self.memory_budget = memory_budget
+        self.entries = {name: ModelEntry(name, path, name in pinned) for name, path in paths.items()}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def load_async(self, name):
+        """Start loading a model unless it is loaded or loading"""
+        entry = self.entries[name]
+        with self._lock:
+            if entry.state in ('loading', 'ready'):
+                return
+            if entry.state == 'failed' and time.time() - entry.failed_at < RETRY_AFTER_FAILURE:
+                return
+            entry.state = 'loading'
+            entry.error = None
+            entry.ready.clear()
+        threading.Thread(target=self._load, args=(entry,), name=f'model-loader-{name}', daemon=True).start()
+
+    def get(self, name, wait=0.0):
+        """Value of a loaded model, waiting up to ``wait`` seconds for it to load
+
+        Raises KeyError for unknown names and ModelNotReady otherwise.
+        """
+        entry = self.entries[name]
+        if entry.state != 'ready':
+            self.load_async(name)
+            if not entry.ready.wait(wait):
+                raise ModelNotReady(name, entry.state, entry.error)
+        with self._lock:
+            value = entry.value
+            if entry.state != 'ready' or value is None:
+                raise ModelNotReady(name, entry.state, entry.error)
+            entry.last_used = time.time()
+        return value
+
+    def peek(self, name):
+        """Value of a model if it is loaded, else None; never starts a load"""
+        entry = self.entries[name]
+        with self._lock:
+            if entry.state != 'ready':
+                return None
+            entry.last_used = time.time()
+            return entry.value
+
+    def status(self):
+        return {name: entry.status() for name, entry in self.entries.items()}
+
+    def _load(self, entry):
+        started = time.perf_counter()
+        print(f"Loading model '{entry.name}' from: {entry.path}")
+        try:
+            if not os.path.isdir(entry.path):
+                raise FileNotFoundError(f"Model not found at {entry.path}")
+            size_bytes = directory_size(entry.path)
+            value = self.loader(entry.name, entry.path)
+        except Exception as e:
+            print(f"Error loading model '{entry.name}': {e}")
+            with self._lock:
+                entry.state = 'failed'
+                entry.error = str(e)
+                entry.failed_at = time.time()
+            # Wake waiters so they fail now rather than at their timeout
+            entry.ready.set()
+            return
+
+        with self._lock:
+            entry.value = value
+            entry.size_bytes = size_bytes
+            entry.load_seconds = round(time.perf_counter() - started, 2)
+            entry.loaded_at = entry.last_used = time.time()
+            entry.state = 'ready'
+            evicted = self._evict(keep=entry)
+        entry.ready.set()
+        print(f"Model '{entry.name}' loaded in {entry.load_seconds}s")
+        for victim in evicted:
+            self._unload(victim)
+
+    def _evict(self, keep):
+        """Pick least recently used models to unload until within budget (lock held)"""
+        if not self.memory_budget:
+            return []
+        loaded = [entry for entry in self.entries.values() if entry.state == 'ready']
+        used = sum(entry.size_bytes for entry in loaded)
+        candidates = sorted((entry for entry in loaded if not entry.pinned and entry is not keep),
+                            key=lambda entry: entry.last_used)
+        evicted = []
+        while used > self.memory_budget and candidates:
+            victim = candidates.pop(0)
+            used -= victim.size_bytes
+            victim.state = 'unloaded'
+            victim.ready.clear()
+            evicted.append((victim, victim.value))
+            victim.value = None
+        return evicted
+
+    def _unload(self, victim):
+        entry, value = victim
+        print(f"Unloading model '{entry.name}' (memory budget)")
+        if self.unloader is not None:
+            try:
+                self.unloader(value)
+            except Exception as e:
+                print(f"Error unloading model '{entry.name}': {e}")
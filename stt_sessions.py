@@ -0,0 +1,182 @@
+"""
+Streaming recognition sessions for the Vosk STT server
+
+Each session owns one recognizer, so decoder state carries across the
+chunks a client uploads instead of being rebuilt for every request.
+"""
+
+import json
+import threading
+import time
+import uuid
+
+
+class StreamSession:
+    """One client stream and its recognizer"""
+
+    def __init__(self, session_id, recognizer, sample_rate, audio_filter=None, vad=None, converter=None):
+        self.session_id = session_id
+        self.recognizer = recognizer
+        self.converter = converter
+        self.audio_filter = audio_filter
+        self.vad = vad
+        self.sample_rate = sample_rate
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.lock = threading.Lock()
+        self.last_partial = ''
+        self.segments = []
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+
+    @property
+    def transcript(self):
+        return ' '.join(self.segments)
+
+    def feed(self, pcm_data):
+        """Feed audio and return the current partial or final result
+
+        Audio is converted to the recognizer's format (if a converter is
+        set) and passes through the session's own noise filter, so
+        resampling and filter state are continuous across chunks. With a VAD, only voiced
+        frames reach the recognizer and the end of speech finalizes the
+        utterance.
+        """
+        with self.lock:
+            self.last_used = time.time()
+            self.bytes_received += len(pcm_data)
+            if self.converter is not None:
+                pcm_data = self.converter.convert(pcm_data)
+            if self.audio_filter is not None:
+                pcm_data = self.audio_filter.process(pcm_data)
+
+            speech_ended = False
+            if self.vad is not None:
+                vad_result = self.vad.process(pcm_data)
+                pcm_data = vad_result.audio
+                speech_ended = vad_result.speech_ended and not vad_result.in_speech
+
+            self.bytes_decoded += len(pcm_data)
+            if pcm_data and self.recognizer.AcceptWaveform(pcm_data):
+                return self._final(json.loads(self.recognizer.Result()), speech_ended)
+            if speech_ended:
+                return self._final(json.loads(self.recognizer.FinalResult()), True)
+            if not pcm_data:
+                # Silence: nothing new was decoded
+                return self._partial(self.last_partial)
+            return self._partial(json.loads(self.recognizer.PartialResult()).get('partial', ''))
+
+    def finish(self):
+        """Flush the recognizer and return the last segment"""
+        with self.lock:
+            self.last_used = time.time()
+            return self._final(json.loads(self.recognizer.FinalResult()), True)
+
+    def _partial(self, partial):
+        changed = partial != self.last_partial
+        self.last_partial = partial
+        return {
+            'text': partial,
+            'partial': True,
+            'changed': changed,
+            'speech_ended': False,
+            'is_complete': False,
+            'in_speech': self.in_speech,
+        }
+
+    def _final(self, result, utterance_ended):
+        text = result.get('text', '')
+        if text:
+            self.segments.append(text)
+        self.last_partial = ''
+        return {
+            'text': text,
+            'partial': False,
+            'changed': bool(text),
+            'speech_ended': True,
+            # The recognizer may also finalize mid-speech at its own endpoints
+            'is_complete': bool(text) and utterance_ended,
+            'in_speech': self.in_speech,
+            'confidence': result.get('confidence', 0.0),
+        }
+
+    @property
+    def in_speech(self):
+        return self.vad.in_speech if self.vad is not None else None
+
+
+class StreamSessionStore:
+    """Thread-safe registry of live sessions with idle reaping"""
+
+    def __init__(self, recognizer_factory, filter_factory=None, vad_factory=None, converter_factory=None,
+                 idle_timeout=30.0, max_sessions=32):
+        self.recognizer_factory = recognizer_factory
+        self.converter_factory = converter_factory
+        self.filter_factory = filter_factory
+        self.vad_factory = vad_factory
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+        self._stopped = threading.Event()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create(self, sample_rate=16000, session_id=None, input_format=None):
+        """Start a session, or return None when the store is full
+
+        ``input_format`` describes the uploaded audio and is passed to the
+        converter factory; the recognizer runs at ``sample_rate``.
+        """
+        self.reap_idle()
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                return None
+            audio_filter = self.filter_factory(sample_rate) if self.filter_factory else None
+            vad = self.vad_factory(sample_rate) if self.vad_factory else None
+            converter = self.converter_factory(input_format) if self.converter_factory else None
+            session = StreamSession(session_id or uuid.uuid4().hex, self.recognizer_factory(sample_rate), sample_rate,
+                                    audio_filter, vad, converter)
+            self._sessions[session.session_id] = session
+            return session
+
+    def get(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def close(self, session_id):
+        """Remove a session and return it, or None if it is unknown"""
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def reap_idle(self):
+        """Drop sessions idle for longer than idle_timeout; returns how many"""
+        cutoff = time.time() - self.idle_timeout
+        with self._lock:
+            expired = [sid for sid, session in self._sessions.items() if session.last_used < cutoff]
+            for session_id in expired:
+                del self._sessions[session_id]
+        return len(expired)
+
+    def start_reaper(self, interval=5.0):
+        """Reap idle sessions from a daemon thread every interval seconds"""
+        # A reaper inherited through fork is not running in this process
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+
+        def run():
+            while not self._stopped.wait(interval):
+                reaped = self.reap_idle()
+                if reaped:
+                    print(f"Reaped {reaped} idle stream session(s)")
+
+        self._reaper = threading.Thread(target=run, name='stream-session-reaper', daemon=True)
+        self._reaper.start()
+
+    def close_all(self):
+        """Stop the reaper and drop every session"""
+        self._stopped.set()
+        with self._lock:
+            self._sessions.clear()
@@ -1,5 +1,6 @@
 import requests
 import json
+import time
 
 def test_vosk_server():
     base_url = "http://localhost:5000"
@@ -10,11 +11,18 @@ def test_vosk_server():
         # Test health endpoint
         print("1. Testing health endpoint...")
         response = requests.get(f"{base_url}/health")
+        # 503 while the model is still loading in the background
+        for _ in range(60):
+            if response.status_code != 503 or response.json().get('status') != 'loading':
+                break
+            print("   Model loading, waiting...")
+            time.sleep(1)
+            response = requests.get(f"{base_url}/health")
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Health check passed!")
             print(f"   Status: {data.get('status')}")
-            print(f"   Model loaded: {data.get('model_loaded')}")
+            print(f"   Model loaded: {data.get('model_loaded')} ({data.get('load_seconds')}s)")
         else:
             print(f"❌ Health check failed: {response.status_code}")
             return False
@@ -37,6 +45,25 @@ def test_vosk_server():
             print(f"❌ Transcribe test failed: {response.status_code}")
             print(f"   Response: {response.text}")
             
+        # Test streaming session endpoints
+        print("\n3. Testing streaming session...")
+        response = requests.post(f"{base_url}/stream")
+        if response.status_code == 200:
+            session_id = response.json()['session_id']
+            for _ in range(3):
+                response = requests.post(
+                    f"{base_url}/stream/{session_id}",
+                    data=dummy_audio,
+                    headers={'Content-Type': 'application/octet-stream'}
+                )
+                print(f"   Chunk: {response.json().get('text', '')!r} partial={response.json().get('partial')}")
+            response = requests.delete(f"{base_url}/stream/{session_id}")
+            print(f"✅ Streaming test passed!")
+            print(f"   Transcript: {response.json().get('transcript', '')!r}")
+        else:
+            print(f"❌ Streaming test failed: {response.status_code}")
+            print(f"   Response: {response.text}")
+            
     except Exception as e:
         print(f"❌ Error: {e}")
         return False
@@ -0,0 +1,58 @@
+"""
+Tests for the streaming noise filter
+"""
+
+import numpy as np
+import scipy.signal as signal
+
+from audio_filters import StreamingNoiseFilter, design_sos
+
+
+def make_pcm(seconds=1.0, sample_rate=16000, seed=0):
+    """Speech-band tone plus hum and noise, as PCM16 bytes"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    samples = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.2 * np.sin(2 * np.pi * 50 * t) + 0.02 * rng.standard_normal(t.size)
+    return (samples * 32767).astype('<i2').tobytes()
+
+
+def test_chunked_filter_matches_one_pass():
+    """Test that filter state carries across chunks of any size"""
+    pcm = make_pcm()
+    whole = StreamingNoiseFilter(16000).process(pcm)
+    for chunk_bytes in (2, 318, 640, 3202):
+        noise_filter = StreamingNoiseFilter(16000)
+        chunked = b''.join(noise_filter.process(pcm[i:i + chunk_bytes]) for i in range(0, len(pcm), chunk_bytes))
+        assert chunked == whole
+
+
+def test_filter_matches_sosfilt():
+    """Test that chunked output equals one sosfilt call over the whole signal"""
+    pcm = make_pcm()
+    samples = np.frombuffer(pcm, dtype='<i2').astype(np.float32) / 32768
+    expected = signal.sosfilt(design_sos(16000).astype(np.float64), samples)
+    expected[np.abs(expected) < 0.01] = 0
+
+    noise_filter = StreamingNoiseFilter(16000)
+    chunks = [noise_filter.process_samples(np.frombuffer(pcm[i:i + 640], dtype='<i2')).copy()
+              for i in range(0, len(pcm), 640)]
+    np.testing.assert_allclose(np.concatenate(chunks), expected, atol=1e-4)
+
+
+def test_filter_attenuates_hum_and_keeps_speech_band():
+    """Test that 50 Hz hum is cut by the 80 Hz high-pass while 440 Hz passes"""
+    t = np.arange(16000) / 16000
+
+    def peak(frequency):
+        tone = (0.5 * np.sin(2 * np.pi * frequency * t) * 32767).astype('<i2').tobytes()
+        filtered = np.frombuffer(StreamingNoiseFilter(16000).process(tone), dtype='<i2')
+        return np.abs(filtered[8000:]).max() / (0.5 * 32767)
+
+    assert peak(50) < 0.2
+    assert peak(440) > 0.95
+
+
+def test_lowpass_skipped_at_16k():
+    """Test that only the high-pass sections are used when 8 kHz is Nyquist"""
+    assert len(design_sos(16000)) == 2
+    assert len(design_sos(48000)) == 4
@@ -0,0 +1,159 @@
+"""
+Tests for WAV parsing and streaming conversion to 16 kHz PCM16
+"""
+
+import io
+import struct
+
+import numpy as np
+import pytest
+import scipy.signal as signal
+
+from audio_io import (
+    WAVE_FORMAT_EXTENSIBLE, WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_PCM, AudioFormat, AudioFormatError, PcmConverter,
+    StreamingResampler, iter_pcm16_blocks, open_audio_stream, parse_wav, raw_audio_format, to_target_pcm16,
+)
+
+
+def chunk(chunk_id, body):
+    padding = b'\x00' if len(body) % 2 else b''
+    return chunk_id + struct.pack('<I', len(body)) + body + padding
+
+
+def fmt_body(sample_rate=16000, channels=1, bits=16, format_tag=WAVE_FORMAT_PCM):
+    block_align = channels * bits // 8
+    return struct.pack('<HHIIHH', format_tag, channels, sample_rate, sample_rate * block_align, block_align, bits)
+
+
+def wav(data, chunks=None, **fmt):
+    """A RIFF/WAVE file; ``chunks`` replaces the default fmt + data chunk list"""
+    body = b''.join(chunks if chunks is not None else [chunk(b'fmt ', fmt_body(**fmt)), chunk(b'data', data)])
+    return b'RIFF' + struct.pack('<I', 4 + len(body)) + b'WAVE' + body
+
+
+def tone(sample_rate, seconds=0.5, frequency=440.0):
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    return (0.5 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def test_parse_wav_pcm16():
+    """Test the format and data of a plain PCM16 file"""
+    data = b'\x01\x00\x02\x00'
+    audio_format, body = parse_wav(wav(data))
+    assert audio_format == AudioFormat(16000, 1, 2)
+    assert audio_format.is_target
+    assert bytes(body) == data
+
+
+def test_parse_wav_skips_unknown_and_odd_chunks():
+    """Test that chunks come in any order and odd-sized chunks are padded"""
+    data = b'\x10\x00\x20\x00\x30\x00'
+    audio = wav(None, chunks=[chunk(b'LIST', b'abc'), chunk(b'fmt ', fmt_body(44100, 2)), chunk(b'data', data)])
+    audio_format, body = parse_wav(audio)
+    assert audio_format == AudioFormat(44100, 2, 2)
+    # A trailing partial frame is dropped
+    assert bytes(body) == data[:4]
+
+
+def test_parse_wav_extensible_float():
+    """Test that WAVE_FORMAT_EXTENSIBLE takes its format from the SubFormat GUID"""
+    extension = struct.pack('<HHI', 22, 32, 0) + struct.pack('<H', WAVE_FORMAT_IEEE_FLOAT) + b'\x00' * 14
+    body = fmt_body(48000, 2, 32, WAVE_FORMAT_EXTENSIBLE) + extension
+    audio_format, _ = parse_wav(wav(None, chunks=[chunk(b'fmt ', body), chunk(b'data', b'\x00' * 8)]))
+    assert audio_format == AudioFormat(48000, 2, 4, is_float=True)
+
+
+@pytest.mark.parametrize('audio', [
+    b'not a wav file',
+    b'RIFF\x00\x00\x00\x00AVI ',
+    wav(None, chunks=[chunk(b'data', b'\x00\x00')]),
+    wav(b'', format_tag=0x0055),
+    wav(b'', bits=12),
+])
+def test_parse_wav_rejects_bad_files(audio):
+    """Test that malformed or unsupported WAV files raise AudioFormatError"""
+    with pytest.raises(AudioFormatError):
+        parse_wav(audio)
+
+
+def test_stream_reads_header_then_bounded_blocks():
+    """Test that a WAV stream is read in blocks after its header, stopping at the data chunk's end"""
+    data = bytes(range(256)) * 10
+    audio = wav(data, sample_rate=8000) + chunk(b'LIST', b'trailing')
+    audio_format, blocks = open_audio_stream(io.BytesIO(audio), block_bytes=1000)
+    sizes, read = [], b''
+    for block in blocks:
+        sizes.append(len(block))
+        read += bytes(block)
+    assert audio_format.sample_rate == 8000
+    assert read == data
+    assert max(sizes) <= 1000
+
+
+@pytest.mark.parametrize('sample_rate, channels', [(0, 1), (-16000, 1), (100, 1), (10 ** 7, 1), (16000, 0), (16000, 99)])
+def test_raw_audio_format_rejects_unusable_layouts(sample_rate, channels):
+    """Test that client-given rates and channel counts are checked before conversion"""
+    with pytest.raises(AudioFormatError):
+        raw_audio_format(sample_rate, channels)
+
+
+def test_raw_audio_format_accepts_common_layouts():
+    """Test that ordinary rates and channel counts give a PCM16 format"""
+    assert raw_audio_format() == AudioFormat()
+    assert raw_audio_format(44100, 2) == AudioFormat(44100, 2)
+    PcmConverter(raw_audio_format(8000, 1))
+
+
+def test_headerless_stream_uses_raw_format():
+    """Test that input without a RIFF header is read as the given raw format"""
+    raw = AudioFormat(8000, 2)
+    audio_format, blocks = open_audio_stream(io.BytesIO(b'\x00' * 100), raw, block_bytes=64)
+    assert audio_format is raw
+    assert b''.join(bytes(block) for block in blocks) == b'\x00' * 100
+
+
+@pytest.mark.parametrize('from_rate', [8000, 22050, 44100, 48000])
+def test_streaming_resampler_matches_resample_poly(from_rate):
+    """Test that blocks resample to exactly one resample_poly over the whole signal"""
+    samples = tone(from_rate)
+    up, down = StreamingResampler(from_rate).up, StreamingResampler(from_rate).down
+    expected = signal.resample_poly(samples.astype(np.float64), up, down)
+
+    for block in (1, 441, 1000, 4096):
+        resampler = StreamingResampler(from_rate)
+        parts = [resampler.process(samples[i:i + block]) for i in range(0, len(samples), block)]
+        parts.append(resampler.flush())
+        out = np.concatenate(parts)
+        assert len(out) == len(expected)
+        np.testing.assert_allclose(out, expected, atol=1e-5)
+
+
+def test_resampler_passthrough_at_target_rate():
+    """Test that 16 kHz input is returned unchanged"""
+    samples = tone(16000)
+    resampler = StreamingResampler(16000)
+    assert resampler.process(samples) is samples
+    assert len(resampler.flush()) == 0
+
+
+def test_converter_handles_frames_split_across_chunks():
+    """Test that chunk boundaries inside a stereo 24-bit frame do not change the output"""
+    audio_format = AudioFormat(48000, 2, 3)
+    stereo = np.repeat(tone(48000), 2)
+    packed = np.round(stereo * 8388607).astype('<i4').view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    whole = to_target_pcm16(packed, audio_format)
+
+    converter = PcmConverter(audio_format)
+    chunked = b''.join(converter.convert(packed[i:i + 1001]) for i in range(0, len(packed), 1001))
+    chunked += converter.flush()
+    assert chunked == whole
+    assert len(whole) == 2 * len(tone(16000))
+
+
+def test_iter_pcm16_blocks_matches_one_shot_conversion():
+    """Test that block-wise conversion of an upload equals converting it in memory"""
+    pcm = (tone(44100) * 32767).astype('<i2').tobytes()
+    audio = wav(pcm, sample_rate=44100)
+    audio_format, blocks = iter_pcm16_blocks(io.BytesIO(audio), block_bytes=3000)
+    assert audio_format.sample_rate == 44100
+    assert b''.join(blocks) == to_target_pcm16(audio)
@@ -0,0 +1,107 @@
+"""
+Tests for batch transcription jobs
+"""
+
+import threading
+import time
+
+from batch_jobs import BatchJobManager
+
+
+def wait_done(job, timeout=5.0):
+    deadline = time.time() + timeout
+    while not job.done and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.done
+
+
+def test_results_carry_their_file_and_order():
+    """Test that results stream in completion order, each tagged with its input index and name"""
+    delays = {'a.wav': 0.05, 'b.wav': 0.0, 'c.wav': 0.02}
+
+    def run_file(worker, path):
+        time.sleep(delays[path])
+        return {'text': path.upper(), 'duration': 1.0}
+
+    manager = BatchJobManager(run_file, workers=3)
+    job = manager.submit(list(delays), names=['first', 'second', 'third'])
+    results = list(job.iter_results(poll_interval=0.01))
+
+    assert [result['index'] for result in results] == [1, 2, 0]
+    assert {result['index']: result['file'] for result in results} == {0: 'first', 1: 'second', 2: 'third'}
+    assert all(result['text'] == list(delays)[result['index']].upper() for result in results)
+    progress = job.progress()
+    assert progress['status'] == 'completed'
+    assert progress['completed'] == 3
+    assert progress['audio_seconds'] == 3.0
+
+
+def test_single_worker_keeps_input_order():
+    """Test that one worker decodes files in the order they were given"""
+    manager = BatchJobManager(lambda worker, path: {'text': path, 'duration': 0.5}, workers=1)
+    job = manager.submit([f'{i}.wav' for i in range(5)])
+    wait_done(job)
+    assert [result['index'] for result in job.results] == list(range(5))
+
+
+def test_failures_are_reported_per_file():
+    """Test that a failing file is a result with an error, not a failed job"""
+    def run_file(worker, path):
+        if path == 'bad.wav':
+            raise ValueError('corrupt')
+        return {'text': 'ok', 'duration': 1.0}
+
+    job = BatchJobManager(run_file, workers=2).submit(['good.wav', 'bad.wav'])
+    wait_done(job)
+    assert job.progress()['failed'] == 1
+    assert [result['error'] for result in job.results if 'error' in result] == ['corrupt']
+
+
+def test_cancel_stops_dispatch_and_drops_running_results():
+    """Test that cancelling skips remaining files and drops results still decoding"""
+    started = threading.Event()
+    release = threading.Event()
+    decoded = []
+
+    def run_file(worker, path):
+        decoded.append(path)
+        started.set()
+        release.wait(5)
+        return {'text': path, 'duration': 1.0}
+
+    manager = BatchJobManager(run_file, workers=1)
+    job = manager.submit([f'{i}.wav' for i in range(4)])
+    assert started.wait(5)
+
+    assert manager.cancel(job.job_id) is job
+    assert job.progress()['status'] == 'cancelling'
+    release.set()
+    wait_done(job)
+
+    assert job.status == 'cancelled'
+    assert decoded == ['0.wav']
+    assert job.results == []
+    assert manager.cancel('unknown') is None
+
+
+def test_old_finished_jobs_are_forgotten():
+    """Test that beyond max_jobs the oldest finished jobs are dropped, never running ones"""
+    release = threading.Event()
+
+    def run_file(worker, path):
+        if path == 'slow.wav':
+            release.wait(5)
+        return {'duration': 0.0}
+
+    manager = BatchJobManager(run_file, workers=1, max_jobs=3)
+    running = manager.submit(['slow.wav'])
+    finished = []
+    for _ in range(4):
+        job = manager.submit(['quick.wav'])
+        wait_done(job)
+        finished.append(job)
+
+    assert manager.get(running.job_id) is running
+    assert [manager.get(job.job_id) for job in finished] == [None, None, finished[2], finished[3]]
+    release.set()
+    wait_done(running)
@@ -0,0 +1,59 @@
+"""
+Tests for the command-mode phrase grammar
+"""
+
+import json
+
+from command_grammar import COMMAND_VERBS, UNKNOWN, CommandGrammar, result_confidence, spoken_form
+
+
+def test_spoken_form():
+    """Test that app names are turned into the words a user says"""
+    assert spoken_form('Notepad++') == 'notepad plus plus'
+    assert spoken_form('VS_Code') == 'vs code'
+    assert spoken_form('  Google   Chrome ') == 'google chrome'
+    assert spoken_form('++') == 'plus plus'
+
+
+def test_grammar_compiles_phrases():
+    """Test that every app gets a bare phrase and one per verb, plus [unk]"""
+    grammar = CommandGrammar({'chrome': 'Chrome', 'notepad plus plus': 'Notepad++'})
+    phrases = json.loads(grammar.json)
+
+    assert phrases == grammar.phrases
+    assert phrases[-1] == UNKNOWN
+    for spoken in ('chrome', 'notepad plus plus'):
+        assert spoken in phrases
+        assert all(f"{verb} {spoken}" in phrases for verb in COMMAND_VERBS)
+    assert 'list apps' in phrases
+    assert len(phrases) == 2 + 2 * (1 + len(COMMAND_VERBS)) + 1
+
+
+def test_parse_commands():
+    """Test that recognized phrases map back to the app's real name"""
+    grammar = CommandGrammar({'notepad plus plus': 'Notepad++'})
+    assert grammar.parse('open notepad plus plus') == {'action': 'open_app', 'app_name': 'Notepad++'}
+    assert grammar.parse('notepad  plus plus') == {'action': 'open_app', 'app_name': 'Notepad++'}
+    assert grammar.parse('show apps') == {'action': 'list_apps'}
+
+
+def test_parse_out_of_vocabulary():
+    """Test that [unk] and unknown apps are not commands"""
+    grammar = CommandGrammar({'chrome': 'Chrome'})
+    assert grammar.parse('open [unk]') is None
+    assert grammar.parse(UNKNOWN) is None
+    assert grammar.parse('open firefox') is None
+    assert grammar.parse('open') is None
+    assert grammar.parse('') is None
+
+
+def test_empty_grammar_is_falsy():
+    """Test that a grammar without apps disables command mode"""
+    assert not CommandGrammar({})
+    assert CommandGrammar({}).phrases[-1] == UNKNOWN
+
+
+def test_result_confidence():
+    """Test the mean word confidence of a Vosk result"""
+    assert result_confidence({'result': [{'conf': 1.0}, {'conf': 0.5}]}) == 0.75
+    assert result_confidence({'text': ''}) == 0.0
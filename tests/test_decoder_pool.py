@@ -0,0 +1,94 @@
+"""
+Tests for the STT decoder process pool and session routing
+"""
+
+import os
+import time
+
+import pytest
+
+from decoder_pool import DecoderPool, SessionRouter
+
+
+class EchoHandler:
+    """Stands in for a decoder: reports what setup loaded and where it runs"""
+
+    def __init__(self, state):
+        self.state = state
+
+    def describe(self):
+        return self.state, os.getpid()
+
+    def fail(self):
+        raise ValueError("bad audio")
+
+
+def load_state():
+    return {"loaded_by": os.getpid()}
+
+
+def failing_setup():
+    raise FileNotFoundError("no model here")
+
+
+def test_pool_workers_share_one_setup():
+    """Test that setup runs once, in a loader process, and every worker inherits it"""
+    pool = DecoderPool(3, EchoHandler, setup=load_state, timeout=10)
+    try:
+        pool.wait_ready(timeout=10)
+        described = [pool.call(index, "describe") for index in range(len(pool))]
+        states = [state for state, _ in described]
+        pids = [pid for _, pid in described]
+        assert states == [states[0]] * 3
+        assert states[0]["loaded_by"] == pool.loader.pid != os.getpid()
+        assert len(set(pids)) == 3
+        assert sorted(worker.pid for worker in pool.workers) == sorted(pids)
+
+        with pytest.raises(RuntimeError, match="ValueError: bad audio"):
+            pool.call(1, "fail")
+    finally:
+        pool.close()
+
+
+def test_pool_reports_setup_failure():
+    """Test that a failed setup fails wait_ready with its error instead of hanging"""
+    pool = DecoderPool(2, EchoHandler, setup=failing_setup, timeout=10)
+    try:
+        with pytest.raises(RuntimeError, match="no model here"):
+            pool.wait_ready(timeout=10)
+    finally:
+        pool.close()
+
+
+def test_router_assigns_least_loaded_worker():
+    """Test that new sessions go to the worker holding the fewest sessions"""
+    router = SessionRouter(num_workers=3, max_sessions=10)
+    assert [router.assign(f"s{i}") for i in range(3)] == [0, 1, 2]
+
+    router.release("s1")
+    assert router.assign("s3") == 1
+    assert router.counts() == [1, 1, 1]
+
+
+def test_router_caps_sessions_across_pool():
+    """Test that the session cap covers the whole pool, not each worker"""
+    router = SessionRouter(num_workers=2, max_sessions=3)
+    assert [router.assign(f"s{i}") for i in range(3)] == [0, 1, 0]
+    assert router.assign("s3") is None
+
+    assert router.release("s0") == 0
+    assert router.assign("s3") == 0
+    assert router.lookup("s0") is None
+    assert router.lookup("s3") == 0
+
+
+def test_router_forgets_idle_sessions():
+    """Test that sessions idle past the timeout no longer count against the cap"""
+    router = SessionRouter(num_workers=2, max_sessions=1, idle_timeout=0.05)
+    assert router.assign("old") == 0
+    assert router.assign("new") is None
+
+    time.sleep(0.1)
+    assert router.assign("new") == 0
+    assert router.lookup("old") is None
+    assert len(router) == 1
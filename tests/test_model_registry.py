@@ -0,0 +1,102 @@
+"""
+Tests for background model loading and LRU unloading
+"""
+
+import threading
+import time
+
+import pytest
+
+from model_registry import ModelNotReady, ModelRegistry
+
+MB = 2**20
+
+
+def wait_for(predicate, timeout=5.0):
+    """Unloads run on the loader thread just after the load is reported"""
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+    assert predicate()
+
+
+@pytest.fixture
+def model_dirs(tmp_path):
+    """Four fake model directories of 1 MB each"""
+    paths = {}
+    for name in 'abcd':
+        directory = tmp_path / name
+        directory.mkdir()
+        (directory / 'final.mdl').write_bytes(b'\x00' * MB)
+        paths[name] = str(directory)
+    return paths
+
+
+def test_lru_models_unloaded_over_budget(model_dirs):
+    """Test that loading past the budget unloads the least recently used unpinned model"""
+    unloaded = []
+    registry = ModelRegistry(model_dirs, lambda name, path: f'engine-{name}', unloader=unloaded.append,
+                             memory_budget=int(3.5 * MB), pinned=('a',))
+    for name in 'abc':
+        assert registry.get(name, wait=5) == f'engine-{name}'
+        time.sleep(0.01)
+    registry.get('b')
+    time.sleep(0.01)
+
+    assert registry.get('d', wait=5) == 'engine-d'
+    wait_for(lambda: unloaded)
+    assert unloaded == ['engine-c']
+    assert registry.peek('c') is None
+    assert registry.status()['c']['state'] == 'unloaded'
+    assert [registry.peek(name) for name in 'abd'] == ['engine-a', 'engine-b', 'engine-d']
+
+
+def test_pinned_model_never_unloaded(model_dirs):
+    """Test that a pinned model stays loaded even when it alone exceeds the budget"""
+    unloaded = []
+    registry = ModelRegistry(model_dirs, lambda name, path: name, unloader=unloaded.append,
+                             memory_budget=MB // 2, pinned=('a',))
+    registry.get('a', wait=5)
+    registry.get('b', wait=5)
+    assert registry.peek('a') == 'a'
+    # The newest load is kept; nothing else is unpinned
+    assert registry.peek('b') == 'b'
+    registry.get('c', wait=5)
+    wait_for(lambda: unloaded)
+    assert unloaded == ['b']
+
+
+def test_unloaded_model_reloads_on_demand(model_dirs):
+    """Test that asking for an unloaded model loads it again"""
+    loads = []
+
+    def loader(name, path):
+        loads.append(name)
+        return name
+
+    registry = ModelRegistry(model_dirs, loader, memory_budget=int(1.5 * MB))
+    registry.get('a', wait=5)
+    registry.get('b', wait=5)
+    assert registry.peek('a') is None
+    assert registry.get('a', wait=5) == 'a'
+    assert loads == ['a', 'b', 'a']
+
+
+def test_get_raises_while_loading(model_dirs):
+    """Test that a request not willing to wait gets ModelNotReady while the model loads"""
+    release = threading.Event()
+    registry = ModelRegistry(model_dirs, lambda name, path: release.wait(5) and name)
+    with pytest.raises(ModelNotReady) as excinfo:
+        registry.get('a', wait=0.01)
+    assert excinfo.value.state == 'loading'
+    release.set()
+    assert registry.get('a', wait=5) == 'a'
+
+
+def test_failed_load_reports_error(model_dirs):
+    """Test that a missing model directory fails with its error"""
+    registry = ModelRegistry({'missing': model_dirs['a'] + '-nope'}, lambda name, path: name)
+    with pytest.raises(ModelNotReady) as excinfo:
+        registry.get('missing', wait=5)
+    assert excinfo.value.state == 'failed'
+    assert 'Model not found' in str(excinfo.value)
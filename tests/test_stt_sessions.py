@@ -0,0 +1,77 @@
+"""
+Tests for streaming STT sessions
+"""
+
+import json
+import time
+
+from stt_sessions import StreamSessionStore
+
+
+class FakeRecognizer:
+    """Recognizer stand-in that finalizes every chunk as one word"""
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.chunks = 0
+
+    def AcceptWaveform(self, data):
+        self.chunks += 1
+        return True
+
+    def Result(self):
+        return json.dumps({'text': f'word{self.chunks}'})
+
+    def PartialResult(self):
+        return json.dumps({'partial': ''})
+
+    def FinalResult(self):
+        return json.dumps({'text': ''})
+
+
+def test_session_keeps_transcript_across_chunks():
+    """Test that one session's recognizer sees every chunk in order"""
+    store = StreamSessionStore(FakeRecognizer)
+    session = store.create(session_id='s1')
+    assert session.feed(b'\x00\x00' * 160)['text'] == 'word1'
+    assert session.feed(b'\x00\x00' * 160)['text'] == 'word2'
+    assert store.close('s1').transcript == 'word1 word2'
+    assert store.get('s1') is None
+
+
+def test_store_rejects_sessions_beyond_cap():
+    """Test that create returns None once max_sessions are live"""
+    store = StreamSessionStore(FakeRecognizer, max_sessions=2)
+    assert store.create(session_id='a') is not None
+    assert store.create(session_id='b') is not None
+    assert store.create(session_id='c') is None
+
+    store.close('a')
+    assert store.create(session_id='c') is not None
+
+
+def test_idle_sessions_expire():
+    """Test that sessions unused for idle_timeout are reaped and free their slot"""
+    store = StreamSessionStore(FakeRecognizer, idle_timeout=0.05, max_sessions=1)
+    store.create(session_id='idle')
+    time.sleep(0.1)
+
+    assert store.reap_idle() == 1
+    assert store.get('idle') is None
+    assert len(store) == 0
+
+    # Expired sessions are also reaped when a new one is created
+    store.create(session_id='stale').last_used -= 1
+    assert store.create(session_id='fresh') is not None
+    assert store.get('stale') is None
+
+
+def test_used_sessions_do_not_expire():
+    """Test that feeding a session keeps it alive"""
+    store = StreamSessionStore(FakeRecognizer, idle_timeout=0.1)
+    session = store.create(session_id='busy')
+    for _ in range(3):
+        time.sleep(0.05)
+        session.feed(b'\x00\x00' * 160)
+    assert store.reap_idle() == 0
+    assert store.get('busy') is session
@@ -0,0 +1,71 @@
+"""
+Tests for the frame-based voice activity detector
+"""
+
+import numpy as np
+
+from vad import VoiceActivityDetector
+
+RATE = 16000
+FRAME_BYTES = 640  # 20 ms of PCM16
+
+
+def utterance(silence_before=0.5, speech=0.5, silence_after=1.0, seed=0):
+    """Quiet noise, a loud tone, quiet noise again, as PCM16 bytes"""
+    rng = np.random.default_rng(seed)
+    total = int((silence_before + speech + silence_after) * RATE)
+    samples = 0.001 * rng.standard_normal(total)
+    start, end = int(silence_before * RATE), int((silence_before + speech) * RATE)
+    samples[start:end] += 0.1 * np.sin(2 * np.pi * 300 * np.arange(end - start) / RATE)
+    return (samples * 32767).astype('<i2').tobytes()
+
+
+def events_by_frame(vad, pcm, chunk_bytes=FRAME_BYTES):
+    """Feed pcm in chunks; returns [(frame index after the chunk, event)] and the voiced bytes"""
+    events, voiced, fed = [], b'', 0
+    for offset in range(0, len(pcm), chunk_bytes):
+        result = vad.process(pcm[offset:offset + chunk_bytes])
+        fed += len(pcm[offset:offset + chunk_bytes])
+        voiced += result.audio
+        events.extend((fed // FRAME_BYTES, event) for event in result.events)
+    return events, voiced
+
+
+def test_speech_start_and_end_timing():
+    """Test onset after 60 ms of speech and end of utterance after 400 ms of silence"""
+    vad = VoiceActivityDetector(RATE)
+    events, voiced = events_by_frame(vad, utterance())
+
+    # Speech spans frames 25-49; the third speech frame starts it, and the
+    # 20th silent frame after it (frame 69) ends it
+    assert events == [(28, 'speech_start'), (70, 'speech_end')]
+    assert not vad.in_speech
+    # Pre-roll (10 frames before the onset) through the end of the hangover
+    assert len(voiced) == (70 - 18) * FRAME_BYTES
+
+
+def test_timing_independent_of_chunk_size():
+    """Test that chunks splitting frames give the same voiced audio and events"""
+    pcm = utterance()
+    _, reference = events_by_frame(VoiceActivityDetector(RATE), pcm)
+    for chunk_bytes in (100, 1000, 4410):
+        events, voiced = events_by_frame(VoiceActivityDetector(RATE), pcm, chunk_bytes)
+        assert [event for _, event in events] == ['speech_start', 'speech_end']
+        assert voiced == reference
+
+
+def test_silence_is_never_voiced():
+    """Test that noise alone never starts speech and yields no audio"""
+    vad = VoiceActivityDetector(RATE)
+    events, voiced = events_by_frame(vad, utterance(speech=0.0))
+    assert events == []
+    assert voiced == b''
+
+
+def test_utterance_still_open_at_end_of_chunk():
+    """Test that speech running to the end of a chunk leaves the detector in speech"""
+    vad = VoiceActivityDetector(RATE, noise_floor=-60.0)
+    result = vad.process(utterance(silence_before=0.1, speech=0.3, silence_after=0.1))
+    assert result.speech_started
+    assert not result.speech_ended
+    assert result.in_speech
@@ -0,0 +1,119 @@
+"""
+Frame-based voice activity detection for PCM16 streams
+"""
+
+from collections import deque
+
+import numpy as np
+
+
+class VadResult:
+    """Outcome of feeding one chunk to the detector"""
+
+    def __init__(self, audio, events, in_speech, speech_frames, total_frames):
+        self.audio = audio                  # PCM16 bytes of voiced frames only
+        self.events = events                # 'speech_start' / 'speech_end', in order
+        self.in_speech = in_speech          # State after the chunk
+        self.speech_frames = speech_frames  # Frames above the noise floor
+        self.total_frames = total_frames
+
+    @property
+    def speech_started(self):
+        return 'speech_start' in self.events
+
+    @property
+    def speech_ended(self):
+        return 'speech_end' in self.events
+
+
+class VoiceActivityDetector:
+    """Energy VAD with an adaptive noise floor, onset frames and hangover
+
+    Frame energies for a whole chunk are computed in one vectorized pass;
+    only the per-frame state machine runs in Python. A frame counts as
+    speech when it is ``threshold_db`` above the tracked noise floor and
+    above ``min_energy_db``. Speech starts after ``onset_ms`` of speech
+    frames (the frames before it are kept as pre-roll so the first phoneme
+    is not clipped) and ends after ``hangover_ms`` without any. Only frames
+    inside speech are returned for decoding.
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=20, threshold_db=9.0, min_energy_db=-50.0,
+                 onset_ms=60, hangover_ms=400, preroll_ms=200, floor_adapt=0.05, noise_floor=None):
+        self.sample_rate = sample_rate
+        self.frame_len = sample_rate * frame_ms // 1000
+        self.threshold_db = threshold_db
+        self.min_energy_db = min_energy_db
+        self.onset_frames = max(1, onset_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.floor_adapt = floor_adapt
+        # Learned from the first chunk unless given (e.g. for one-shot chunks)
+        self.noise_floor = noise_floor
+        self.in_speech = False
+        self._run = 0         # Consecutive speech frames while idle
+        self._silence = 0     # Consecutive non-speech frames while in speech
+        self._pending = b''   # Tail shorter than one frame
+        self._preroll = deque(maxlen=max(self.onset_frames, preroll_ms // frame_ms))
+
+    def reset(self):
+        """Return to idle, keeping the learned noise floor"""
+        self.in_speech = False
+        self._run = 0
+        self._silence = 0
+        self._pending = b''
+        self._preroll.clear()
+
+    def frame_energies(self, pcm):
+        """Energy in dBFS of each whole frame of an int16 array"""
+        frames = pcm[:pcm.size - pcm.size % self.frame_len].reshape(-1, self.frame_len).astype(np.float32)
+        frames *= np.float32(1 / 32768)
+        power = np.einsum('ij,ij->i', frames, frames) / self.frame_len
+        return 10 * np.log10(power + 1e-10)
+
+    def process(self, audio_data):
+        """Feed PCM16 bytes; returns voiced audio and speech events"""
+        data = self._pending + audio_data
+        frame_bytes = self.frame_len * 2
+        whole = len(data) - len(data) % frame_bytes
+        self._pending = data[whole:]
+        if not whole:
+            return VadResult(b'', [], self.in_speech, 0, 0)
+
+        energies = self.frame_energies(np.frombuffer(data, dtype=np.int16, count=whole // 2))
+        if self.noise_floor is None:
+            self.noise_floor = float(energies.min())
+
+        voiced = []
+        events = []
+        speech_frames = 0
+        view = memoryview(data)
+        for index, energy in enumerate(energies.tolist()):
+            frame = view[index * frame_bytes:(index + 1) * frame_bytes]
+            is_speech = energy > self.noise_floor + self.threshold_db and energy > self.min_energy_db
+            speech_frames += is_speech
+
+            if not is_speech and not self.in_speech:
+                # Falls quickly, rises slowly, and only learns from non-speech
+                if energy < self.noise_floor:
+                    self.noise_floor = energy
+                else:
+                    self.noise_floor += self.floor_adapt * (energy - self.noise_floor)
+
+            if self.in_speech:
+                voiced.append(frame)
+                self._silence = 0 if is_speech else self._silence + 1
+                if self._silence >= self.hangover_frames:
+                    self.in_speech = False
+                    self._silence = 0
+                    events.append('speech_end')
+            else:
+                self._preroll.append(frame)
+                self._run = self._run + 1 if is_speech else 0
+                if self._run >= self.onset_frames:
+                    self.in_speech = True
+                    self._run = 0
+                    voiced.extend(self._preroll)
+                    self._preroll.clear()
+                    events.append('speech_start')
+
+        return VadResult(b''.join(voiced), events, self.in_speech, speech_frames, len(energies))
@@ -1,6 +1,7 @@
 from vosk import Model, KaldiRecognizer
-from flask import Flask, request, jsonify
+from flask import Flask, Response, abort, make_response, request, jsonify
 from flask_cors import CORS
+import fnmatch
 import json
 import os
 import wave
@@ -11,95 +12,591 @@ import base64
 import subprocess
 import tempfile
 import struct
-import scipy.signal as signal
 import re
+import threading
+import time
+import uuid
+from audio_filters import StreamingNoiseFilter
+from batch_jobs import BatchJobManager
+from audio_io import TARGET_RATE, AudioFormatError, PcmConverter, iter_pcm16_blocks, raw_audio_format, to_target_pcm16
+from command_grammar import CommandGrammar, fetch_app_names, result_confidence, spoken_form
+from decoder_pool import DecoderPool, RecognizerPool, SessionRouter, resolve_worker_count
+from model_registry import ModelNotReady, ModelRegistry
+from stt_sessions import StreamSessionStore
+from vad import VoiceActivityDetector
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for Flutter app
 
-# Initialize Vosk model
-model_path = "vosk-model-en"
-if not os.path.exists(model_path):
-    print(f"Error: Vosk model not found at {model_path}")
-    print("Please ensure the model files are in the correct location")
-    exit(1)
+def parse_model_paths(setting):
+    """{name: path} from "name=path,name=path"; a bare path is named after its directory"""
+    paths = {}
+    for item in setting.split(','):
+        name, _, path = item.strip().rpartition('=')
+        if path:
+            paths[name.strip() or os.path.basename(path.rstrip('/'))] = path.strip()
+    return paths
 
-print(f"Loading Vosk model from: {model_path}")
-model = Model(model_path)
-print("Vosk model loaded successfully!")
+# Vosk models by name (e.g. per language); the first one is the default.
+# Models load in the background, the default one at startup.
+STT_MODELS = parse_model_paths(os.getenv('STT_MODELS', 'en=vosk-model-en'))
+STT_DEFAULT_MODEL = next(iter(STT_MODELS))
+# Other models are unloaded least recently used first beyond this (0 = no limit)
+STT_MODEL_MEMORY_MB = int(os.getenv('STT_MODEL_MEMORY_MB', '0'))
+# Seconds a request waits for its model to finish loading before a 503
+STT_MODEL_WAIT = float(os.getenv('STT_MODEL_WAIT', '10'))
 
-def is_complete_sentence(text):
-    """Check if the text appears to be a complete sentence or phrase"""
-    if not text or len(text.strip()) < 3:
-        return False
-    
-    # Remove extra whitespace
-    text = text.strip()
-    
-    # Check for common sentence endings
-    sentence_endings = ['.', '!', '?', '।', '?', '!']
-    if any(text.endswith(ending) for ending in sentence_endings):
-        return True
-    
-    # Check for natural pause indicators (comma, semicolon)
-    pause_indicators = [',', ';', ':', '।']
-    if any(indicator in text for indicator in pause_indicators):
-        # If there's a pause indicator and the text is reasonably long
-        if len(text) > 10:
-            return True
-    
-    # Check if text is long enough to be considered complete
-    if len(text) > 20:
-        return True
-    
-    return False
+# Streaming sessions keep one recognizer per client stream
+STREAM_IDLE_TIMEOUT = float(os.getenv('STREAM_IDLE_TIMEOUT', '30'))
+STREAM_MAX_SESSIONS = int(os.getenv('STREAM_MAX_SESSIONS', '32'))
+
+# Decoder processes sharing the default model ("auto" = one per core,
+# 0 = decode in the server process)
+STT_WORKERS = resolve_worker_count(os.getenv('STT_WORKERS', '0'))
+# Idle recognizers kept per worker for one-shot requests
+STT_RECOGNIZER_POOL_SIZE = int(os.getenv('STT_RECOGNIZER_POOL_SIZE', '4'))
+STT_DEBUG = os.getenv('STT_DEBUG', 'false').lower() == 'true'
+
+# Command mode: grammar built from the backend's app list
+BACKEND_URL = os.getenv('BACKEND_URL', 'http://localhost:8000')
+# Used when the backend is unreachable (comma-separated)
+STT_COMMAND_APPS = [name.strip() for name in os.getenv('STT_COMMAND_APPS', '').split(',') if name.strip()]
+# Below this mean word confidence, command audio is re-decoded as dictation
+STT_COMMAND_MIN_CONFIDENCE = float(os.getenv('STT_COMMAND_MIN_CONFIDENCE', '0.7'))
+# Seconds between refreshes of the app list
+STT_COMMAND_REFRESH = float(os.getenv('STT_COMMAND_REFRESH', '300'))
+
+# Batch jobs can get their own decoder processes so long files never queue
+# behind live streams; they load a second copy of the default model
+# ("auto" = one per core, 0 = decode in the server process, which with
+# STT_WORKERS loads its copy of the model only when the first job starts)
+STT_BATCH_WORKERS = resolve_worker_count(os.getenv('STT_BATCH_WORKERS', '0'))
+# Directory jobs may only read below this path; unset disables them
+STT_BATCH_ROOT = os.getenv('STT_BATCH_ROOT', '')
+STT_BATCH_PATTERN = os.getenv('STT_BATCH_PATTERN', '*.wav')
+
+# One-shot chunks have no history to learn a noise floor from
+RAW_VAD_NOISE_FLOOR = float(os.getenv('RAW_VAD_NOISE_FLOOR', '-60'))
 
 def apply_noise_filtering(audio_data, sample_rate=16000):
-    """Apply noise filtering to audio data"""
+    """Apply noise filtering to a standalone chunk of audio data"""
     try:
-        # Convert bytes to numpy array
-        audio_array = np.frombuffer(audio_data, dtype=np.int16)
-        
-        # Normalize audio to float
-        audio_float = audio_array.astype(np.float32) / 32768.0
-        
-        # Apply high-pass filter to remove low-frequency noise (like AC hum)
-        highpass_cutoff = 80  # Hz
-        nyquist = sample_rate / 2
-        highpass_normalized = highpass_cutoff / nyquist
-        b_highpass, a_highpass = signal.butter(4, highpass_normalized, btype='high')
-        audio_filtered = signal.filtfilt(b_highpass, a_highpass, audio_float)
-        
-        # Apply low-pass filter to remove high-frequency noise
-        lowpass_cutoff = 8000  # Hz
-        lowpass_normalized = lowpass_cutoff / nyquist
-        b_lowpass, a_lowpass = signal.butter(4, lowpass_normalized, btype='low')
-        audio_filtered = signal.filtfilt(b_lowpass, a_lowpass, audio_filtered)
+        return StreamingNoiseFilter(sample_rate).process(audio_data)
+    except Exception as e:
+        return audio_data  # Return original if filtering fails
+
+def final_text(result_json):
+    return json.loads(result_json).get('text', '')
+
+def detect_speech(pcm_data):
+    """Filter a standalone PCM chunk and keep only its voiced frames"""
+    # Apply noise filtering
+    filtered_pcm_data = apply_noise_filtering(pcm_data, sample_rate=16000)
+    
+    # Keep only voiced frames; silence never reaches the recognizer
+    vad = VoiceActivityDetector(16000, noise_floor=RAW_VAD_NOISE_FLOOR)
+    return vad.process(filtered_pcm_data)
+
+NO_SPEECH_RESPONSE = {
+    'success': True,
+    'text': 'No speech detected',
+    'partial': False,
+    'speech_ended': False,
+    'is_complete': False
+}
+
+def transcribe_pcm(rec, pcm_data):
+    """Transcribe a standalone PCM chunk with the given recognizer"""
+    vad_result = detect_speech(pcm_data)
+    if not vad_result.audio:
+        return dict(NO_SPEECH_RESPONSE)
+    return decode_voiced(rec, vad_result)
+
+def decode_voiced(rec, vad_result):
+    """Decode the voiced audio of a chunk as free dictation"""
+    # Speech that stops inside the chunk ends the utterance
+    speech_ended = not vad_result.in_speech
+    
+    if rec.AcceptWaveform(vad_result.audio) or speech_ended:
+        result = json.loads(rec.FinalResult())
+        text = result.get('text', '')
+        confidence = result.get('confidence', 0.0)
         
-        # Apply noise gate (remove very quiet parts)
-        noise_threshold = 0.01
-        audio_filtered[np.abs(audio_filtered) < noise_threshold] = 0
+        # Only return text if confidence is reasonable or text is complete
+        if (confidence > 0.1 or text.strip()) and text:
+            return {
+                'success': True,
+                'text': text,
+                'partial': False,
+                'confidence': confidence,
+                'speech_ended': speech_ended,
+                'is_complete': speech_ended
+            }
+        else:
+            return {
+                'success': True,
+                'text': 'No clear speech detected',
+                'partial': False,
+                'confidence': confidence,
+                'speech_ended': speech_ended,
+                'is_complete': False
+            }
+    else:
+        result = json.loads(rec.PartialResult())
+        text = result.get('partial', '')
         
-        # Convert back to int16
-        audio_filtered_int16 = (audio_filtered * 32767).astype(np.int16)
+        if text.strip():
+            return {
+                'success': True,
+                'text': text,
+                'partial': True,
+                'speech_ended': False,
+                'is_complete': False
+            }
+        else:
+            return {
+                'success': True,
+                'text': 'Listening...',
+                'partial': True,
+                'speech_ended': False,
+                'is_complete': False
+            }
+
+def load_command_grammar():
+    """Command grammar from the backend's app list, or STT_COMMAND_APPS"""
+    app_names = fetch_app_names(BACKEND_URL)
+    if app_names is None:
+        app_names = {spoken_form(name): name for name in STT_COMMAND_APPS}
+    return CommandGrammar(app_names)
+
+def make_command_recognizer(model, sample_rate, grammar):
+    """Recognizer restricted to the command phrases, with word confidences"""
+    rec = KaldiRecognizer(model, sample_rate, grammar.json)
+    rec.SetWords(True)
+    return rec
+
+def decode_command(rec, vad_result, grammar):
+    """Decode voiced audio against the command grammar"""
+    rec.AcceptWaveform(vad_result.audio)
+    result = json.loads(rec.FinalResult())
+    text = result.get('text', '')
+    speech_ended = not vad_result.in_speech
+    return {
+        'success': True,
+        'text': text,
+        'partial': False,
+        'confidence': result_confidence(result),
+        'speech_ended': speech_ended,
+        'is_complete': speech_ended,
+        'mode': 'command',
+        'command': grammar.parse(text)
+    }
+
+class LocalDecoder:
+    """Decodes in the current process: stream sessions plus pooled recognizers"""
+    
+    def __init__(self, model, max_sessions, command_grammar=None):
+        self.model = model
+        self.sessions = StreamSessionStore(
+            lambda sample_rate: KaldiRecognizer(self.model, sample_rate),
+            filter_factory=StreamingNoiseFilter,
+            vad_factory=VoiceActivityDetector,
+            converter_factory=PcmConverter,
+            idle_timeout=STREAM_IDLE_TIMEOUT,
+            max_sessions=max_sessions,
+        )
+        self.sessions.start_reaper()
+        self.recognizers = RecognizerPool(
+            lambda sample_rate: KaldiRecognizer(self.model, sample_rate),
+            size=STT_RECOGNIZER_POOL_SIZE,
+        )
+        # Whole-file transcriptions in progress: job id -> (recognizer, segments, bytes)
+        self.transcriptions = {}
+        self._stopped = threading.Event()
+        # Grammar recognizers are costly to build; keep them until the app list changes
+        self.command_grammar = command_grammar
+        if command_grammar is not None:
+            self.command_recognizers = self._command_pool(command_grammar)
+            threading.Thread(target=self._refresh_commands, name='command-grammar-refresh', daemon=True).start()
+    
+    def _command_pool(self, grammar):
+        return RecognizerPool(
+            lambda sample_rate: make_command_recognizer(self.model, sample_rate, grammar),
+            size=STT_RECOGNIZER_POOL_SIZE,
+        )
+    
+    def _refresh_commands(self):
+        while not self._stopped.wait(STT_COMMAND_REFRESH):
+            grammar = load_command_grammar()
+            if grammar and grammar.phrases != self.command_grammar.phrases:
+                self.command_recognizers = self._command_pool(grammar)
+                self.command_grammar = grammar
+    
+    def transcribe(self, blocks):
+        """Transcribe a whole upload given as PCM16 blocks"""
+        job_id = uuid.uuid4().hex
+        self.begin_transcription(job_id)
+        try:
+            for block in blocks:
+                self.feed_transcription(job_id, block)
+        finally:
+            result = self.end_transcription(job_id)
+        return result
+    
+    def begin_transcription(self, job_id):
+        self.transcriptions[job_id] = (self.recognizers.acquire(), [], [0])
+    
+    def feed_transcription(self, job_id, pcm_data):
+        rec, segments, size = self.transcriptions[job_id]
+        size[0] += len(pcm_data)
+        if rec.AcceptWaveform(pcm_data):
+            segments.append(final_text(rec.Result()))
+    
+    def end_transcription(self, job_id):
+        rec, segments, size = self.transcriptions.pop(job_id)
+        try:
+            segments.append(final_text(rec.FinalResult()))
+        finally:
+            self.recognizers.release(rec)
+        return {
+            'success': True,
+            'text': ' '.join(segment for segment in segments if segment),
+            'duration': size[0] / (2 * TARGET_RATE)
+        }
+    
+    def transcribe_raw(self, pcm_data, mode='dictation'):
+        if mode == 'command' and self.command_grammar:
+            return self.transcribe_command(pcm_data)
+        rec = self.recognizers.acquire()
+        try:
+            return transcribe_pcm(rec, pcm_data)
+        finally:
+            self.recognizers.release(rec)
+    
+    def transcribe_command(self, pcm_data):
+        """Decode against the command grammar; fall back to dictation when unsure"""
+        vad_result = detect_speech(pcm_data)
+        if not vad_result.audio:
+            return dict(NO_SPEECH_RESPONSE, mode='command', command=None)
         
-        return audio_filtered_int16.tobytes()
+        grammar, pool = self.command_grammar, self.command_recognizers
+        rec = pool.acquire()
+        try:
+            result = decode_command(rec, vad_result, grammar)
+        finally:
+            pool.release(rec)
+        if result['command'] and result['confidence'] >= STT_COMMAND_MIN_CONFIDENCE:
+            return result
         
-    except Exception as e:
-        return audio_data  # Return original if filtering fails
+        rec = self.recognizers.acquire()
+        try:
+            fallback = decode_voiced(rec, vad_result)
+        finally:
+            self.recognizers.release(rec)
+        fallback.update(mode='dictation', command=None, command_confidence=result['confidence'])
+        return fallback
+    
+    def open_stream(self, session_id, input_format):
+        """Returns False when this decoder already holds max_sessions"""
+        return self.sessions.create(TARGET_RATE, session_id=session_id, input_format=input_format) is not None
+    
+    def feed_stream(self, session_id, pcm_data):
+        """Returns None for unknown or expired sessions"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            return None
+        return session.feed(pcm_data)
+    
+    def close_stream(self, session_id):
+        """Returns None for unknown or expired sessions"""
+        session = self.sessions.close(session_id)
+        if session is None:
+            return None
+        result = session.finish()
+        result['transcript'] = session.transcript
+        return result
+    
+    def stats(self):
+        return {
+            'pid': os.getpid(),
+            'active_streams': len(self.sessions),
+            'command_phrases': len(self.command_grammar.phrases) if self.command_grammar else 0
+        }
+    
+    def close(self):
+        self._stopped.set()
+        self.sessions.close_all()
+
+class PooledDecoder:
+    """Forwards decoding to forked worker processes sharing the loaded model"""
+    
+    def __init__(self, pool, max_sessions):
+        self.pool = pool
+        # The cap is enforced across the pool by the router; any worker may hold all of it
+        self.router = SessionRouter(len(pool), max_sessions, STREAM_IDLE_TIMEOUT)
+    
+    def transcribe(self, blocks):
+        # Blocks are read here and forwarded one by one, so uploads stay bounded in memory
+        worker = self.pool.least_loaded()
+        job_id = uuid.uuid4().hex
+        self.pool.call(worker, 'begin_transcription', job_id)
+        try:
+            for block in blocks:
+                self.pool.call(worker, 'feed_transcription', job_id, block)
+        finally:
+            result = self.pool.call(worker, 'end_transcription', job_id)
+        return result
+    
+    def transcribe_raw(self, pcm_data, mode='dictation'):
+        return self.pool.call(self.pool.least_loaded(), 'transcribe_raw', pcm_data, mode)
+    
+    def open_stream(self, session_id, input_format):
+        worker = self.router.assign(session_id)
+        if worker is None:
+            return False
+        try:
+            opened = self.pool.call(worker, 'open_stream', session_id, input_format)
+        except Exception:
+            self.router.release(session_id)
+            raise
+        if not opened:
+            self.router.release(session_id)
+        return opened
+    
+    def feed_stream(self, session_id, pcm_data):
+        worker = self.router.lookup(session_id)
+        if worker is None:
+            return None
+        result = self.pool.call(worker, 'feed_stream', session_id, pcm_data)
+        if result is None:
+            # Reaped by the worker
+            self.router.release(session_id)
+        return result
+    
+    def close_stream(self, session_id):
+        worker = self.router.release(session_id)
+        if worker is None:
+            return None
+        return self.pool.call(worker, 'close_stream', session_id)
+    
+    def stats(self):
+        return [self.pool.call(index, 'stats') for index in range(len(self.pool))]
+    
+    def close(self):
+        self.pool.close()
+
+class FileTranscriber:
+    """Whole-file transcription with word timings, for batch jobs"""
+    
+    def __init__(self, model):
+        self.recognizers = RecognizerPool(lambda sample_rate: make_word_recognizer(model, sample_rate), size=1)
+    
+    def transcribe_file(self, path):
+        started = time.perf_counter()
+        rec = self.recognizers.acquire()
+        segments, words, size = [], [], 0
+        try:
+            with open(path, 'rb') as stream:
+                audio_format, blocks = iter_pcm16_blocks(stream)
+                for block in blocks:
+                    size += len(block)
+                    if rec.AcceptWaveform(block):
+                        segments.append(json.loads(rec.Result()))
+                segments.append(json.loads(rec.FinalResult()))
+        finally:
+            self.recognizers.release(rec)
+        for segment in segments:
+            words.extend(segment.get('result', []))
+        duration = size / (2 * TARGET_RATE)
+        decode_seconds = time.perf_counter() - started
+        return {
+            'success': True,
+            'text': ' '.join(segment['text'] for segment in segments if segment.get('text')),
+            'words': words,
+            'duration': duration,
+            'decode_seconds': round(decode_seconds, 3),
+            'realtime_factor': round(decode_seconds / duration, 3) if duration else 0.0,
+            'source_format': repr(audio_format)
+        }
+
+class LazyFileTranscriber:
+    """FileTranscriber over a model loaded from path by the first batch file
+
+    When the decoders run in the worker pool the server process holds no
+    model, and only loads one if batch transcription is actually used.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._transcriber = None
+        self._lock = threading.Lock()
+    
+    def transcribe_file(self, file_path):
+        with self._lock:
+            if self._transcriber is None:
+                self._transcriber = FileTranscriber(Model(self.path))
+        return self._transcriber.transcribe_file(file_path)
+
+def make_word_recognizer(model, sample_rate):
+    """Dictation recognizer that also reports per-word start/end times"""
+    rec = KaldiRecognizer(model, sample_rate)
+    rec.SetWords(True)
+    return rec
+
+def list_batch_directory(directory, pattern):
+    """Audio files matching pattern under a directory inside STT_BATCH_ROOT"""
+    if not STT_BATCH_ROOT:
+        raise PermissionError('Directory jobs are disabled (set STT_BATCH_ROOT)')
+    root = os.path.realpath(STT_BATCH_ROOT)
+    top = os.path.realpath(os.path.join(root, directory))
+    if os.path.commonpath([root, top]) != root:
+        raise PermissionError('Directory is outside STT_BATCH_ROOT')
+    if not os.path.isdir(top):
+        raise FileNotFoundError(f"No such directory: {directory}")
+    
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(top):
+        dirnames.sort()
+        for filename in sorted(fnmatch.filter(filenames, pattern)):
+            path = os.path.realpath(os.path.join(dirpath, filename))
+            # Symlinked files may point outside the root
+            if os.path.commonpath([root, path]) == root and os.path.isfile(path):
+                paths.append(path)
+    return paths
+
+def start_pool(kind, num_workers, handler_factory, setup, timeout=30.0):
+    """Fork a worker pool for the default model, or None to decode in-process
+
+    Must run in the main thread before any other thread starts, so workers
+    are never forked from a multithreaded process.
+    """
+    if not num_workers:
+        return None
+    try:
+        pool = DecoderPool(num_workers, handler_factory, setup=setup, timeout=timeout, name=kind)
+    except RuntimeError as e:
+        print(f"{kind.capitalize()} workers unavailable ({e}); decoding in-process")
+        return None
+    print(f"Started {num_workers} {kind} worker(s)")
+    return pool
+
+def pool_ready(pool):
+    """Wait for a pool's workers to load the model; False if they failed"""
+    if pool is None:
+        return False
+    try:
+        pool.wait_ready()
+        return True
+    except RuntimeError as e:
+        print(f"Worker pool failed ({e}); decoding in-process")
+        return False
+
+class SttEngine:
+    """A loaded model and the decoders serving it"""
+    
+    def __init__(self, name, model, decoder, batch_jobs=None):
+        self.name = name
+        self.model = model
+        self.decoder = decoder
+        self.batch_jobs = batch_jobs
+    
+    def close(self):
+        self.decoder.close()
+
+def load_engine(name, path):
+    """Load a model and start its decoders (runs on a registry loader thread)
+
+    The default model's worker pools were forked at startup and load it
+    themselves; this waits for them. In-process decoders use a model loaded
+    here. Batch jobs without a batch pool share that model, or, when the
+    decoders are pooled, load their own on the first batch file.
+    """
+    if name != STT_DEFAULT_MODEL:
+        # Extra models decode in-process and can be unloaded again
+        model = Model(path)
+        return SttEngine(name, model, LocalDecoder(model, STREAM_MAX_SESSIONS))
+    decoder = PooledDecoder(decoder_pool, STREAM_MAX_SESSIONS) if pool_ready(decoder_pool) else None
+    batch_jobs = None
+    if pool_ready(batch_pool):
+        batch_jobs = BatchJobManager(lambda worker, path: batch_pool.call(worker, 'transcribe_file', path),
+                                     len(batch_pool))
+    model = Model(path) if decoder is None else None
+    if decoder is None:
+        decoder = LocalDecoder(model, STREAM_MAX_SESSIONS, load_command_grammar())
+    if batch_jobs is None:
+        transcriber = FileTranscriber(model) if model is not None else LazyFileTranscriber(path)
+        batch_jobs = BatchJobManager(lambda worker, path: transcriber.transcribe_file(path), 1)
+    return SttEngine(name, model, decoder, batch_jobs)
+
+# Forked now, from the main thread before the registry starts any thread;
+# the workers load the default model while the server starts
+decoder_pool = start_pool(
+    'decoder', STT_WORKERS,
+    lambda state: LocalDecoder(state[0], STREAM_MAX_SESSIONS, state[1]),
+    setup=lambda: (Model(STT_MODELS[STT_DEFAULT_MODEL]), load_command_grammar()),
+)
+# No timeout: a single long recording may take minutes
+batch_pool = start_pool(
+    'batch', STT_BATCH_WORKERS,
+    FileTranscriber,
+    setup=lambda: Model(STT_MODELS[STT_DEFAULT_MODEL]),
+    timeout=None,
+)
+
+registry = ModelRegistry(
+    STT_MODELS,
+    load_engine,
+    unloader=SttEngine.close,
+    memory_budget=STT_MODEL_MEMORY_MB * 2**20,
+    pinned=(STT_DEFAULT_MODEL,),
+)
+# Loads while the server starts listening; requests wait or get a 503 until then
+registry.load_async(STT_DEFAULT_MODEL)
+
+def engine_for_request():
+    """Engine for ?model= (default model otherwise), waiting up to STT_MODEL_WAIT for it to load"""
+    name = request.args.get('model', STT_DEFAULT_MODEL)
+    if name not in registry:
+        abort(make_response(jsonify({'error': f"Unknown model: {name}", 'models': list(STT_MODELS)}), 404))
+    return registry.get(name, wait=STT_MODEL_WAIT)
+
+def engine_for_session(session_id):
+    """Engine a stream session was opened on; None if that model was unloaded"""
+    name = session_id.rpartition('-')[0]
+    return registry.peek(name) if name in registry else None
+
+@app.errorhandler(ModelNotReady)
+def model_not_ready(e):
+    response = jsonify({'error': str(e), 'model': e.name, 'state': e.state})
+    response.status_code = 503
+    if e.state == 'loading':
+        response.headers['Retry-After'] = '5'
+    return response
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'model_loaded': True,
-        'model_path': model_path
-    })
+    """Health check endpoint: 200 once the default model is ready, 503 before"""
+    entry = registry.entries[STT_DEFAULT_MODEL]
+    engine = registry.peek(STT_DEFAULT_MODEL)
+    status = {
+        'status': 'healthy' if engine else entry.state,
+        'model_loaded': engine is not None,
+        'model_path': entry.path,
+        'load_seconds': entry.load_seconds,
+        'default_model': STT_DEFAULT_MODEL,
+        'models': registry.status(),
+        'workers': STT_WORKERS
+    }
+    if engine is None:
+        return jsonify(status), 503
+    status['batch_workers'] = engine.batch_jobs.workers
+    status['decoders'] = engine.decoder.stats()
+    return jsonify(status)
 
 @app.route('/transcribe', methods=['POST'])
 def transcribe():
     """Transcribe audio data using Vosk"""
+    engine = engine_for_request()
     try:
         if 'audio' not in request.files:
             return jsonify({'error': 'No audio file provided'}), 400
@@ -108,34 +605,15 @@ def transcribe():
         if audio_file.filename == '':
             return jsonify({'error': 'No audio file selected'}), 400
         
-        # Read audio data
-        audio_data = audio_file.read()
-        
-        # Create recognizer (16kHz sample rate)
-        rec = KaldiRecognizer(model, 16000)
-        
-        # Process audio data
-        if rec.AcceptWaveform(audio_data):
-            # Get final result
-            result = json.loads(rec.FinalResult())
-            text = result.get('text', '')
-            
-            return jsonify({
-                'success': True,
-                'text': text,
-                'confidence': result.get('confidence', 0.0)
-            })
-        else:
-            # Get partial result
-            result = json.loads(rec.PartialResult())
-            text = result.get('partial', '')
-            
-            return jsonify({
-                'success': True,
-                'text': text,
-                'partial': True
-            })
+        # Decode WAV (any rate/channels) or raw PCM16 in bounded blocks
+        audio_format, blocks = iter_pcm16_blocks(audio_file.stream, raw_format_from_request())
+        result = engine.decoder.transcribe(blocks)
+        result['source_format'] = repr(audio_format)
+        result['model'] = engine.name
+        return jsonify(result)
             
+    except AudioFormatError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error processing audio: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -143,6 +621,7 @@ def transcribe():
 @app.route('/transcribe_raw', methods=['POST'])
 def transcribe_raw():
     """Transcribe raw audio data (for real-time processing)"""
+    engine = engine_for_request()
     try:
         # Get raw audio data from request
         audio_data = request.get_data()
@@ -150,78 +629,15 @@ def transcribe_raw():
         if not audio_data:
             return jsonify({'error': 'No audio data provided'}), 400
         
-        # Expect WAV/PCM audio, skip 44-byte header
         try:
-            if len(audio_data) > 44:
-                pcm_data = audio_data[44:]
-            else:
-                pcm_data = audio_data
-            
-            # Apply noise filtering
-            filtered_pcm_data = apply_noise_filtering(pcm_data, sample_rate=16000)
-            
-            # Create recognizer with better settings
-            rec = KaldiRecognizer(model, 16000)
-            
-            # Only process if we have enough audio data
-            if len(filtered_pcm_data) > 1000:  # At least 1KB of audio
-                if rec.AcceptWaveform(filtered_pcm_data):
-                    result = json.loads(rec.FinalResult())
-                    text = result.get('text', '')
-                    confidence = result.get('confidence', 0.0)
-                    
-                    # Check if we have a complete sentence
-                    is_complete = is_complete_sentence(text)
-                    
-                    # Only return text if confidence is reasonable or text is complete
-                    if (confidence > 0.1 or text.strip()) and text:
-                        return jsonify({
-                            'success': True,
-                            'text': text,
-                            'partial': False,
-                            'confidence': confidence,
-                            'speech_ended': True,
-                            'is_complete': is_complete
-                        })
-                    else:
-                        return jsonify({
-                            'success': True,
-                            'text': 'No clear speech detected',
-                            'partial': False,
-                            'confidence': confidence,
-                            'speech_ended': True,
-                            'is_complete': False
-                        })
-                else:
-                    result = json.loads(rec.PartialResult())
-                    text = result.get('partial', '')
-                    
-                    # Check if partial text is complete
-                    is_complete = is_complete_sentence(text)
-                    
-                    if text.strip():
-                        return jsonify({
-                            'success': True,
-                            'text': text,
-                            'partial': True,
-                            'speech_ended': False,
-                            'is_complete': is_complete
-                        })
-                    else:
-                        return jsonify({
-                            'success': True,
-                            'text': 'Listening...',
-                            'partial': True,
-                            'speech_ended': False,
-                            'is_complete': False
-                        })
-            else:
-                return jsonify({
-                    'success': True,
-                    'text': 'Not enough audio data',
-                    'partial': False,
-                    'is_complete': False
-                })
+            pcm_data = to_target_pcm16(audio_data, raw_format_from_request())
+        except AudioFormatError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        try:
+            # ?mode=command decodes against the app-name grammar first
+            mode = request.args.get('mode', 'dictation')
+            return jsonify(engine.decoder.transcribe_raw(pcm_data, mode))
         except Exception as e:
             return jsonify({
                 'success': True,
@@ -233,11 +649,163 @@ def transcribe_raw():
     except Exception as e:
         return jsonify({'error': 'Processing error'}), 500
 
+def raw_format_from_request():
+    """Format of headerless PCM uploads from ?sample_rate= and ?channels=
+
+    Raises AudioFormatError for values the converter cannot work with.
+    """
+    return raw_audio_format(
+        sample_rate=request.args.get('sample_rate', TARGET_RATE, type=int),
+        channels=request.args.get('channels', 1, type=int),
+    )
+
+@app.route('/stream', methods=['POST'])
+def start_stream():
+    """Start a streaming session that keeps decoder state across chunks"""
+    engine = engine_for_request()
+    try:
+        input_format = raw_format_from_request()
+    except AudioFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    # The id records the model, so later chunks find the same engine
+    session_id = f"{engine.name}-{uuid.uuid4().hex}"
+    if not engine.decoder.open_stream(session_id, input_format):
+        return jsonify({'error': 'Too many active stream sessions'}), 503
+    return jsonify({
+        'success': True,
+        'session_id': session_id,
+        'model': engine.name,
+        'sample_rate': input_format.sample_rate,
+        'channels': input_format.channels,
+        'idle_timeout': STREAM_IDLE_TIMEOUT
+    })
+
+@app.route('/stream/<session_id>', methods=['POST'])
+def feed_stream(session_id):
+    """Feed the next PCM chunk of a session and return partial/final text"""
+    # Raw chunks in the session's format, or WAV chunks with their own header
+    audio_data = request.get_data()
+    if not audio_data:
+        return jsonify({'error': 'No audio data provided'}), 400
+    
+    engine = engine_for_session(session_id)
+    if engine is None:
+        return jsonify({'error': 'Unknown or expired stream session'}), 404
+    try:
+        result = engine.decoder.feed_stream(session_id, audio_data)
+    except AudioFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error processing stream chunk: {str(e)}")
+        return jsonify({'error': 'Processing error'}), 500
+    
+    if result is None:
+        return jsonify({'error': 'Unknown or expired stream session'}), 404
+    return jsonify({'success': True, 'session_id': session_id, **result})
+
+@app.route('/stream/<session_id>', methods=['DELETE'])
+def end_stream(session_id):
+    """Flush and close a session, returning the full transcript"""
+    engine = engine_for_session(session_id)
+    result = engine.decoder.close_stream(session_id) if engine else None
+    if result is None:
+        return jsonify({'error': 'Unknown or expired stream session'}), 404
+    
+    return jsonify({
+        'success': True,
+        'session_id': session_id,
+        **result,
+        'is_complete': bool(result['transcript'])
+    })
+
+def default_batch_jobs():
+    """Batch jobs always run on the default model"""
+    return registry.get(STT_DEFAULT_MODEL, wait=STT_MODEL_WAIT).batch_jobs
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Start a batch transcription job from uploaded files or a server directory"""
+    batch_jobs = default_batch_jobs()
+    uploads = [upload for upload in request.files.getlist('files') if upload.filename]
+    if uploads:
+        # Saved to disk so workers read them in blocks, like directory files
+        upload_dir = tempfile.mkdtemp(prefix='stt-batch-')
+        paths, names = [], []
+        for index, upload in enumerate(uploads):
+            path = os.path.join(upload_dir, f"{index:05d}-{secure_filename(upload.filename) or 'audio'}")
+            upload.save(path)
+            paths.append(path)
+            names.append(upload.filename)
+        job = batch_jobs.submit(paths, names, cleanup_dir=upload_dir)
+        return jsonify({'success': True, **job.progress()}), 202
+    
+    body = request.get_json(silent=True) or request.form
+    directory = body.get('directory')
+    if not directory:
+        return jsonify({'error': 'Provide audio files or a directory'}), 400
+    try:
+        paths = list_batch_directory(directory, body.get('pattern') or STT_BATCH_PATTERN)
+    except PermissionError as e:
+        return jsonify({'error': str(e)}), 403
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    if not paths:
+        return jsonify({'error': 'No matching audio files in directory'}), 400
+    
+    root = os.path.realpath(STT_BATCH_ROOT)
+    job = batch_jobs.submit(paths, [os.path.relpath(path, root) for path in paths])
+    return jsonify({'success': True, **job.progress()}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Progress and throughput of a batch job"""
+    batch_jobs = default_batch_jobs()
+    job = batch_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown batch job'}), 404
+    return jsonify(job.progress())
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    """Per-file results as NDJSON, streamed as files complete"""
+    batch_jobs = default_batch_jobs()
+    job = batch_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown batch job'}), 404
+    
+    def lines():
+        for result in job.iter_results():
+            yield json.dumps(result) + '\n'
+        # Last line: final counts and throughput
+        yield json.dumps({'done': True, **job.progress()}) + '\n'
+    
+    return Response(lines(), mimetype='application/x-ndjson')
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a batch job; files already decoding finish but are not reported"""
+    batch_jobs = default_batch_jobs()
+    job = batch_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown batch job'}), 404
+    return jsonify({'success': True, **job.progress()})
+
 if __name__ == '__main__':
     print("Starting Vosk STT Server...")
     print("Server will be available at: http://localhost:5000")
     print("Endpoints:")
-    print("  - GET  /health - Health check")
-    print("  - POST /transcribe - Transcribe audio file")
-    print("  - POST /transcribe_raw - Transcribe raw audio data")
-    app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
+    print("  - GET  /health - Readiness (503 while the model loads)")
+    print("  - POST /transcribe - Transcribe audio file (?model=<name> for another model)")
+    print("  - POST /transcribe_raw - Transcribe raw audio data (?mode=command for app commands)")
+    print("  - POST /stream - Start a streaming session")
+    print("  - POST /stream/<id> - Feed PCM chunk, get partial/final text")
+    print("  - DELETE /stream/<id> - Close session, get full transcript")
+    print("  - POST /jobs - Batch-transcribe uploaded files or a directory")
+    print("  - GET  /jobs/<id> - Batch job progress and throughput")
+    print("  - GET  /jobs/<id>/results - Batch results as NDJSON, as they complete")
+    print("  - DELETE /jobs/<id> - Cancel a batch job")
+    print(f"Models: {', '.join(f'{name}={path}' for name, path in STT_MODELS.items())} (default: {STT_DEFAULT_MODEL})")
+    print(f"Decoder workers: {STT_WORKERS or 'in-process'}")
+    print(f"Batch workers: {STT_BATCH_WORKERS or 'in-process'}")
+    # No reloader: it would load the model a second time
+    app.run(host='0.0.0.0', port=5000, debug=STT_DEBUG, threaded=True, use_reloader=False) 
\ No newline at end of file